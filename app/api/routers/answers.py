@@ -1,24 +1,40 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 
+from app.core.bulkhead import EXAM, bulkhead
+from app.core.http_cache import IMMUTABLE, conditional, make_etag
+from app.core.query_budget import query_budget
 from app.core.security import CurrentUser, get_current_user
+from app.core.routing import InstrumentedRoute
 from app.db.session import get_db
+from app.models.attempts import Attempt
 from app.schemas.answer import AnswerRead, AnswerUpdate
 from app.services.answers import list_attempt_answers, reset_answer, update_answer
+from app.services.attempts import ATTEMPT_STATUS_FINISHED
 
-router = APIRouter(prefix="/api/answers", tags=["Answers"])
+router = APIRouter(
+    prefix="/api/answers", tags=["Answers"], route_class=InstrumentedRoute, dependencies=[bulkhead(EXAM)]
+)
 
 
 @router.get("/attempts/{attempt_id}", response_model=list[AnswerRead])
 def api_list_attempt_answers(
     attempt_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
 ):
-    return list_attempt_answers(db, attempt_id, current_user)
+    answers = list_attempt_answers(db, attempt_id, current_user)
+    # попытка уже загружена сервисом — берётся из identity map без запроса
+    attempt = db.get(Attempt, attempt_id)
+    if attempt.status != ATTEMPT_STATUS_FINISHED:
+        return answers
+    etag = make_etag("attempt_answers", attempt.id, attempt.finished_at)
+    return conditional(request, response, etag, IMMUTABLE, last_modified=attempt.finished_at) or answers
 
 
-@router.patch("/{answer_id}", response_model=AnswerRead)
+@router.patch("/{answer_id}", response_model=AnswerRead, dependencies=[query_budget(5)])
 def api_update_answer(
     answer_id: int,
     payload: AnswerUpdate,
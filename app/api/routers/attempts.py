@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from sqlalchemy.orm import Session
 
+from app.core.bulkhead import EXAM, bulkhead
+from app.core.http_cache import IMMUTABLE, conditional, make_etag
+from app.core.query_budget import query_budget
 from app.core.security import CurrentUser, get_current_user
+from app.core.routing import InstrumentedRoute
 from app.db.session import get_db
 from app.schemas.attempt import AttemptRead
-from app.services.attempts import create_attempt, finish_attempt, get_attempt
+from app.services.attempts import ATTEMPT_STATUS_FINISHED, create_attempt, finish_attempt, get_attempt
 
-router = APIRouter(prefix="/api/attempts", tags=["Attempts"])
+router = APIRouter(
+    prefix="/api/attempts", tags=["Attempts"], route_class=InstrumentedRoute, dependencies=[bulkhead(EXAM)]
+)
 
 
-@router.post("/tests/{test_id}", response_model=AttemptRead, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/tests/{test_id}",
+    response_model=AttemptRead,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[query_budget(12)],
+)
 def api_create_attempt(
     test_id: int,
     db: Session = Depends(get_db),
@@ -21,13 +32,20 @@ def api_create_attempt(
 @router.get("/{attempt_id}", response_model=AttemptRead)
 def api_get_attempt(
     attempt_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
 ):
-    return get_attempt(db, attempt_id, current_user)
+    attempt = get_attempt(db, attempt_id, current_user)
+    if attempt.status != ATTEMPT_STATUS_FINISHED:
+        return attempt
+    # завершённая попытка больше не меняется
+    etag = make_etag("attempt", attempt.id, attempt.finished_at)
+    return conditional(request, response, etag, IMMUTABLE, last_modified=attempt.finished_at) or attempt
 
 
-@router.post("/{attempt_id}/finish", response_model=AttemptRead)
+@router.post("/{attempt_id}/finish", response_model=AttemptRead, dependencies=[query_budget(10)])
 def api_finish_attempt(
     attempt_id: int,
     db: Session = Depends(get_db),
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+
+from app.core.batch import run_batch
+from app.core.bulkhead import bulkhead
+from app.core.security import CurrentUser, get_current_user
+from app.core.routing import InstrumentedRoute
+from app.db.session import get_db
+from app.schemas.batch import BatchRequest, BatchResponse
+
+router = APIRouter(prefix="/api", tags=["Batch"], route_class=InstrumentedRoute)
+
+
+"""
+POST /api/batch -> несколько под-запросов за один round trip.
+Аутентификация и сессия БД — одни на пакет, под-запросы выполняются по порядку
+(не больше settings.batch_max_requests), у каждого свой статус, заголовки и тело.
+Слот bulkhead занимает каждый под-запрос по своему классу, не сам пакет.
+"""
+@router.post("/batch", response_model=BatchResponse, dependencies=[bulkhead(None)])
+async def api_batch(
+    payload: BatchRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    responses = await run_batch(request.app, request.scope, payload.requests, current_user, db)
+    return {"responses": responses}
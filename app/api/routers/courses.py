@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-
+from typing import Dict, List, Optional
+
+from app.core.bulkhead import REPORTING, bulkhead
+from app.core.config import settings
+from app.core.fields import Fields, sparse_fields
+from app.core.http_cache import REVALIDATE, conditional
+from app.core.query_budget import query_budget
+from app.core.responses import FastJSONResponse
 from app.core.security import CurrentUser, get_current_user
+from app.core.routing import InstrumentedRoute
 from app.db.session import get_db
 from app.schemas.course import CourseRead, CourseListRead
-from app.schemas.course_user import CourseUserRead
+from app.schemas.course_user import CourseBulkEnroll, CourseBulkEnrollResult, CourseUserRead
 from app.schemas.test import TestRead
 from app.services.courses import (
     list_courses,
@@ -16,15 +25,18 @@ from app.services.courses import (
     list_course_tests,
     list_course_students,
     enroll_user_to_course,
+    enroll_users_to_course_bulk,
     remove_user_from_course,
 )
+from app.utils.csv_stream import iter_csv_ints
 
-router = APIRouter(prefix="/api/courses", tags=["Courses"])
+router = APIRouter(prefix="/api/courses", tags=["Courses"], route_class=InstrumentedRoute)
 
 
 @router.get("/", response_model=List[CourseListRead])
-def api_list_courses(db: Session = Depends(get_db)):
-    return list_courses(db)
+def api_list_courses(request: Request, response: Response, db: Session = Depends(get_db)):
+    etag, courses = list_courses(db)
+    return conditional(request, response, etag, REVALIDATE) or courses
 
 
 @router.get("/{course_id}", response_model=CourseRead)
@@ -65,10 +77,11 @@ def api_delete_course(
 @router.get("/{course_id}/tests", response_model=List[TestRead])
 def api_list_course_tests(
     course_id: int,
+    fields: Optional[Fields] = sparse_fields(TestRead),
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
 ):
-    return list_course_tests(db, course_id, current_user)
+    return FastJSONResponse(list_course_tests(db, course_id, current_user, fields=fields))
 
 
 @router.get("/{course_id}/students", response_model=List[CourseUserRead])
@@ -90,6 +103,41 @@ def api_enroll_student(
     return enroll_user_to_course(db, course_id, current_user, target_user_id=user_id)
 
 
+# пачки по bulk_chunk_size — повтор формы запроса ожидаем
+@router.post(
+    "/{course_id}/students/bulk",
+    response_model=CourseBulkEnrollResult,
+    dependencies=[query_budget(max_repeats=0), bulkhead(REPORTING)],
+)
+async def api_enroll_students_bulk(
+    course_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Тело: JSON {"user_ids": [...]} или text/csv с user_id в первом столбце (читается потоком).
+    """
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        # без повторов, как в сервисе; сверх лимита — сразу 413, не дочитывая поток
+        unique_ids: Dict[int, None] = {}
+        async for uid in iter_csv_ints(request.stream()):
+            unique_ids[uid] = None
+            if len(unique_ids) > settings.bulk_enroll_max_ids:
+                raise HTTPException(
+                    status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                    detail=f"Too many users in one request (max {settings.bulk_enroll_max_ids})",
+                )
+        user_ids = list(unique_ids)
+    else:
+        try:
+            user_ids = CourseBulkEnroll.model_validate(await request.json()).user_ids
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+    return await run_in_threadpool(enroll_users_to_course_bulk, db, course_id, current_user, user_ids)
+
+
 @router.delete("/{course_id}/students/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def api_remove_student(
     course_id: int,
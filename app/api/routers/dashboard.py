@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.core.query_budget import query_budget
+from app.core.responses import FastJSONResponse
+from app.core.security import CurrentUser, get_current_user
+from app.core.routing import InstrumentedRoute
+from app.db.session import get_db
+from app.schemas.dashboard import Dashboard
+from app.services.dashboard import get_my_dashboard
+
+router = APIRouter(prefix="/api/me", tags=["Dashboard"], route_class=InstrumentedRoute)
+
+
+# пользователь + не больше двух агрегатов (записан / ведёт)
+@router.get("/dashboard", response_model=Dashboard, dependencies=[query_budget(3)])
+def api_get_my_dashboard(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    return FastJSONResponse(get_my_dashboard(db, current_user))
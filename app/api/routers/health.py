@@ -0,0 +1,71 @@
+import time
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.bulkhead import bulkhead
+from app.core.config import settings
+from app.core.routing import InstrumentedRoute
+from app.db.pool import pool_status
+from app.db.session import engine, get_db
+from app.services.notifications import get_notification_backlog
+
+# пробы и скрейп не ограничиваются bulkhead — должны отвечать и под нагрузкой
+router = APIRouter(tags=["Health"], route_class=InstrumentedRoute, dependencies=[bulkhead(None)])
+
+notifications_unread = metrics.registry.register(
+    metrics.Gauge("app_notifications_unread", "Unread personal notifications, all users")
+)
+notifications_users_with_unread = metrics.registry.register(
+    metrics.Gauge("app_notifications_users_with_unread", "Users with unread personal notifications")
+)
+_backlog_refreshed_at = 0.0
+
+
+"""
+GET /health/live -> процесс жив (БД не трогаем)
+"""
+@router.get("/health/live")
+def api_health_live():
+    return {"status": "ok"}
+
+
+"""
+GET /health/ready -> воркер готов принимать трафик.
+503, если пул соединений почти исчерпан (доля занятых >= health_pool_saturation)
+или база недоступна — балансировщик снимает воркер с нагрузки.
+"""
+@router.get("/health/ready")
+def api_health_ready():
+    pool = pool_status(engine.pool, settings.db_max_overflow)
+    if pool["saturation"] >= settings.health_pool_saturation:
+        return JSONResponse(status_code=503, content={"status": "saturated", "pool": pool})
+
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception:
+        return JSONResponse(status_code=503, content={"status": "database unavailable", "pool": pool})
+
+    return {"status": "ok", "pool": pool}
+
+
+"""
+GET /metrics -> метрики в текстовом формате Prometheus.
+Бэклог уведомлений пересчитывается не чаще раза в metrics_backlog_refresh_seconds.
+"""
+@router.get("/metrics", response_class=PlainTextResponse)
+def api_metrics(db: Session = Depends(get_db)):
+    global _backlog_refreshed_at
+
+    now = time.monotonic()
+    if now - _backlog_refreshed_at >= settings.metrics_backlog_refresh_seconds:
+        backlog = get_notification_backlog(db)
+        notifications_unread.set(backlog["unread"])
+        notifications_users_with_unread.set(backlog["users_with_unread"])
+        _backlog_refreshed_at = now
+
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,22 +1,56 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.security import CurrentUser, get_current_user
+from app.core.responses import FastJSONResponse
+from app.core.routing import InstrumentedRoute
 from app.db.session import get_db
 from app.schemas.notification import NotificationRead
-from app.services.notifications import list_my_notifications, clear_my_notifications
+from app.services.notifications import (
+    list_my_notifications,
+    clear_my_notifications,
+    get_my_unread_count,
+    mark_my_notifications_read,
+)
 
-router = APIRouter(tags=["Notifications"])
+router = APIRouter(tags=["Notifications"], route_class=InstrumentedRoute)
 
 
 @router.get("/notification", response_model=list[NotificationRead])
 @router.get("/api/notification", response_model=list[NotificationRead])
 def api_get_notifications(
+    after: Optional[int] = None,
+    after_broadcast: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.notifications_page_max),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    return FastJSONResponse(
+        list_my_notifications(db, current_user, after=after, after_broadcast=after_broadcast, limit=limit)
+    )
+
+
+@router.get("/notification/unread-count")
+@router.get("/api/notification/unread-count")
+def api_get_unread_count(
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
 ):
-    return list_my_notifications(db, current_user)
+    return {"unread": get_my_unread_count(db, current_user)}
+
 
+@router.post("/notification/read")
+@router.post("/api/notification/read")
+def api_mark_notifications_read(
+    up_to: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    updated = mark_my_notifications_read(db, current_user, up_to=up_to)
+    return {"updated": updated}
 
 
 @router.delete("/notification")
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from app.core.fields import Fields, sparse_fields
+from app.core.http_cache import IMMUTABLE, conditional, make_etag
+from app.core.query_budget import query_budget
+from app.core.responses import FastJSONResponse
 from app.core.security import CurrentUser, get_current_user
+from app.core.routing import InstrumentedRoute
 from app.db.session import get_db
 from app.schemas.question import (
     QuestionCreate,
@@ -21,15 +26,16 @@ from app.services.questions import (
     get_question
 )
 
-router = APIRouter(prefix="/api/questions", tags=["Questions"])
+router = APIRouter(prefix="/api/questions", tags=["Questions"], route_class=InstrumentedRoute)
 
 
-@router.get("/", response_model=List[QuestionRead])
+@router.get("/", response_model=List[QuestionRead], dependencies=[query_budget(2)])
 def api_list_questions(
+    fields: Optional[Fields] = sparse_fields(QuestionRead),
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
 ):
-    return list_questions(db, current_user)
+    return FastJSONResponse(list_questions(db, current_user, fields=fields))
 
 
 @router.get("/{question_id}", response_model=QuestionVersionRead)
@@ -45,10 +51,14 @@ def api_get_question(
 def api_get_question_version(
     question_id: int,
     version: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
 ):
-    return get_question_version(db, question_id, version, current_user)
+    qv = get_question_version(db, question_id, version, current_user)
+    # версии вопроса не редактируются — новая правка создаёт новую версию
+    return conditional(request, response, make_etag("question_version", qv.id), IMMUTABLE) or qv
 
 
 @router.post("/", response_model=QuestionVersionRead, status_code=status.HTTP_201_CREATED)
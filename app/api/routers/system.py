@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from app.core.security import CurrentUser, get_current_user
+from app.core.routing import InstrumentedRoute
+from app.services.system import get_trace, list_traces
+
+router = APIRouter(prefix="/api/system", tags=["System"], route_class=InstrumentedRoute)
+
+
+""" GET /api/system/traces -> последние трассы (сводка по корневым спанам) """
+@router.get("/traces")
+def api_list_traces(
+    limit: int = Query(50, ge=1, le=1000),
+    min_duration_ms: Optional[float] = Query(None, ge=0),
+    name: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    return list_traces(current_user, limit, min_duration_ms, name)
+
+
+""" GET /api/system/traces/{trace_id} -> трасса в формате OTLP/JSON """
+@router.get("/traces/{trace_id}")
+def api_get_trace(
+    trace_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    return get_trace(current_user, trace_id)
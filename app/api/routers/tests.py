@@ -5,7 +5,11 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 
+from app.core.bulkhead import REPORTING, bulkhead
+from app.core.query_budget import query_budget
+from app.core.responses import FastJSONResponse
 from app.core.security import CurrentUser, get_current_user
+from app.core.routing import InstrumentedRoute
 from app.db.session import get_db
 from app.schemas.test import TestRead, TestCreate
 from app.schemas.tests_extra import (
@@ -30,7 +34,7 @@ from app.services.tests import (
     list_test_answers,
 )
 
-router = APIRouter(prefix='/api', tags=["Tests"])
+router = APIRouter(prefix='/api', tags=["Tests"], route_class=InstrumentedRoute)
 
 
 # 3.1
@@ -75,7 +79,7 @@ def api_set_test_active_status(
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
 ):
-    return set_test_active_status(db, course_id, test_id, current_user, payload.is_active)
+    return set_test_active_status(db, course_id, test_id, current_user, payload.is_active, payload.preprovision)
 
 
 # 3.5
@@ -115,42 +119,40 @@ def api_reorder_test_questions(
 
 
 # 3.8
-@router.get("/tests/{test_id}/results/users", response_model=List[TestResultUser])
+@router.get("/tests/{test_id}/results/users", response_model=List[TestResultUser], dependencies=[bulkhead(REPORTING)])
 def api_list_test_result_users(
     test_id: int,
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
 ):
-    return list_test_result_users(db, test_id, current_user)
+    return FastJSONResponse(list_test_result_users(db, test_id, current_user))
 
 
 # 3.9
-@router.get("/tests/{test_id}/results/grades", response_model=List[TestGradeItem])
+@router.get(
+    "/tests/{test_id}/results/grades",
+    response_model=List[TestGradeItem],
+    dependencies=[query_budget(4), bulkhead(REPORTING)],
+)
 def api_list_test_grades(
     test_id: int,
     user_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
 ):
-    attempts = list_test_grades(db, test_id, current_user, user_id)
-    return [
-        {
-            "attempt_id": a.id,
-            "user_id": a.user_id,
-            "finished_at": a.finished_at,
-            "score": a.score,
-        }
-        for a in attempts
-    ]
+    return FastJSONResponse(list_test_grades(db, test_id, current_user, user_id))
 
 
 # 3.10
-@router.get("/tests/{test_id}/results/answers", response_model=List[TestAttemptAnswers])
+@router.get(
+    "/tests/{test_id}/results/answers",
+    response_model=List[TestAttemptAnswers],
+    dependencies=[query_budget(5), bulkhead(REPORTING)],
+)
 def api_list_test_answers(
     test_id: int,
     user_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: CurrentUser = Depends(get_current_user),
 ):
-    data = list_test_answers(db, test_id, current_user, user_id)
-    return data
+    return FastJSONResponse(list_test_answers(db, test_id, current_user, user_id))
@@ -1,9 +1,30 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.schemas.user import UserCreate, UserDataRead, UserRead, UserUpdate, UserBase, UserMeRead, UserRolesUpdate
+from app.schemas.user import (
+    UserCreate,
+    UserDataRead,
+    UserRead,
+    UserUpdate,
+    UserBase,
+    UserMeRead,
+    UserRolesUpdate,
+    UserBulkUpsert,
+    UserUpsertStatus,
+    UserTranscriptItem,
+)
+from app.core.config import settings
+from app.core.fields import Fields, sparse_fields
+from app.core.bulkhead import REPORTING, bulkhead
+from app.core.query_budget import query_budget
 from app.core.security import CurrentUser, get_current_user
 from app.core.permissions import *
+from app.core.responses import FastJSONResponse
+from app.core.routing import InstrumentedRoute
 
 from app.services.users import (
     get_user_data,
@@ -15,20 +36,31 @@ from app.services.users import (
     set_user_block_status,
     create_user,
     set_user_roles,
+    upsert_users_bulk,
+    get_user_transcript,
+    stream_user_transcript_csv,
 )
 
-router = APIRouter(prefix="/api/users", tags=["Users"])
+router = APIRouter(prefix="/api/users", tags=["Users"], route_class=InstrumentedRoute)
 
 """ 0.1 GET /users/me -> Получить данные о себе"""
 @router.get('/me', response_model=UserMeRead)
 def api_get_me(current_user: CurrentUser = Depends(get_current_user)):
     return {"id": current_user.id, "full_name": current_user.full_name}
 
-""" 1.1 GET /users -> Получить список всех пользователей"""
+""" 1.1 GET /users?q=&role=&after_id=&limit= -> Поиск пользователей (keyset-пагинация по id)"""
 @router.get('/', response_model=list[UserRead])
-def api_get_all_users(db: Session = Depends(get_db), current_user: UserRead = Depends(get_current_user)):
-    users = list_users(db=db, current_user=current_user)
-    return users
+def api_get_all_users(
+    q: Optional[str] = None,
+    role: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=settings.users_page_max),
+    fields: Optional[Fields] = sparse_fields(UserRead),
+    db: Session = Depends(get_db),
+    current_user: UserRead = Depends(get_current_user),
+):
+    users = list_users(db=db, current_user=current_user, q=q, role=role, after_id=after_id, limit=limit, fields=fields)
+    return FastJSONResponse(users)
 
 """ 1.2 GET /users/{user_id} -> Получить пользователя по ID"""
 @router.get('/{user_id}')
@@ -57,6 +89,33 @@ def api_get_user_data(
     return get_user_data(db, user_id, current_user)
 
 
+""" 1.4.1 GET /users/{user_id}/transcript?after_finished_at=&after_id=&limit=&format= -> Завершённые попытки пользователя по всем курсам"""
+# format=csv — весь транскрипт потоком (keyset-страницы по bulk_chunk_size)
+@router.get(
+    "/{user_id}/transcript",
+    response_model=list[UserTranscriptItem],
+    dependencies=[query_budget(3), bulkhead(REPORTING)],
+)
+def api_get_user_transcript(
+    user_id: int,
+    after_finished_at: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=settings.transcript_page_max),
+    format: Literal["json", "csv"] = "json",
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    if format == "csv":
+        return StreamingResponse(
+            stream_user_transcript_csv(db, user_id, current_user),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="transcript-{user_id}.csv"'},
+        )
+    return FastJSONResponse(
+        get_user_transcript(db, user_id, current_user, after_finished_at=after_finished_at, after_id=after_id, limit=limit)
+    )
+
+
 """ 1.5 GET /users/{user_id}/roles -> Получить роли пользователя по ID"""
 @router.get('/{user_id}/roles')
 def api_get_user_roles(user_id: int, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
@@ -115,3 +174,14 @@ def api_create_user(db: Session = Depends(get_db), current_user: CurrentUser = D
     )
     user = create_user(db, data, current_user.id)
     return user
+
+
+""" POST /users/bulk -> Массовая синхронизация пользователей, вызывается модулем авторизации (permission user:sync)"""
+# пачки по bulk_chunk_size — повтор формы запроса ожидаем
+@router.post("/bulk", response_model=list[UserUpsertStatus], dependencies=[query_budget(max_repeats=0), bulkhead(REPORTING)])
+def api_upsert_users_bulk(
+    payload: UserBulkUpsert,
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    return upsert_users_bulk(db, payload.users, current_user)
@@ -0,0 +1,129 @@
+"""
+Выполнение под-запросов POST /api/batch внутри процесса.
+
+Каждый под-запрос проходит через всё ASGI-приложение (middleware, маршрутизация,
+бюджет запросов, метрики, bulkhead своего класса) как обычный HTTP-запрос, но:
+- пользователь уже аутентифицирован пакетом: get_current_user берёт его из
+  scope["state"][BATCH_USER] без повторного разбора JWT и запроса в БД;
+- get_db отдаёт общую сессию пакета из scope["state"][BATCH_DB] и не закрывает её.
+
+Под-запросы выполняются последовательно: Session не потокобезопасна, а
+отдельная сессия на под-запрос вернула бы по соединению на каждый.
+После каждого под-запроса сессия откатывается: незакоммиченные изменения
+упавшего (4xx/5xx) под-запроса не попадают в commit следующего, а ошибка БД
+не ломает сессию для остальных.
+Вложенные пакеты запрещены.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import anyio
+from sqlalchemy.orm import Session
+
+from app.core import tracing
+from app.core.security import BATCH_USER, CurrentUser
+from app.db.session import BATCH_DB
+from app.schemas.batch import BatchSubRequest
+
+logger = logging.getLogger(__name__)
+
+BATCH_PATH = "/api/batch"
+
+# заголовки пакета, которые получают под-запросы
+_FORWARDED_HEADERS = {b"authorization", b"user-agent", b"accept-language", b"x-profile"}
+# заголовки ответа под-запроса, которые не имеют смысла внутри JSON
+_DROPPED_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "vary"}
+
+
+def _sub_scope(parent: dict, sub: BatchSubRequest, body: bytes, state: dict) -> dict:
+    path, _, query = sub.path.partition("?")
+    headers = [(k, v) for k, v in parent["headers"] if k in _FORWARDED_HEADERS]
+    if body:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+    span = tracing.current_span()
+    if span is not None:
+        # под-запрос — отдельная трасса, продолжающая спан пакета
+        headers.append((b"traceparent", f"00-{span.trace.trace_id}-{span.span_id}-01".encode()))
+
+    return {
+        "type": "http",
+        "asgi": parent.get("asgi", {"version": "3.0"}),
+        "http_version": parent.get("http_version", "1.1"),
+        "method": sub.method,
+        "scheme": parent.get("scheme", "http"),
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": parent.get("root_path", ""),
+        "query_string": query.encode(),
+        "headers": headers,
+        "client": parent.get("client"),
+        "server": parent.get("server"),
+        "state": state,
+    }
+
+
+def _decode_body(headers: Dict[str, str], body: bytes) -> Optional[Any]:
+    if not body:
+        return None
+    if headers.get("content-type", "").startswith("application/json"):
+        return json.loads(body)
+    return body.decode("utf-8", errors="replace")
+
+
+async def _dispatch(app, scope: dict, body: bytes) -> Tuple[int, Dict[str, str], bytes]:
+    status_code = 500
+    headers: Dict[str, str] = {}
+    chunks: List[bytes] = []
+    finished = anyio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # «клиент» не отключается, пока ответ не получен целиком
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            for key, value in message.get("headers", []):
+                name = key.decode("latin-1").lower()
+                if name not in _DROPPED_HEADERS:
+                    headers[name] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                finished.set()
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # ServerErrorMiddleware уже отправил 500 и пробрасывает исключение дальше
+        logger.exception("Batch sub-request %s %s failed", scope["method"], scope["path"])
+    finally:
+        finished.set()
+    return status_code, headers, b"".join(chunks)
+
+
+async def run_batch(app, parent_scope: dict, requests: List[BatchSubRequest], user: CurrentUser, db: Session) -> List[dict]:
+    state = {**parent_scope.get("state", {}), BATCH_USER: user, BATCH_DB: db}
+    responses = []
+    for sub in requests:
+        if not sub.path.startswith("/") or sub.path.split("?", 1)[0].rstrip("/") == BATCH_PATH:
+            responses.append({"id": sub.id, "status": 400, "headers": {}, "body": {"detail": "Invalid sub-request path"}})
+            continue
+
+        body = b"" if sub.body is None else json.dumps(sub.body).encode("utf-8")
+        status_code, headers, raw = await _dispatch(app, _sub_scope(parent_scope, sub, body, state), body)
+        # сервисы коммитят свою работу сами; всё, что осталось незакоммиченным
+        # (ошибка 4xx/5xx после изменений в сессии), следующий под-запрос закоммитить не должен
+        await anyio.to_thread.run_sync(db.rollback)
+
+        responses.append({"id": sub.id, "status": status_code, "headers": headers, "body": _decode_body(headers, raw)})
+    return responses
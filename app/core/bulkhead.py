@@ -0,0 +1,174 @@
+"""
+Изоляция классов эндпоинтов (bulkhead) и сброс нагрузки.
+
+У каждого класса свой лимит одновременных запросов, ограниченная очередь и
+дедлайн ожидания в ней. Запрос сверх очереди или не дождавшийся места за
+дедлайн сразу получает 503 с Retry-After — тяжёлые отчёты преподавателей не
+занимают потоки threadpool и соединения пула, нужные экзаменационному трафику.
+
+Класс маршрута объявляется зависимостью (как query_budget), слот занимает
+InstrumentedRoute до разрешения зависимостей — то есть до взятия соединения из пула:
+    @router.patch("/{answer_id}", dependencies=[bulkhead(EXAM)])
+Без объявления — INTERACTIVE; bulkhead(None) — без ограничений (health, metrics).
+Лимиты — settings.bulkhead_<класс>_{limit,queue,timeout}; сумма лимитов должна
+помещаться в threadpool (40 потоков по умолчанию).
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Depends, HTTPException, status
+
+from app.core import metrics
+from app.core.config import settings
+
+EXAM = "exam"
+INTERACTIVE = "interactive"
+REPORTING = "reporting"
+CLASSES = (EXAM, INTERACTIVE, REPORTING)
+
+
+class Overloaded(HTTPException):
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Server is busy ({name}), retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class Bulkhead:
+    """
+    Семафор с ограниченной очередью. Не привязан к циклу событий: ждущий получает
+    слот от освобождающего через call_soon_threadsafe своего цикла (несколько циклов
+    в одном процессе — TestClient из разных потоков, вложенные приложения).
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, timeout: float, retry_after: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+        self.in_flight = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        with self._lock:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(self.name, self.retry_after)
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait_for(waiter[1], self.timeout)
+        except BaseException as exc:
+            # таймаут или отмена (клиент ушёл): ждущего убираем из очереди,
+            # а если release() уже передал ему слот — возвращаем слот
+            timed_out = isinstance(exc, asyncio.TimeoutError)
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+                    if timed_out:
+                        self.timeouts += 1
+            if queued:
+                if timed_out:
+                    raise Overloaded(self.name, self.retry_after)
+                raise
+            if not timed_out:
+                self.release()
+                raise
+            # слот передан одновременно с таймаутом — он уже наш
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self.in_flight -= 1
+                return
+            # слот переходит ждущему, in_flight не меняется
+            loop, future = self._waiters.popleft()
+        loop.call_soon_threadsafe(_grant, future)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+bulkheads: Dict[str, Bulkhead] = {
+    name: Bulkhead(
+        name,
+        limit=getattr(settings, f"bulkhead_{name}_limit"),
+        queue=getattr(settings, f"bulkhead_{name}_queue"),
+        timeout=getattr(settings, f"bulkhead_{name}_timeout"),
+        retry_after=settings.bulkhead_retry_after,
+    )
+    for name in CLASSES
+}
+
+
+def _grant(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def bulkhead(name: Optional[str]):
+    """
+    Зависимость, объявляющая класс маршрута: EXAM / INTERACTIVE / REPORTING или None.
+    """
+    if name is not None and name not in bulkheads:
+        raise ValueError(f"Unknown bulkhead class: {name}")
+
+    async def _declare_bulkhead() -> None:
+        pass
+
+    _declare_bulkhead.bulkhead = name
+    return Depends(_declare_bulkhead)
+
+
+def for_route(dependencies: Optional[Sequence]) -> Optional[Bulkhead]:
+    if not settings.bulkhead_enabled:
+        return None
+    name = INTERACTIVE
+    for dependency in dependencies or ():
+        name = getattr(dependency.dependency, "bulkhead", name)
+    return bulkheads[name] if name is not None else None
+
+
+def _collect() -> List[metrics.Family]:
+    families = []
+    for key, kind, documentation in (
+        ("limit", "gauge", "Bulkhead concurrency limit"),
+        ("in_flight", "gauge", "Requests holding a bulkhead slot"),
+        ("queued", "gauge", "Requests waiting for a bulkhead slot"),
+        ("rejected", "counter", "Requests rejected because the bulkhead queue was full"),
+        ("timeouts", "counter", "Requests rejected after waiting past the bulkhead deadline"),
+    ):
+        name = f"app_bulkhead_{key}_total" if kind == "counter" else f"app_bulkhead_{key}"
+        families.append(
+            (name, kind, documentation, [({"bulkhead": b.name}, b.stats()[key]) for b in bulkheads.values()])
+        )
+    return families
+
+
+metrics.registry.register_collector(_collect)
@@ -0,0 +1,237 @@
+"""
+Сжатие ответов по Accept-Encoding (br / zstd / gzip) с порогом размера.
+
+- br и zstd — если установлены пакеты brotli / zstandard, gzip есть всегда;
+  при равном q выбирается первый из ENCODING_PREFERENCE;
+- сжимаются только JSON/текст не меньше settings.compression_minimum_size;
+  потоковые ответы (тело в нескольких сообщениях), 204/304 и уже сжатые — как есть;
+- большие тела сжимаются в threadpool, чтобы не держать цикл событий;
+- неизменяемые ответы (Cache-Control: immutable + ETag, см. app/core/http_cache.py) —
+  версии вопросов, завершённые попытки — сжимаются один раз с повышенным уровнем,
+  сжатые байты хранятся в LRU по (ETag, кодировка) до compression_cache_max_bytes;
+- ETag сжатого ответа становится слабым (W/"..."), добавляется Vary: Accept-Encoding;
+  то же — у 304 на запрос с поддерживаемой кодировкой, чтобы валидаторы совпадали с 200.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core import metrics
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+ENCODING_PREFERENCE = ("br", "zstd", "gzip")
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+_THREADPOOL_MIN_SIZE = 64 * 1024
+
+
+def _gzip(body: bytes, immutable: bool) -> bytes:
+    level = settings.compression_immutable_level if immutable else settings.compression_gzip_level
+    return gzip.compress(body, compresslevel=min(level, 9), mtime=0)
+
+
+def _brotli(body: bytes, immutable: bool) -> bytes:
+    quality = settings.compression_immutable_level if immutable else settings.compression_brotli_quality
+    return brotli.compress(body, quality=quality)
+
+
+def _zstd(body: bytes, immutable: bool) -> bytes:
+    level = settings.compression_immutable_level if immutable else settings.compression_zstd_level
+    return zstandard.ZstdCompressor(level=level).compress(body)
+
+
+ENCODERS: Dict[str, Callable[[bytes, bool], bytes]] = {"gzip": _gzip}
+if brotli is not None:
+    ENCODERS["br"] = _brotli
+if zstandard is not None:
+    ENCODERS["zstd"] = _zstd
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Лучшая доступная кодировка по Accept-Encoding (q-значения, "*", q=0 — запрет).
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in ENCODERS:
+            continue
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressedCache:
+    """
+    LRU сжатых тел неизменяемых ответов, ограниченный суммарным размером.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._items.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Tuple[str, str], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+compressed_cache = CompressedCache(settings.compression_cache_max_bytes)
+metrics.register_cache("compressed_responses", compressed_cache.stats)
+
+
+def _compressible(headers: Headers, status: int) -> bool:
+    if status < 200 or status in (204, 206, 304):
+        return False
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _mark_encoded(headers: MutableHeaders) -> None:
+    # представление зависит от Accept-Encoding и не совпадает побайтно с несжатым
+    headers.add_vary_header("Accept-Encoding")
+    etag = headers.get("etag")
+    if etag is not None and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+
+async def _compress(encoding: str, body: bytes, immutable: bool) -> bytes:
+    encoder = ENCODERS[encoding]
+    if len(body) >= _THREADPOOL_MIN_SIZE:
+        return await run_in_threadpool(encoder, body, immutable)
+    return encoder(body, immutable)
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    # 304 повторяет валидатор и Vary сжатого 200 (RFC 9110, 15.4.5)
+                    _mark_encoded(MutableHeaders(raw=message.setdefault("headers", [])))
+                    passthrough = True
+                    await send(message)
+                    return
+                if _compressible(Headers(raw=message.get("headers", [])), message["status"]):
+                    start_message = message
+                else:
+                    passthrough = True
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < settings.compression_minimum_size:
+                # потоковый или маленький ответ — отправляем без изменений
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            etag = headers.get("etag")
+            immutable = etag is not None and "immutable" in headers.get("cache-control", "")
+
+            compressed = compressed_cache.get((etag, encoding)) if immutable else None
+            if compressed is None:
+                compressed = await _compress(encoding, body, immutable)
+                if immutable:
+                    compressed_cache.put((etag, encoding), compressed)
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            _mark_encoded(headers)
+
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -8,6 +8,68 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str
 
+    notifications_page_max: int = 500
+    notifications_retention_days: int = 180
+    notifications_retention_batch_size: int = 1000
+
+    users_page_max: int = 500
+    transcript_page_max: int = 500
+    users_search_min_fuzzy_length: int = 3
+
+    bulk_chunk_size: int = 1000
+    bulk_enroll_max_ids: int = 100_000
+
+    membership_index_max_members: int = 1_000_000
+    membership_index_ttl_seconds: float = 30.0
+
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    health_pool_saturation: float = 0.9
+    metrics_backlog_refresh_seconds: float = 30.0
+
+    profile_dir: str = "profiles"
+    profile_engine: str = "cprofile"
+    profile_sample_rate: float = 0.0
+
+    tracing_enabled: bool = False
+    tracing_sample_rate: float = 1.0
+    tracing_buffer_size: int = 1000
+    tracing_max_spans: int = 2000
+    tracing_statement_max_length: int = 2000
+    tracing_jsonl_path: str | None = None
+
+    batch_max_requests: int = 20
+
+    read_cache_ttl_seconds: float = 5.0
+    read_cache_max_entries: int = 10_000
+    dashboard_cache_ttl_seconds: float = 30.0
+    snapshot_cache_ttl_seconds: float = 3600.0
+    snapshot_cache_max_entries: int = 1000
+
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    compression_immutable_level: int = 9
+    compression_cache_max_bytes: int = 32 * 1024 * 1024
+
+    bulkhead_enabled: bool = True
+    bulkhead_exam_limit: int = 24
+    bulkhead_exam_queue: int = 500
+    bulkhead_exam_timeout: float = 5.0
+    bulkhead_interactive_limit: int = 10
+    bulkhead_interactive_queue: int = 100
+    bulkhead_interactive_timeout: float = 2.0
+    bulkhead_reporting_limit: int = 4
+    bulkhead_reporting_queue: int = 8
+    bulkhead_reporting_timeout: float = 1.0
+    bulkhead_retry_after: int = 2
+
+    query_budget_strict: bool = False
+    query_repeat_threshold: int = 10
+    query_stats_max_statements: int = 500
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -0,0 +1,59 @@
+"""
+Sparse fieldsets: ?fields=id,title на списочных эндпоинтах.
+
+Параметр сужает не только ответ, но и SQL: сервис выбирает только колонки
+запрошенных полей (Core-выборка с метками = имена полей), поэтому широкие
+text/JSONB-колонки не читаются и не декодируются, когда их не просили.
+
+    @router.get("/", response_model=List[TestRead])
+    def api_list(fields: Optional[Fields] = sparse_fields(TestRead), ...):
+        return FastJSONResponse(list_things(db, fields=fields))
+
+    # в сервисе
+    TEST_COLUMNS = {"id": Test.id, "title": Test.title, ...}
+    rows = db.query(*select_columns(TEST_COLUMNS, fields)).filter(...).all()
+    return rows_to_dicts(rows)
+
+Без параметра — все поля модели ответа. Неизвестное поле — 400.
+"""
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Type
+
+from fastapi import Depends, HTTPException, Query, status
+from pydantic import BaseModel
+
+Fields = Tuple[str, ...]
+
+
+def sparse_fields(model: Type[BaseModel]):
+    """
+    Зависимость: ?fields=a,b -> кортеж полей model в порядке модели (None — все поля).
+    """
+    allowed = tuple(model.model_fields)
+
+    def _parse_fields(
+        fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(allowed)}"),
+    ) -> Optional[Fields]:
+        if fields is None:
+            return None
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested.difference(allowed)
+        if unknown or not requested:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown)) or '<empty>'}. Allowed: {', '.join(allowed)}",
+            )
+        return tuple(f for f in allowed if f in requested)
+
+    return Depends(_parse_fields)
+
+
+def select_columns(columns: Mapping[str, Any], fields: Optional[Sequence[str]]) -> List[Any]:
+    """
+    Колонки для query(*...) с метками-именами полей; fields=None — все.
+    """
+    names = columns.keys() if fields is None else fields
+    return [columns[name].label(name) for name in names]
+
+
+def rows_to_dicts(rows) -> List[Dict[str, Any]]:
+    return [dict(row._mapping) for row in rows]
@@ -0,0 +1,76 @@
+"""
+HTTP-валидаторы: ETag / Last-Modified и условные GET (304 Not Modified).
+
+Эндпоинт сначала выполняет обычную проверку доступа, затем:
+    not_modified = conditional(request, response, etag, IMMUTABLE)
+    return not_modified or data
+ETag считается из маркеров версии (id неизменяемой строки, finished_at,
+хэш закэшированного списка) — без сериализации тела.
+
+IMMUTABLE — для ресурсов, которые по построению не меняются (версия вопроса,
+завершённая попытка): браузер не перезапрашивает их вовсе. private — ответы
+зависят от пользователя и не должны оседать в общих прокси-кэшах.
+REVALIDATE — изменяемые ресурсы: каждый раз условный запрос, 304 без тела.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+IMMUTABLE = "private, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # слабое сравнение (RFC 9110): W/"x" совпадает с "x"
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """
+    Проставить валидаторы в ответ; если версия у клиента актуальна — вернуть готовый 304.
+    last_modified — naive UTC (как в моделях).
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    elif last_modified is not None and "if-modified-since" in request.headers:
+        fresh = _not_modified_since(request.headers["if-modified-since"], last_modified)
+    else:
+        fresh = False
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    return None
@@ -0,0 +1,252 @@
+"""
+Метрики процесса в текстовом формате Prometheus (GET /metrics).
+
+Свой маленький реестр без внешних зависимостей:
+- Counter / Gauge / Histogram с метками, обновляются из middleware и пула;
+- коллекторы (register_collector) вызываются при каждом скрейпе — пул, кэши;
+- register_cache(name, stats_fn) — кэш со статистикой {"hits", "misses", ...}.
+"""
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from app.core import query_budget
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+# семейство из коллектора: (имя, тип, описание, [(метки, значение)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, self._labels(key), value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            total[0] += value
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        for key, counts, total in values:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+
+        lines: List[str] = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.documentation}")
+            lines.append(f"# TYPE {m.name} {m.type}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(v)}" for name, labels, v in m.samples())
+
+        # одно семейство (например, app_cache_hits_total) может прийти от нескольких коллекторов
+        families: Dict[str, Family] = {}
+        for collector in collectors:
+            for name, kind, documentation, samples in collector():
+                if name in families:
+                    families[name][3].extend(samples)
+                else:
+                    families[name] = (name, kind, documentation, list(samples))
+
+        for name, kind, documentation, samples in families.values():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(v)}" for labels, v in samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+)
+http_requests_total = registry.register(
+    Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+)
+http_requests_in_flight = registry.register(Gauge("http_requests_in_flight", "HTTP requests being served"))
+db_queries_per_request = registry.register(
+    Histogram("db_queries_per_request", "SQL statements per HTTP request", ("route",), buckets=QUERY_BUCKETS)
+)
+db_pool_checkout_wait = registry.register(
+    Histogram("db_pool_checkout_wait_seconds", "Time to get a connection from the pool", buckets=POOL_WAIT_BUCKETS)
+)
+db_pool_timeouts_total = registry.register(Counter("db_pool_timeouts_total", "Pool checkouts that timed out"))
+
+
+# ---------------- кэши ----------------
+
+def register_cache(name: str, stats_fn: Callable[[], Dict[str, float]]) -> None:
+    """
+    Кэш в метриках: hits/misses — счётчики и hit ratio, остальные ключи stats_fn — gauge
+    app_cache_<ключ>{cache="name"}.
+    """
+    def collect() -> List[Family]:
+        stats = dict(stats_fn())
+        hits, misses = stats.pop("hits", 0), stats.pop("misses", 0)
+        lookups = hits + misses
+        labels = {"cache": name}
+        families = [
+            ("app_cache_hits_total", "counter", "Cache hits", [(labels, hits)]),
+            ("app_cache_misses_total", "counter", "Cache misses", [(labels, misses)]),
+            ("app_cache_hit_ratio", "gauge", "Cache hit ratio since start", [(labels, hits / lookups if lookups else 0.0)]),
+        ]
+        families += [(f"app_cache_{key}", "gauge", f"Cache {key}", [(labels, value)]) for key, value in stats.items()]
+        return families
+
+    registry.register_collector(collect)
+
+
+# ---------------- HTTP ----------------
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "<unmatched>"
+
+
+def _observe_queries(stats: query_budget.QueryStats) -> None:
+    route = stats.route.split(" ", 1)[-1] if stats.route else "<unmatched>"
+    db_queries_per_request.observe(stats.count, route=route)
+
+
+query_budget.observe(_observe_queries)
+
+
+class MetricsMiddleware:
+    """
+    Латентность (до конца тела ответа), статус и число запросов в работе по маршрутам.
+    Маршрут — шаблон пути ("/api/attempts/{attempt_id}"), чтобы не плодить метки.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = _route_label(scope)
+            http_request_duration.observe(time.perf_counter() - started, method=scope["method"], route=route)
+            http_requests_total.inc(method=scope["method"], route=route, status=str(status_code))
@@ -1,6 +1,8 @@
 from fastapi import HTTPException, status
 from typing import Iterable, Mapping
 
+from app.core.tracing import start_span
+
 class Permissions:
     USER_LIST_READ      = "user:list:read"
     USER_FULLNAME_WRITE = "user:fullName:write"
@@ -9,6 +11,7 @@ class Permissions:
     USER_ROLES_WRITE    = "user:roles:write"
     USER_BLOCK_READ     = "user:block:read"
     USER_BLOCK_WRITE    = "user:block:write"
+    USER_SYNC           = "user:sync"
 
     COURSE_INFO_WRITE   = "course:info:write"
     COURSE_TESTLIST     = "course:testList"
@@ -36,6 +39,9 @@ class Permissions:
     ANSWER_READ         = "answer:read"
     ANSWER_UPDATE       = "answer:update"
     ANSWER_DEL          = "answer:del"
+
+    SYSTEM_PROFILE      = "system:profile"
+    SYSTEM_TRACES_READ  = "system:traces:read"
     
 
 ALL_PERMISSIONS = {
@@ -46,6 +52,7 @@ ALL_PERMISSIONS = {
     Permissions.USER_ROLES_WRITE,
     Permissions.USER_BLOCK_READ,
     Permissions.USER_BLOCK_WRITE,
+    Permissions.USER_SYNC,
     Permissions.COURSE_INFO_WRITE,
     Permissions.COURSE_TESTLIST,
     Permissions.COURSE_TEST_READ,
@@ -69,6 +76,8 @@ ALL_PERMISSIONS = {
     Permissions.ANSWER_READ,
     Permissions.ANSWER_UPDATE,
     Permissions.ANSWER_DEL,
+    Permissions.SYSTEM_PROFILE,
+    Permissions.SYSTEM_TRACES_READ,
 }
 
 ROLE_PERMISSIONS: Mapping[str, set[str]] = {
@@ -138,7 +147,11 @@ def ensure_permission(
     user_roles: Iterable[str] | None = None,
 ) -> None:
     """Бросит 403, если у пользователя нет нужного permission."""
-    if not has_permission(user_permissions, permission, user_roles):
+    with start_span("permission.check", permission=permission) as span:
+        allowed = has_permission(user_permissions, permission, user_roles)
+        if span is not None:
+            span.set_attribute("permission.granted", allowed)
+    if not allowed:
         raise PermissionError(detail=msg or f"Missing permission: {permission}")
 
 
@@ -153,7 +166,9 @@ def ensure_default_or_permission(
     Если default_allowed == True — доступ есть по умолчанию.
     Если False — нужно наличие permission, иначе 403.
     """
-    if default_allowed:
-        return
-    if not has_permission(user_permissions, permission, user_roles):
+    with start_span("permission.check", permission=permission, default_allowed=default_allowed) as span:
+        allowed = default_allowed or has_permission(user_permissions, permission, user_roles)
+        if span is not None:
+            span.set_attribute("permission.granted", allowed)
+    if not allowed:
         raise PermissionError(detail=msg or f"Missing permission: {permission}")
@@ -0,0 +1,191 @@
+"""
+Бюджет SQL-запросов на HTTP-запрос и детектор N+1.
+
+- события движка (before/after_cursor_execute) считают запросы и их время
+  в статистике текущего запроса (contextvar; в threadpool контекст копируется);
+- QueryBudgetMiddleware заводит статистику на каждый запрос и перед отправкой
+  ответа проверяет объявленный бюджет и повторы одной и той же формы запроса;
+- бюджет маршрута объявляется зависимостью:
+      @router.get(..., dependencies=[query_budget(6)])
+
+Нарушение пишется в лог, при settings.query_budget_strict — исключение
+(pytest-плагин app.testing.pytest_plugin включает строгий режим).
+В debug-режиме число запросов и их суммарное время отдаются заголовками
+X-Query-Count и X-Query-Time-Ms.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from fastapi import Depends
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_START_KEY = "query_budget_started_at"
+
+# (%(id_1)s, %(id_2)s, ...) и VALUES (...), (...) разной длины — одна форма
+_PARAM_LIST = re.compile(r"\(\s*%\(\w+\)s(?:\s*,\s*%\(\w+\)s)*\s*\)(?:\s*,\s*\(\s*%\(\w+\)s(?:\s*,\s*%\(\w+\)s)*\s*\))*")
+_SPACES = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    statements: List[Tuple[str, float]] = field(default_factory=list)  # (форма, мс) для профилирования
+    route: Optional[str] = None
+    max_queries: Optional[int] = None
+    max_repeats: Optional[int] = None
+
+    def repeated(self) -> List[Tuple[str, int]]:
+        threshold = settings.query_repeat_threshold if self.max_repeats is None else self.max_repeats
+        if not threshold:
+            return []
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+    def violations(self) -> List[str]:
+        problems = []
+        if self.max_queries is not None and self.count > self.max_queries:
+            problems.append(f"{self.count} queries, budget is {self.max_queries}")
+        for shape, n in self.repeated():
+            problems.append(f"statement repeated {n} times (possible N+1): {shape[:200]}")
+        return problems
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_observers: List[Callable[[QueryStats], None]] = []
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def statement_shape(statement: str) -> str:
+    return _PARAM_LIST.sub("(?)", _SPACES.sub(" ", statement).strip())
+
+
+def observe(callback: Callable[[QueryStats], None]) -> None:
+    """
+    Подписка на статистику каждого завершённого запроса (pytest-плагин, бенчмарки).
+    """
+    _observers.append(callback)
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """
+    Посчитать запросы внутри блока без HTTP (сервисы, джобы, тесты).
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+# ---------------- события движка ----------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info[_START_KEY] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.pop(_START_KEY, None)
+    if stats is None or started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    shape = statement_shape(statement)
+
+    stats.count += 1
+    stats.total_ms += elapsed_ms
+    stats.shapes[shape] += 1
+    if len(stats.statements) < settings.query_stats_max_statements:
+        stats.statements.append((shape, elapsed_ms))
+
+
+def instrument(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------- бюджет маршрута ----------------
+
+def query_budget(max_queries: Optional[int] = None, max_repeats: Optional[int] = None):
+    """
+    Зависимость, объявляющая бюджет маршрута.
+      max_queries — максимум запросов (включая загрузку текущего пользователя)
+      max_repeats — порог повторов одной формы; None — settings.query_repeat_threshold,
+                    0 — не проверять (пачечные эндпоинты)
+    """
+    async def _declare_query_budget() -> None:
+        stats = _current.get()
+        if stats is not None:
+            stats.max_queries = max_queries
+            stats.max_repeats = max_repeats
+
+    return Depends(_declare_query_budget)
+
+
+def _route_key(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "<unmatched>"
+    return f"{scope.get('method', '')} {path}"
+
+
+def _report(stats: QueryStats) -> None:
+    problems = stats.violations()
+    if not problems:
+        return
+    message = f"{stats.route}: " + "; ".join(problems)
+    if settings.query_budget_strict:
+        raise QueryBudgetExceeded(message)
+    logger.warning("%s", message)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                stats.route = _route_key(scope)
+                for callback in _observers:
+                    callback(stats)
+                _report(stats)
+                if settings.debug:
+                    headers = MutableHeaders(raw=message.setdefault("headers", []))
+                    headers["X-Query-Count"] = str(stats.count)
+                    headers["X-Query-Time-Ms"] = f"{stats.total_ms:.1f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
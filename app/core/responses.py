@@ -0,0 +1,39 @@
+"""
+Быстрый JSON-ответ по умолчанию (FastAPI(default_response_class=FastJSONResponse)).
+
+orjson сериализует dict/list/datetime/UUID нативно; Decimal отдаётся строкой —
+так же, как его сериализует Pydantic (score: "66.67"), чтобы формат ответа не
+зависел от пути. Без orjson — стандартный json с тем же обработчиком.
+
+Горячие списки (ответы по тесту, вопросы, уведомления) сервисы отдают уже
+готовыми строками-словарями, а эндпоинт возвращает FastJSONResponse(rows)
+напрямую — без повторной поэлементной валидации через response_model
+(модель остаётся в декораторе для OpenAPI).
+"""
+import json
+from decimal import Decimal
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
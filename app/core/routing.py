@@ -0,0 +1,214 @@
+"""
+Класс маршрута для всех роутеров (APIRouter(route_class=InstrumentedRoute)).
+
+Корневой спан трассы запроса — см. app/core/tracing.py.
+Слот bulkhead класса маршрута (app/core/bulkhead.py) занимается до разрешения
+зависимостей и освобождается после формирования ответа.
+
+Профилирование по запросу:
+- заголовок X-Profile: 1 | cprofile | pyinstrument — только для пользователя
+  с permission system:profile (без права заголовок молча игнорируется);
+- либо случайная выборка settings.profile_sample_rate — для любых запросов.
+Профилируется тело эндпоинта (в потоке threadpool для sync-эндпоинтов; у async-эндпоинтов
+cProfile видит и чужие задачи цикла событий — для них лучше pyinstrument).
+В settings.profile_dir сохраняются <id>.pstats (или <id>.html от pyinstrument)
+и <id>.sql.json с SQL-запросами и их временем за весь запрос; id возвращается
+в заголовке X-Profile-Id.
+Без заголовка и при нулевой выборке — только проверка заголовка и contextvar.
+"""
+import cProfile
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core import bulkhead, query_budget, tracing
+from app.core.config import settings
+from app.core.permissions import Permissions, has_permission
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ENGINES = ("cprofile", "pyinstrument")
+
+
+class _ProfileRequest:
+    def __init__(self, engine: str, sampled: bool):
+        self.engine = engine
+        self.sampled = sampled
+        self.profiler = None
+
+    def allowed(self, current_user) -> bool:
+        if self.sampled:
+            return True
+        return current_user is not None and has_permission(
+            current_user.permissions, Permissions.SYSTEM_PROFILE, current_user.roles
+        )
+
+    @contextmanager
+    def profiling(self, is_async: bool):
+        if self.engine == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler(async_mode="enabled" if is_async else "disabled")
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+        self.profiler = profiler
+
+
+_requested: ContextVar[Optional[_ProfileRequest]] = ContextVar("profile_request", default=None)
+
+
+def _requested_profile(request: Request) -> Optional[_ProfileRequest]:
+    value = request.headers.get(PROFILE_HEADER)
+    if value is not None:
+        engine = value if value in PROFILE_ENGINES else settings.profile_engine
+        return _ProfileRequest(engine, sampled=False)
+    if settings.profile_sample_rate and random.random() < settings.profile_sample_rate:
+        return _ProfileRequest(settings.profile_engine, sampled=True)
+    return None
+
+
+def _profiled(call: Callable) -> Callable:
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def profiled_endpoint(*args, **kwargs):
+            req = _requested.get()
+            if req is None or not req.allowed(kwargs.get("current_user")):
+                return await call(*args, **kwargs)
+            with req.profiling(is_async=True):
+                return await call(*args, **kwargs)
+    else:
+        @functools.wraps(call)
+        def profiled_endpoint(*args, **kwargs):
+            req = _requested.get()
+            if req is None or not req.allowed(kwargs.get("current_user")):
+                return call(*args, **kwargs)
+            with req.profiling(is_async=False):
+                return call(*args, **kwargs)
+
+    # FastAPI разбирает параметры по сигнатуре; аннотации вычисляем в модуле эндпоинта
+    # (роутеры с `from __future__ import annotations` хранят их строками)
+    try:
+        profiled_endpoint.__signature__ = inspect.signature(call, eval_str=True)
+    except NameError:
+        pass
+    profiled_endpoint.is_profiled = True
+    return profiled_endpoint
+
+
+def _save_profile(req: _ProfileRequest, request: Request, route_path: str) -> str:
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    base = os.path.join(settings.profile_dir, profile_id)
+    os.makedirs(settings.profile_dir, exist_ok=True)
+
+    if req.engine == "pyinstrument":
+        with open(base + ".html", "w", encoding="utf-8") as f:
+            f.write(req.profiler.output_html())
+    else:
+        req.profiler.dump_stats(base + ".pstats")
+
+    stats = query_budget.current_stats()
+    with open(base + ".sql.json", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "method": request.method,
+                "route": route_path,
+                "path": request.url.path,
+                "sampled": req.sampled,
+                "query_count": stats.count if stats else None,
+                "query_ms": round(stats.total_ms, 3) if stats else None,
+                "statements": [{"sql": sql, "ms": round(ms, 3)} for sql, ms in (stats.statements if stats else [])],
+            },
+            f,
+            indent=2,
+            ensure_ascii=False,
+        )
+    return profile_id
+
+
+class InstrumentedRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not getattr(endpoint, "is_profiled", False):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+        self.bulkhead = bulkhead.for_route(self.dependencies)
+
+    def get_route_handler(self) -> Callable:
+        original_handler = super().get_route_handler()
+
+        async def profiled_handler(request: Request) -> Response:
+            req = _requested_profile(request)
+            if req is None:
+                return await original_handler(request)
+
+            token = _requested.set(req)
+            try:
+                response = await original_handler(request)
+            finally:
+                _requested.reset(token)
+
+            if req.profiler is not None:
+                profile_id = await run_in_threadpool(_save_profile, req, request, self.path)
+                response.headers["X-Profile-Id"] = profile_id
+                logger.info("Saved profile %s for %s %s", profile_id, request.method, self.path)
+            return response
+
+        async def bulkhead_handler(request: Request) -> Response:
+            pool = self.bulkhead
+            if pool is None:
+                return await profiled_handler(request)
+
+            with tracing.start_span("bulkhead.acquire", bulkhead=pool.name):
+                await pool.acquire()
+            try:
+                return await profiled_handler(request)
+            finally:
+                pool.release()
+
+        async def instrumented_handler(request: Request) -> Response:
+            scope = tracing.start_trace(
+                f"{request.method} {self.path}",
+                traceparent=request.headers.get("traceparent"),
+                **{"http.method": request.method, "http.route": self.path, "url.path": request.url.path},
+            )
+            if scope is None:
+                return await bulkhead_handler(request)
+
+            try:
+                with scope as root:
+                    try:
+                        response = await bulkhead_handler(request)
+                    except HTTPException as exc:
+                        root.set_attribute("http.status_code", exc.status_code)
+                        raise
+                    root.set_attribute("http.status_code", response.status_code)
+                    response.headers["X-Trace-Id"] = root.trace.trace_id
+                    return response
+            finally:
+                await run_in_threadpool(tracing.export, scope.span.trace)
+
+        return instrumented_handler
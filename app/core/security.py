@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from pydantic import BaseModel
@@ -10,6 +10,9 @@ from sqlalchemy.orm import Session
 
 auth_scheme = HTTPBearer()
 
+# пользователь, уже аутентифицированный пакетом POST /api/batch (app/core/batch.py)
+BATCH_USER = "batch_user"
+
 
 class CurrentUser(BaseModel):
     id: int
@@ -22,9 +25,14 @@ class CurrentUser(BaseModel):
 
 
 def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(auth_scheme),
     db: Session = Depends(get_db),
 ) -> CurrentUser:
+    batch_user = getattr(request.state, BATCH_USER, None)
+    if batch_user is not None:
+        return batch_user
+
     token = credentials.credentials
 
     try:
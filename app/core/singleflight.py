@@ -0,0 +1,113 @@
+"""
+Single-flight + короткий TTL-кэш для горячих одинаковых чтений.
+
+Одновременные запросы с одним ключом ждут одно вычисление (лидер — первый
+пришедший поток), результат затем живёт в кэше ttl_seconds. Ключ — кортеж
+параметров запроса; авторизация выполняется ДО обращения к кэшу, поэтому в ключ
+входит только то, от чего зависят данные (для одинаково разрешённых запросов
+ответ одинаков).
+
+Хранить нужно готовые к сериализации значения (dict/list), а не ORM-объекты —
+результат разделяется между сессиями и потоками.
+
+invalidate(prefix) удаляет записи и «отцепляет» идущие вычисления с этим префиксом:
+они доотдадут результат своим ждущим, но в кэш его не положат, а новые запросы
+начнут свежее вычисление. Инвалидация локальна для процесса: другие воркеры
+увидят изменение не позже чем через ttl_seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlightCache:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._flights: Dict[Tuple, _Flight] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: Tuple[Hashable, ...], compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                # после invalidate() вычисление уже отцеплено — в кэш не кладём
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                    if flight.error is None:
+                        self._store(key, flight.result)
+            flight.done.set()
+        return flight.result
+
+    def _store(self, key: Tuple, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *prefix: Hashable) -> None:
+        n = len(prefix)
+        with self._lock:
+            for key in [k for k in self._entries if k[:n] == prefix]:
+                del self._entries[key]
+            for key in [k for k in self._flights if k[:n] == prefix]:
+                del self._flights[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._flights.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "in_flight": len(self._flights),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
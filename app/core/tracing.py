@@ -0,0 +1,303 @@
+"""
+Локальная трассировка без внешнего коллектора.
+
+Дерево спанов на запрос:
+  SERVER   "METHOD /route"          — InstrumentedRoute (app/core/routing.py)
+  INTERNAL "attempts.create_attempt" — сервисные функции с @traced
+  INTERNAL "permission.check"        — ensure_permission / ensure_default_or_permission
+  CLIENT   "SELECT" / "INSERT" ...   — каждый SQL-запрос (события движка)
+
+Структура спанов — OTLP/JSON (traceId, spanId, parentSpanId, kind, *UnixNano,
+attributes, status), входящий W3C traceparent продолжает внешнюю трассу.
+Экспорт: кольцевой буфер последних трасс (GET /api/system/traces) и, если задан
+settings.tracing_jsonl_path, JSON-lines файл (по строке resourceSpans на трассу).
+Вне трассы (tracing_enabled=False или запрос не попал в выборку) каждая точка —
+одно чтение contextvar.
+"""
+import functools
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_SPAN_KEY = "tracing_span"
+_NULL_SCOPE = nullcontext()
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    __slots__ = (
+        "trace", "name", "kind", "span_id", "parent_span_id", "start_ns", "end_ns",
+        "attributes", "status", "status_message", "events",
+    )
+
+    def __init__(self, trace: "Trace", name: str, kind: str, parent_span_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.span_id = _new_id(64)
+        self.parent_span_id = parent_span_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = "UNSET"
+        self.status_message = ""
+        self.events: List[dict] = []
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status = "ERROR"
+        self.status_message = message
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.events.append(
+            {
+                "timeUnixNano": str(time.time_ns()),
+                "name": "exception",
+                "attributes": [
+                    {"key": "exception.type", "value": _otlp_value(type(exc).__name__)},
+                    {"key": "exception.message", "value": _otlp_value(str(exc))},
+                ],
+            }
+        )
+        # HTTPException 4xx — ожидаемый отказ (403, 404), не ошибка спана
+        status_code = getattr(exc, "status_code", None)
+        if status_code is None or status_code >= 500:
+            self.set_error(type(exc).__name__)
+
+    def end(self) -> None:
+        if not self.end_ns:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": f"SPAN_KIND_{self.kind}",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": f"STATUS_CODE_{self.status}", "message": self.status_message},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.events:
+            span["events"] = self.events
+        return span
+
+
+class Trace:
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or _new_id(128)
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self.root: Optional[Span] = None
+
+    def new_span(self, name: str, kind: str, parent: Optional[Span], attributes: Dict[str, Any], parent_span_id: Optional[str] = None) -> Span:
+        span = Span(self, name, kind, parent.span_id if parent else parent_span_id, attributes)
+        if len(self.spans) < settings.tracing_max_spans:
+            self.spans.append(span)
+        else:
+            self.dropped_spans += 1
+        return span
+
+    def summary(self) -> dict:
+        root = self.root
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "started_at_unix_nano": str(root.start_ns),
+            "duration_ms": round(root.duration_ms, 3),
+            "status": root.status,
+            "http_status_code": root.attributes.get("http.status_code"),
+            "span_count": len(self.spans),
+            "dropped_spans": self.dropped_spans,
+        }
+
+    def to_otlp(self) -> dict:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [{"key": "service.name", "value": _otlp_value(settings.app_name)}]},
+                    "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": [s.to_otlp() for s in self.spans]}],
+                }
+            ]
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class _SpanScope:
+    __slots__ = ("span", "token")
+
+    def __init__(self, span: Span):
+        self.span = span
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.span.record_exception(exc)
+        self.span.end()
+        _current_span.reset(self.token)
+
+
+def start_span(name: str, kind: str = "INTERNAL", **attributes):
+    """
+    with start_span("name", key=value) as span: ...
+    Вне трассы — общий nullcontext, span is None.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return _NULL_SCOPE
+    return _SpanScope(parent.trace.new_span(name, kind, parent, attributes))
+
+
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes) -> Optional[_SpanScope]:
+    """
+    Корневой SERVER-спан запроса или None, если трассировка выключена / не попали в выборку.
+    """
+    if not settings.tracing_enabled:
+        return None
+    if settings.tracing_sample_rate < 1.0 and random.random() >= settings.tracing_sample_rate:
+        return None
+
+    match = _TRACEPARENT.match(traceparent or "")
+    trace = Trace(match.group(1) if match else None)
+    trace.root = trace.new_span(name, "SERVER", None, attributes, parent_span_id=match.group(2) if match else None)
+    return _SpanScope(trace.root)
+
+
+def traced(func: Callable = None, *, name: Optional[str] = None) -> Callable:
+    """
+    Декоратор сервисной функции: INTERNAL-спан "<модуль>.<функция>".
+    """
+    if func is None:
+        return functools.partial(traced, name=name)
+
+    span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return func(*args, **kwargs)
+        with start_span(span_name, **{"code.namespace": func.__module__, "code.function": func.__name__}):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+# ---------------- SQL ----------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    conn.info[_SPAN_KEY] = parent.trace.new_span(
+        operation,
+        "CLIENT",
+        parent,
+        {
+            "db.system": "postgresql",
+            "db.operation": operation,
+            "db.statement": statement[: settings.tracing_statement_max_length],
+        },
+    )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = conn.info.pop(_SPAN_KEY, None)
+    if span is not None:
+        span.set_attribute("db.rowcount", cursor.rowcount)
+        span.end()
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    span = conn.info.pop(_SPAN_KEY, None) if conn is not None else None
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.end()
+
+
+def instrument(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+# ---------------- экспорт ----------------
+
+class TraceBuffer:
+    """
+    Последние N завершённых трасс в памяти процесса.
+    """
+
+    def __init__(self, size: int):
+        self._traces: Deque[Trace] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+
+    def list(self) -> List[Trace]:
+        with self._lock:
+            return list(reversed(self._traces))
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return next((t for t in self._traces if t.trace_id == trace_id), None)
+
+
+trace_buffer = TraceBuffer(settings.tracing_buffer_size)
+_file_lock = threading.Lock()
+
+
+def export(trace: Trace) -> None:
+    trace_buffer.add(trace)
+    if settings.tracing_jsonl_path:
+        line = json.dumps(trace.to_otlp(), ensure_ascii=False)
+        with _file_lock, open(settings.tracing_jsonl_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
@@ -0,0 +1,172 @@
+"""
+Проверка планов горячих запросов через EXPLAIN.
+
+Каждый запрос повторяет выборку из сервиса; для него задаётся индекс, который
+должен попасть в план, и таблицы, по которым запрещён последовательный скан.
+
+Запуск на локальной базе (--seed заполнит пустую базу синтетическими данными):
+    python -m app.db.explain [--seed]
+Код выхода 1, если хотя бы один план не прошёл проверку.
+"""
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.models.answers import Answer
+from app.models.attempts import Attempt
+from app.models.course_users import CourseUser
+from app.models.notifications import Notification
+from app.models.questions import Question
+from app.models.tests import Test
+
+LARGE_TABLES = ("users", "course_users", "attempts", "attempt_questions", "answers", "notifications", "question_versions")
+
+
+@dataclass
+class PlanCheck:
+    name: str
+    build: Callable[[Session], object]
+    expect_index: Optional[Sequence[str]] = None  # хотя бы один из индексов
+    forbid_seq_scan: Sequence[str] = LARGE_TABLES
+
+
+def _sample(db: Session, sql: str) -> int:
+    value = db.execute(text(sql)).scalar()
+    if value is None:
+        raise RuntimeError(f"No sample row for: {sql}")
+    return value
+
+
+HOT_QUERIES: List[PlanCheck] = [
+    PlanCheck(
+        "attempts.create_attempt.in_progress",
+        lambda db: select(Attempt).where(
+            Attempt.test_id == _sample(db, "SELECT test_id FROM attempts LIMIT 1"),
+            Attempt.user_id == _sample(db, "SELECT user_id FROM attempts LIMIT 1"),
+            Attempt.status == "in_progress",
+        ).limit(1),
+        expect_index=("ix_attempts_test_user_status",),
+    ),
+    PlanCheck(
+        "tests.list_test_grades",
+        lambda db: select(Attempt).where(
+            Attempt.test_id == _sample(db, "SELECT test_id FROM attempts LIMIT 1"),
+            Attempt.status == "finished",
+        ).order_by(Attempt.finished_at.desc()),
+        expect_index=("ix_attempts_test_user_status", "ix_attempts_test_id"),
+    ),
+    PlanCheck(
+        "answers.by_attempt_question",
+        lambda db: select(Answer).where(
+            Answer.attempt_id == _sample(db, "SELECT attempt_id FROM answers LIMIT 1"),
+            Answer.question_id == _sample(db, "SELECT question_id FROM answers LIMIT 1"),
+        ),
+        # (attempt_id, question_id) — префикс уникального индекса
+        expect_index=("uq_answers_attempt_question",),
+    ),
+    PlanCheck(
+        "notifications.list_my_notifications",
+        lambda db: select(Notification).where(
+            Notification.user_id == _sample(db, "SELECT user_id FROM notifications LIMIT 1"),
+        ).order_by(Notification.created_at.asc(), Notification.id.asc()).limit(100),
+        expect_index=("ix_notifications_user_created",),
+    ),
+    PlanCheck(
+        "course_users.by_user",
+        lambda db: select(func.count()).select_from(CourseUser).where(
+            CourseUser.user_id == _sample(db, "SELECT user_id FROM course_users LIMIT 1"),
+        ),
+        expect_index=("ix_course_users_user_id",),
+    ),
+    PlanCheck(
+        "courses.list_course_tests",
+        lambda db: select(Test).where(
+            Test.course_id == _sample(db, "SELECT course_id FROM tests LIMIT 1"),
+            Test.is_deleted == False,  # noqa: E712
+        ),
+        expect_index=("ix_tests_course_not_deleted", "ix_tests_course_id"),
+        forbid_seq_scan=LARGE_TABLES + ("tests",),
+    ),
+    PlanCheck(
+        "questions.by_author",
+        lambda db: select(Question).where(
+            Question.author_id == _sample(db, "SELECT author_id FROM questions LIMIT 1"),
+            Question.is_deleted == False,  # noqa: E712
+        ),
+        expect_index=("ix_questions_author_not_deleted",),
+        forbid_seq_scan=LARGE_TABLES + ("questions",),
+    ),
+]
+
+
+# ---------------- разбор плана ----------------
+
+def explain(db: Session, stmt) -> dict:
+    sql = stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    raw = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    return raw[0]["Plan"]
+
+
+def iter_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iter_nodes(child)
+
+
+def plan_problems(plan: dict, check: PlanCheck) -> List[str]:
+    nodes = list(iter_nodes(plan))
+    problems = []
+
+    for node in nodes:
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in check.forbid_seq_scan:
+            problems.append(f"sequential scan on {node['Relation Name']}")
+
+    if check.expect_index:
+        used = {node.get("Index Name") for node in nodes if node.get("Index Name")}
+        if not used.intersection(check.expect_index):
+            problems.append(f"expected one of {list(check.expect_index)}, used {sorted(used) or 'no index'}")
+
+    return problems
+
+
+def run_checks(db: Session, checks: Sequence[PlanCheck] = HOT_QUERIES) -> dict:
+    """
+    Возвращает {имя запроса: [проблемы]}; пустой список — план в порядке.
+    """
+    return {check.name: plan_problems(explain(db, check.build(db)), check) for check in checks}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from app.db.seed import SeedConfig, seed
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="seed an empty database with synthetic data first")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.seed:
+            seed(db, SeedConfig())
+        results = run_checks(db)
+    finally:
+        db.close()
+
+    failed = 0
+    for name, problems in results.items():
+        print(f"{'FAIL' if problems else 'ok  '} {name}")
+        for p in problems:
+            print(f"     - {p}")
+        failed += bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
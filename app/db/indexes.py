@@ -0,0 +1,63 @@
+"""
+Создание индексов, объявленных в моделях, на уже существующей базе.
+
+Запуск (идемпотентно, индексы строятся CONCURRENTLY и не блокируют запись):
+    python -m app.db.indexes
+"""
+import logging
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from app import models  # noqa: F401  регистрирует все таблицы в Base.metadata
+from app.db.base import Base
+from app.models.course_notifications import CourseNotification  # noqa: F401
+from app.models.notifications import Notification  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_EXTENSIONS = ("pg_trgm",)
+
+
+def missing_indexes(engine: Engine) -> List:
+    insp = inspect(engine)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+        missing.extend(ix for ix in sorted(table.indexes, key=lambda i: i.name) if ix.name not in existing)
+    return missing
+
+
+def ensure_indexes(engine: Engine) -> List[str]:
+    """
+    Создать недостающие индексы. Возвращает имена созданных.
+    """
+    created = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for ext in REQUIRED_EXTENSIONS:
+            conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {ext}"))
+
+        for ix in missing_indexes(engine):
+            ddl = str(CreateIndex(ix).compile(dialect=engine.dialect))
+            ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY IF NOT EXISTS", 1)
+            ddl = ddl.replace("CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS", 1)
+            logger.info("%s", ddl)
+            conn.execute(text(ddl))
+            created.append(ix.name)
+    return created
+
+
+def main() -> None:
+    from app.db.session import engine
+
+    logging.basicConfig(level=logging.INFO)
+    created = ensure_indexes(engine)
+    logger.info("Created %d indexes: %s", len(created), ", ".join(created) or "-")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Пул соединений с замером ожидания и его состояние для /metrics и /health/ready.
+"""
+import time
+from typing import Dict
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.core import metrics
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    QueuePool, который пишет время выдачи соединения (ожидание свободного
+    + установка нового) в гистограмму db_pool_checkout_wait_seconds.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.db_pool_timeouts_total.inc()
+            raise
+        finally:
+            metrics.db_pool_checkout_wait.observe(time.perf_counter() - started)
+
+
+def pool_status(pool: QueuePool, max_overflow: int) -> Dict[str, float]:
+    size = pool.size()
+    checked_out = pool.checkedout()
+    capacity = size + max_overflow
+    return {
+        "size": size,
+        "checked_in": pool.checkedin(),
+        "checked_out": checked_out,
+        # overflow() отрицателен, пока открыто меньше pool_size соединений
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": max_overflow,
+        "saturation": checked_out / capacity if capacity else 1.0,
+    }
+
+
+def pool_collector(pool: QueuePool, max_overflow: int):
+    def collect():
+        status = pool_status(pool, max_overflow)
+        return [
+            (f"db_pool_{key}", "gauge", f"Connection pool {key.replace('_', ' ')}", [({}, value)])
+            for key, value in status.items()
+        ]
+
+    return collect
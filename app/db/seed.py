@@ -0,0 +1,123 @@
+"""
+Синтетический набор данных для локальной проверки планов запросов и нагрузочных прогонов.
+
+Заполняет ПУСТУЮ базу set-based запросами (generate_series), без ORM:
+пользователи, курсы с записанными студентами, тесты, банк вопросов с версиями,
+завершённые попытки с ответами и уведомления.
+"""
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.services.counters import reconcile_counters
+
+
+@dataclass
+class SeedConfig:
+    users: int = 20_000
+    teachers: int = 200
+    courses: int = 200
+    students_per_course: int = 100
+    tests_per_course: int = 5
+    questions_per_test: int = 20
+    versions_per_question: int = 2
+    finished_attempts_per_test: int = 50
+    notifications_per_user: int = 20
+
+
+SEED_SQL = [
+    # пользователи 1..teachers — преподаватели, остальные — студенты
+    """
+    INSERT INTO users (id, username, full_name, email, is_blocked, roles)
+    SELECT g, 'user' || g, 'User ' || g, 'user' || g || '@example.com', false,
+           CASE WHEN g <= :teachers THEN ARRAY['teacher'] ELSE ARRAY['student'] END::varchar[]
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO courses (id, title, description, teacher_id, is_deleted)
+    SELECT c, 'Course ' || c, 'Synthetic course ' || c, 1 + (c % :teachers), false
+    FROM generate_series(1, :courses) c
+    """,
+    """
+    INSERT INTO course_users (course_id, user_id, enrolled_at)
+    SELECT c, :teachers + 1 + ((c * :students_per_course + k) % (:users - :teachers)), now() - interval '30 days'
+    FROM generate_series(1, :courses) c, generate_series(0, :students_per_course - 1) k
+    """,
+    """
+    INSERT INTO tests (id, course_id, title, is_active, is_deleted)
+    SELECT t, 1 + (t - 1) / :tests_per_course, 'Test ' || t, true, false
+    FROM generate_series(1, :courses * :tests_per_course) t
+    """,
+    # вопрос q принадлежит тесту 1 + (q - 1) / questions_per_test
+    """
+    INSERT INTO questions (id, author_id, is_deleted)
+    SELECT q, 1 + ((1 + (q - 1) / (:questions_per_test * :tests_per_course)) % :teachers), false
+    FROM generate_series(1, :courses * :tests_per_course * :questions_per_test) q
+    """,
+    """
+    INSERT INTO question_versions (id, question_id, version, title, text, options, correct_index)
+    SELECT (q - 1) * :versions_per_question + v, q, v, 'Question ' || q,
+           'Synthetic question ' || q || ' version ' || v || ' ' || repeat('lorem ipsum ', 20),
+           '["alpha", "beta", "gamma", "delta"]'::jsonb, (q + v) % 4
+    FROM generate_series(1, :courses * :tests_per_course * :questions_per_test) q,
+         generate_series(1, :versions_per_question) v
+    """,
+    """
+    INSERT INTO test_questions (test_id, question_id, position)
+    SELECT t, (t - 1) * :questions_per_test + p + 1, p
+    FROM generate_series(1, :courses * :tests_per_course) t, generate_series(0, :questions_per_test - 1) p
+    """,
+    """
+    INSERT INTO attempts (id, user_id, test_id, status, started_at, finished_at, score)
+    SELECT (t - 1) * :finished_attempts_per_test + k + 1,
+           :teachers + 1 + (((1 + (t - 1) / :tests_per_course) * :students_per_course + k) % (:users - :teachers)),
+           t, 'finished', now() - interval '10 days', now() - interval '10 days' + interval '40 minutes',
+           round((random() * 100)::numeric, 2)
+    FROM generate_series(1, :courses * :tests_per_course) t, generate_series(0, :finished_attempts_per_test - 1) k
+    """,
+    """
+    INSERT INTO attempt_questions (attempt_id, question_id, question_version_id, position)
+    SELECT a.id, tq.question_id, (tq.question_id - 1) * :versions_per_question + :versions_per_question, tq.position
+    FROM attempts a JOIN test_questions tq ON tq.test_id = a.test_id
+    """,
+    """
+    INSERT INTO answers (attempt_id, question_id, question_version_id, value)
+    SELECT aq.attempt_id, aq.question_id, aq.question_version_id, floor(random() * 4)::int
+    FROM attempt_questions aq
+    """,
+    """
+    INSERT INTO notifications (user_id, message, payload, created_at, read_at)
+    SELECT u, 'Notification ' || n, jsonb_build_object('type', 'synthetic', 'n', n),
+           now() - (n || ' hours')::interval,
+           CASE WHEN n > 3 THEN now() ELSE NULL END
+    FROM generate_series(1, :users) u, generate_series(1, :notifications_per_user) n
+    """,
+]
+
+SEQUENCE_TABLES = ("courses", "tests", "questions", "question_versions", "attempts", "answers", "notifications")
+
+
+def seed(db: Session, config: SeedConfig) -> None:
+    """
+    Заполнить пустую базу. Отказывается работать, если в users уже есть строки.
+    """
+    if db.execute(text("SELECT EXISTS (SELECT 1 FROM users)")).scalar():
+        raise RuntimeError("Refusing to seed a non-empty database")
+
+    params = asdict(config)
+    for sql in SEED_SQL:
+        db.execute(text(sql), params)
+
+    for table in SEQUENCE_TABLES:
+        db.execute(
+            text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 0) + 1, false) FROM {table}")
+        )
+    db.commit()
+
+    reconcile_counters(db)
+
+    for table in Base.metadata.sorted_tables:
+        db.execute(text(f"ANALYZE {table.name}"))
+    db.commit()
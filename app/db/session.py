@@ -1,13 +1,24 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
 from app import models
+from app.core import metrics, tracing
 from app.core.config import settings
+from app.core.query_budget import instrument
+from app.db.pool import MeteredQueuePool, pool_collector
 
 engine = create_engine(
     settings.database_url,
     future=True,
     echo=settings.debug,
+    poolclass=MeteredQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
 )
+instrument(engine)
+tracing.instrument(engine)
+metrics.registry.register_collector(pool_collector(engine.pool, settings.db_max_overflow))
 
 SessionLocal = sessionmaker(
     bind=engine,
@@ -16,9 +27,19 @@ SessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
-def get_db():
+# общая сессия под-запросов POST /api/batch (app/core/batch.py)
+BATCH_DB = "batch_db"
+
+
+def get_db(request: Request):
     from sqlalchemy.orm import Session
 
+    shared = getattr(request.state, BATCH_DB, None)
+    if shared is not None:
+        # закрывает её сам пакет
+        yield shared
+        return
+
     db: Session = SessionLocal()
     try:
         yield db
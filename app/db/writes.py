@@ -0,0 +1,24 @@
+"""
+Запись одной строкой SQL: INSERT/UPDATE ... RETURNING.
+
+Сессия создаётся с expire_on_commit=False, серверных значений по умолчанию в моделях
+нет (кроме счётчиков, для которых есть и питоновский default), поэтому объект,
+полученный из RETURNING, актуален и после commit — db.refresh() не нужен.
+"""
+from typing import Optional, Type, TypeVar
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+M = TypeVar("M")
+
+
+def insert_returning(db: Session, model: Type[M], **values) -> M:
+    """INSERT ... RETURNING *; объект попадает в identity map сессии."""
+    return db.scalars(insert(model).values(**values).returning(model)).one()
+
+
+def update_returning(db: Session, model: Type[M], pk, **values) -> Optional[M]:
+    """UPDATE ... WHERE id = pk RETURNING *; None, если строки нет."""
+    stmt = update(model).where(model.id == pk).values(**values).returning(model)
+    return db.scalars(stmt).one_or_none()
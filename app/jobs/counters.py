@@ -0,0 +1,38 @@
+"""
+Сверка денормализованных счётчиков с исходными таблицами.
+
+    python -m app.jobs.counters
+
+Обязательный шаг деплоя: до переключения трафика на новую версию добавляет
+недостающие колонки счётчиков и заполняет их (проверки вроде «у теста уже есть
+попытки» читают только счётчик), после переключения — ещё раз, для записей
+старой версии. Дальше — по расписанию (cron/k8s CronJob).
+"""
+import logging
+
+from app.db.session import SessionLocal
+from app.services.counters import ensure_counter_columns, reconcile_counters
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+
+    db = SessionLocal()
+    try:
+        added = ensure_counter_columns(db)
+        fixed = reconcile_counters(db)
+    finally:
+        db.close()
+
+    for name in added:
+        logger.info("Counter column %s added, backfilling", name)
+    for name, rows in fixed.items():
+        if rows and name not in added:
+            logger.warning("Counter %s drifted, repaired %d rows", name, rows)
+    logger.info("Counters reconciled: %s", fixed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Очистка старых уведомлений (retention).
+
+Запуск по расписанию (cron/k8s CronJob):
+    python -m app.jobs.notifications
+"""
+import logging
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.notifications import purge_expired_notifications
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    cutoff = datetime.utcnow() - timedelta(days=settings.notifications_retention_days)
+
+    db = SessionLocal()
+    try:
+        deleted = purge_expired_notifications(db, cutoff, settings.notifications_retention_batch_size)
+    finally:
+        db.close()
+
+    logger.info("Deleted %d notifications created before %s", deleted, cutoff.isoformat())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Заранее создать попытки для тестов, активированных с preprovision=true.
+
+Запуск по расписанию (cron/k8s CronJob) до начала экзамена или сразу после активации:
+    python -m app.jobs.preprovision [--test-id ID]
+"""
+import argparse
+import logging
+from typing import Optional, Sequence
+
+from app.db.session import SessionLocal
+from app.services.preprovision import provision_all
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--test-id", type=int, default=None, help="only this test")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    db = SessionLocal()
+    try:
+        created = provision_all(db, test_id=args.test_id)
+    finally:
+        db.close()
+
+    for test_id, count in created.items():
+        logger.info("Test %d: provisioned %d attempts", test_id, count)
+    logger.info("Provisioned %d attempts for %d tests", sum(created.values()), len(created))
+
+
+if __name__ == "__main__":
+    main()
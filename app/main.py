@@ -1,10 +1,18 @@
 from fastapi import FastAPI
-from app.api.routers import users, courses, tests, questions, attempts, answers, notifications
+from app.api.routers import users, courses, tests, questions, attempts, answers, notifications, health, system, batch, dashboard
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.core.query_budget import QueryBudgetMiddleware
+from app.core.responses import FastJSONResponse
 from app import models
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title=settings.app_name)
+app = FastAPI(title=settings.app_name, default_response_class=FastJSONResponse)
+
+app.add_middleware(QueryBudgetMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,4 +31,8 @@ app.include_router(tests.router)
 app.include_router(questions.router)
 app.include_router(attempts.router)
 app.include_router(answers.router)
-app.include_router(notifications.router)
\ No newline at end of file
+app.include_router(notifications.router)
+app.include_router(health.router)
+app.include_router(system.router)
+app.include_router(batch.router)
+app.include_router(dashboard.router)
@@ -8,14 +8,18 @@ from .course_users import CourseUser
 from .attempts_questions import AttemptQuestion
 from .test_questions import TestQuestion
 from .question_versions import QuestionVersion
+from .course_notifications import CourseNotification
+from .snapshots import TestSnapshot
 
 __all__ = [
     "User",
     "Course",
     "CourseUser",
+    "CourseNotification",
     "AttemptQuestion",
     "QuestionVersion",
     "TestQuestion",
+    "TestSnapshot",
     "Test",
     "Question",
     "Attempt",
@@ -1,5 +1,5 @@
 from app.db.base import Base
-from sqlalchemy import Column, BigInteger, ForeignKey, DateTime, String, Numeric
+from sqlalchemy import Column, BigInteger, ForeignKey, DateTime, Index, String, Numeric
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -13,6 +13,8 @@ class Attempt(Base):
     started_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     finished_at = Column(DateTime, nullable=True)
     score = Column(Numeric, nullable=True)
+    # NULL — попытка создана до появления снимков
+    snapshot_id = Column(BigInteger, ForeignKey("test_snapshots.id"), nullable=True)
 
     user = relationship("User", back_populates="attempts")
     test = relationship("Test", back_populates="attempts")
@@ -28,4 +30,11 @@ class Attempt(Base):
         "Answer",
         back_populates="attempt",
         cascade="all, delete-orphan",
-    )
\ No newline at end of file
+    )
+
+    __table_args__ = (
+        # проверка активной попытки в create_attempt, выборки результатов по тесту
+        Index("ix_attempts_test_user_status", "test_id", "user_id", "status"),
+        # транскрипт пользователя: keyset по (finished_at, id) внутри user_id
+        Index("ix_attempts_user_finished", "user_id", "finished_at", "id"),
+    )
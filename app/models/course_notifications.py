@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, Text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+
+
+class CourseNotification(Base):
+    """
+    Широковещательное уведомление курса: хранится один раз на событие,
+    к пользователям «раскладывается» при чтении через course_users.
+    """
+    __tablename__ = "course_notifications"
+
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(BigInteger, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
+    message = Column(Text, nullable=False)
+
+    payload = Column(JSONB, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    course = relationship("Course", back_populates="notifications")
+
+    __table_args__ = (
+        Index("ix_course_notifications_course_created", "course_id", "created_at"),
+    )
@@ -1,6 +1,6 @@
 from app.db.base import Base
 from datetime import datetime
-from sqlalchemy import Column, BigInteger, ForeignKey, DateTime
+from sqlalchemy import Column, BigInteger, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 
 class CourseUser(Base):
@@ -18,5 +18,14 @@ class CourseUser(Base):
     )
     enrolled_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
+    # водяные знаки для широковещательных уведомлений курса (course_notifications)
+    notifications_read_at = Column(DateTime, nullable=True)
+    notifications_cleared_at = Column(DateTime, nullable=True)
+
     course = relationship("Course", back_populates="students_links")
-    user = relationship("User", back_populates="course_links")
\ No newline at end of file
+    user = relationship("User", back_populates="course_links")
+
+    __table_args__ = (
+        # курсы пользователя (PK начинается с course_id и здесь не помогает)
+        Index("ix_course_users_user_id", "user_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Text, BigInteger, ForeignKey
+from sqlalchemy import Boolean, Column, Text, BigInteger, ForeignKey, Index, Integer, text
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -11,6 +11,10 @@ class Course(Base):
     teacher_id = Column(BigInteger, ForeignKey("users.id"), nullable=False)
     is_deleted = Column(Boolean, nullable=False, default=False)
 
+    # денормализованные счётчики, поддерживаются app/services/counters.py
+    student_count = Column(Integer, nullable=False, default=0, server_default="0")
+    test_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     teacher = relationship("User", back_populates="courses_taught")
 
     students_links = relationship(
@@ -23,4 +27,14 @@ class Course(Base):
         "Test",
         back_populates="course",
         cascade="all, delete-orphan",
-    )
\ No newline at end of file
+    )
+
+    notifications = relationship(
+        "CourseNotification",
+        back_populates="course",
+        cascade="all, delete-orphan",
+    )
+
+    __table_args__ = (
+        Index("ix_courses_not_deleted", "id", postgresql_where=text("is_deleted = false")),
+    )
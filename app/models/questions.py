@@ -1,5 +1,5 @@
 from app.db.base import Base
-from sqlalchemy import Column, BigInteger, ForeignKey, Boolean
+from sqlalchemy import Column, BigInteger, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 
 class Question(Base):
@@ -32,3 +32,7 @@ class Question(Base):
         "Answer",
         back_populates="question",
     )
+
+    __table_args__ = (
+        Index("ix_questions_author_not_deleted", "author_id", postgresql_where=text("is_deleted = false")),
+    )
@@ -0,0 +1,25 @@
+from app.db.base import Base
+from sqlalchemy import Column, BigInteger, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+
+class TestSnapshot(Base):
+    """
+    Неизменяемый снимок теста на момент активации («сессия» прохождения).
+
+    questions  — [[question_id, question_version_id], ...] в порядке позиций;
+    answer_key — [correct_index, ...] в том же порядке.
+    Снимок только создаётся (app/services/snapshots.py), поэтому его можно кэшировать без TTL.
+    """
+    __tablename__ = "test_snapshots"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    test_id = Column(
+        BigInteger,
+        ForeignKey("tests.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    questions = Column(JSONB, nullable=False)
+    answer_key = Column(JSONB, nullable=False)
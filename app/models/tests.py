@@ -1,5 +1,5 @@
 from app.db.base import Base
-from sqlalchemy import Column, BigInteger, ForeignKey, Boolean, Text
+from sqlalchemy import Column, BigInteger, ForeignKey, Boolean, Index, Integer, Text, text
 from sqlalchemy.orm import relationship
 
 class Test(Base):
@@ -15,6 +15,18 @@ class Test(Base):
     title = Column(Text, nullable=False)
     is_active = Column(Boolean, nullable=False, default=False)
     is_deleted = Column(Boolean, nullable=False, default=False)
+    # попытки студентам создаёт заранее app/jobs/preprovision.py
+    preprovision = Column(Boolean, nullable=False, default=False, server_default="false")
+
+    # снимок, по которому создаются попытки, пока тест активен (app/services/snapshots.py)
+    active_snapshot_id = Column(
+        BigInteger,
+        ForeignKey("test_snapshots.id", use_alter=True, name="fk_tests_active_snapshot_id"),
+        nullable=True,
+    )
+
+    # денормализованный счётчик, поддерживается app/services/counters.py
+    attempt_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     course = relationship("Course", back_populates="tests")
 
@@ -29,4 +41,8 @@ class Test(Base):
         "Attempt",
         back_populates="test",
         cascade="all, delete-orphan",
-    )
\ No newline at end of file
+    )
+
+    __table_args__ = (
+        Index("ix_tests_course_not_deleted", "course_id", postgresql_where=text("is_deleted = false")),
+    )
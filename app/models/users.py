@@ -1,4 +1,4 @@
-from sqlalchemy import ARRAY, Boolean, Column, Integer, String
+from sqlalchemy import ARRAY, Boolean, Column, Index, Integer, String
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
@@ -11,6 +11,13 @@ class User(Base):
     email = Column(String, nullable=True)
     is_blocked = Column(Boolean, nullable=False, default=False)
     roles = Column(ARRAY(String), nullable=False, default=list)
+
+    # счётчик непрочитанных уведомлений, поддерживается app/services/notifications.py
+    unread_notifications_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # денормализованные счётчики, поддерживаются app/services/counters.py
+    courses_count = Column(Integer, nullable=False, default=0, server_default="0")
+    attempts_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     courses_taught = relationship(
         "Course",
@@ -39,4 +46,12 @@ class User(Base):
         "Notification", 
         back_populates="user", 
         cascade="all, delete-orphan"
-    )
\ No newline at end of file
+    )
+
+    # поиск по справочнику пользователей (требуется расширение pg_trgm)
+    __table_args__ = (
+        Index("ix_users_username_trgm", "username", postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"}),
+        Index("ix_users_full_name_trgm", "full_name", postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"}),
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_users_roles_gin", "roles", postgresql_using="gin"),
+    )
@@ -15,6 +15,8 @@ class CourseUpdate(BaseModel):
 class CourseRead(CourseBase):
     id: int
     teacher_id: int
+    student_count: int = 0
+    test_count: int = 0
 
     class Config:
         orm_mode = True
@@ -22,6 +24,8 @@ class CourseRead(CourseBase):
 class CourseListRead(BaseModel):
     id: int
     title: str
+    student_count: int = 0
+    test_count: int = 0
 
     class Config:
         orm_mode = True
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 class CourseUserCreate(BaseModel):
@@ -10,3 +12,13 @@ class CourseUserRead(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class CourseBulkEnroll(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1)
+
+
+class CourseBulkEnrollResult(BaseModel):
+    inserted: int
+    skipped: int  # уже были записаны
+    unknown: List[int] = []  # нет таких пользователей
@@ -0,0 +1,43 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel
+
+
+class DashboardTest(BaseModel):
+    id: int
+    title: str
+    status: Literal["not_started", "in_progress", "finished"]
+    attempts: int = 0
+    in_progress_attempt_id: Optional[int] = None
+    best_score: Optional[Decimal] = None
+    last_finished_at: Optional[datetime] = None
+
+
+class DashboardCourse(BaseModel):
+    id: int
+    title: str
+    tests: List[DashboardTest] = []
+
+
+class TeachingTest(BaseModel):
+    id: int
+    title: str
+    is_active: bool
+    attempt_count: int = 0
+    finished_attempts: int = 0
+    students_finished: int = 0
+    avg_score: Optional[Decimal] = None
+
+
+class TeachingCourse(BaseModel):
+    id: int
+    title: str
+    student_count: int = 0
+    tests: List[TeachingTest] = []
+
+
+class Dashboard(BaseModel):
+    courses: List[DashboardCourse] = []  # курсы, на которые записан пользователь, с активными тестами
+    teaching: List[TeachingCourse] = []  # курсы, которые он ведёт (только для ролей с course:add)
@@ -8,9 +8,12 @@ from pydantic import BaseModel
 
 class NotificationRead(BaseModel):
     id: int
+    kind: str = "personal"  # personal | broadcast
+    course_id: Optional[int] = None
     message: str
     payload: Optional[Dict[str, Any]] = None
     created_at: datetime
+    read_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
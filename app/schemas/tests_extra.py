@@ -9,6 +9,8 @@ from pydantic import BaseModel, Field
 
 class TestActiveUpdate(BaseModel):
     is_active: bool
+    # создать попытки всем студентам заранее (экзамен по расписанию)
+    preprovision: bool = False
 
 
 class TestQuestionAdd(BaseModel):
@@ -1,4 +1,6 @@
 from pydantic import BaseModel, EmailStr, field_validator, Field
+from datetime import datetime
+from decimal import Decimal
 from typing import Optional, List
 
 
@@ -70,3 +72,30 @@ class UserMeRead(BaseModel):
 
 class UserRolesUpdate(BaseModel):
     roles: List[str] = Field(default_factory=list)
+
+
+# Массовая синхронизация пользователей из модуля авторизации
+class UserUpsert(UserCreate):
+    id: int
+
+
+class UserBulkUpsert(BaseModel):
+    users: List[UserUpsert] = Field(..., min_length=1)
+
+
+class UserUpsertStatus(BaseModel):
+    id: int
+    status: str  # inserted | updated | conflict
+    detail: Optional[str] = None
+
+
+# Строка транскрипта: завершённая попытка с курсом и тестом
+class UserTranscriptItem(BaseModel):
+    attempt_id: int
+    course_id: int
+    course_title: str
+    test_id: int
+    test_title: str
+    started_at: datetime
+    finished_at: datetime
+    score: Optional[Decimal] = None
@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 
 from app.core.permissions import Permissions, ensure_default_or_permission
 from app.core.security import CurrentUser
+from app.core.tracing import traced
 from app.models.answers import Answer
 from app.models.attempts import Attempt
 from app.models.courses import Course
@@ -13,6 +14,7 @@ from app.models.tests import Test
 
 
 ATTEMPT_STATUS_FINISHED = "finished"
+ATTEMPT_STATUS_PROVISIONED = "provisioned"
 
 
 def _get_answer_or_404(db: Session, answer_id: int) -> Answer:
@@ -62,6 +64,7 @@ def _validate_answer_value(db: Session, ans: Answer, value: int) -> None:
 
 # ---------------- Бизнес-логика ----------------
 
+@traced
 def list_attempt_answers(db: Session, attempt_id: int, current_user: CurrentUser) -> list[Answer]:
     """
     GET answers of attempt.
@@ -88,6 +91,7 @@ def list_attempt_answers(db: Session, attempt_id: int, current_user: CurrentUser
     return db.query(Answer).filter(Answer.attempt_id == attempt_id).all()
 
 
+@traced
 def update_answer(db: Session, answer_id: int, value: int, current_user: CurrentUser) -> Answer:
     """
     PATCH answer.
@@ -115,16 +119,18 @@ def update_answer(db: Session, answer_id: int, value: int, current_user: Current
 
     if attempt.status == ATTEMPT_STATUS_FINISHED:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Attempt is finished")
+    if attempt.status == ATTEMPT_STATUS_PROVISIONED:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Attempt is not started")
 
     _validate_answer_value(db, ans, value)
 
     ans.value = value
     db.add(ans)
     db.commit()
-    db.refresh(ans)
     return ans
 
 
+@traced
 def reset_answer(db: Session, answer_id: int, current_user: CurrentUser) -> Answer:
     """
     DELETE /answers/{answer_id}
@@ -149,9 +155,10 @@ def reset_answer(db: Session, answer_id: int, current_user: CurrentUser) -> Answ
 
     if attempt.status == ATTEMPT_STATUS_FINISHED:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Attempt is finished")
+    if attempt.status == ATTEMPT_STATUS_PROVISIONED:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Attempt is not started")
 
     ans.value = -1
     db.add(ans)
     db.commit()
-    db.refresh(ans)
     return ans
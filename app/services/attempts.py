@@ -3,19 +3,27 @@ from __future__ import annotations
 from datetime import datetime
 from decimal import Decimal
 from fastapi import HTTPException, status
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.core.permissions import Permissions, ensure_default_or_permission
 from app.core.security import CurrentUser
+from app.core.tracing import traced
 from app.models.attempts import Attempt
 from app.models.attempts_questions import AttemptQuestion
 from app.models.answers import Answer
 from app.models.courses import Course
-from app.models.course_users import CourseUser
 from app.models.question_versions import QuestionVersion
 from app.models.tests import Test
-from app.models.test_questions import TestQuestion
+from app.db.writes import insert_returning
+from app.models.users import User
+from app.services.counters import bump
+from app.services.dashboard import dashboard_cache
+from app.services.membership import is_enrolled
 from app.services.notifications import create_notification
+from app.services.preprovision import ATTEMPT_STATUS_PROVISIONED, claim_provisioned_attempt
+from app.services.snapshots import freeze_test_snapshot, get_snapshot
+from app.services.tests import test_results_cache
 from app.models.courses import Course
 from app.models.tests import Test
 
@@ -45,12 +53,7 @@ def _is_course_teacher(course: Course, current_user: CurrentUser) -> bool:
 
 
 def _is_student_enrolled(db: Session, course_id: int, user_id: int) -> bool:
-    return (
-        db.query(CourseUser)
-        .filter(CourseUser.course_id == course_id, CourseUser.user_id == user_id)
-        .first()
-        is not None
-    )
+    return is_enrolled(db, course_id, user_id)
 
 
 def _get_attempt_or_404(db: Session, attempt_id: int) -> Attempt:
@@ -60,27 +63,13 @@ def _get_attempt_or_404(db: Session, attempt_id: int) -> Attempt:
     return attempt
 
 
-def _get_latest_question_version_or_404(db: Session, question_id: int) -> QuestionVersion:
-    qv = (
-        db.query(QuestionVersion)
-        .filter(QuestionVersion.question_id == question_id)
-        .order_by(QuestionVersion.version.desc())
-        .first()
-    )
-    if not qv:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Question has no versions: question_id={question_id}",
-        )
-    return qv
-
-
 def _has_any_attempts_for_test(db: Session, test_id: int) -> bool:
     return db.query(Attempt).filter(Attempt.test_id == test_id).first() is not None
 
 
 # ---------------- Бизнес-логика ----------------
 
+@traced
 def create_attempt(db: Session, test_id: int, current_user: CurrentUser) -> Attempt:
     """
     Создать попытку прохождения теста.
@@ -90,8 +79,10 @@ def create_attempt(db: Session, test_id: int, current_user: CurrentUser) -> Atte
     - доступ по умолчанию: студент записан на курс ИЛИ преподаватель курса
       иначе: permission course:test:read
     - 1 активная попытка на (user_id, test_id) (если уже есть in_progress -> 400)
-    - фиксируем список вопросов теста в attempt_questions (position + question_version_id)
+    - вопросы и версии берём из активного снимка теста (app/services/snapshots.py)
+      и фиксируем в attempt_questions (position + question_version_id)
     - создаём answers (value=-1) на каждый вопрос
+    - в режиме preprovision сначала пытаемся забрать подготовленную попытку
     """
     test = _get_test_or_404(db, test_id)
     course = _get_course_or_404(db, test.course_id)
@@ -123,52 +114,62 @@ def create_attempt(db: Session, test_id: int, current_user: CurrentUser) -> Atte
             detail="You already have an active attempt for this test",
         )
 
-    test_links = (
-        db.query(TestQuestion)
-        .filter(TestQuestion.test_id == test.id)
-        .order_by(TestQuestion.position.asc())
-        .all()
-    )
-    if not test_links:
+    if test.preprovision and test.active_snapshot_id is not None:
+        # попытка уже подготовлена app/jobs/preprovision.py — только забираем её
+        attempt = claim_provisioned_attempt(db, test, current_user.id)
+        if attempt is not None:
+            bump(db, Test.attempt_count, test.id)
+            bump(db, User.attempts_count, current_user.id)
+            db.commit()
+            dashboard_cache.invalidate(current_user.id)
+            dashboard_cache.invalidate(course.teacher_id)
+            return attempt
+
+    if test.active_snapshot_id is None:
+        # тест активирован до появления снимков — замораживаем сейчас
+        snapshot = freeze_test_snapshot(db, test)
+    else:
+        snapshot = get_snapshot(db, test.active_snapshot_id)
+    if not snapshot["questions"]:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Test has no questions")
 
-    attempt = Attempt(
+    attempt = insert_returning(
+        db,
+        Attempt,
         user_id=current_user.id,
         test_id=test.id,
+        snapshot_id=snapshot["id"],
         status=ATTEMPT_STATUS_IN_PROGRESS,
         started_at=datetime.utcnow(),
         finished_at=None,
         score=None,
     )
-    db.add(attempt)
-    db.commit()
-    db.refresh(attempt)
-
-    # фиксируем вопросы попытки + ответы
-    for link in test_links:
-        latest_qv = _get_latest_question_version_or_404(db, link.question_id)
-
-        aq = AttemptQuestion(
-            attempt_id=attempt.id,
-            question_id=link.question_id,
-            question_version_id=latest_qv.id,
-            position=link.position,
-        )
-        db.add(aq)
-
-        ans = Answer(
-            attempt_id=attempt.id,
-            question_id=link.question_id,
-            question_version_id=latest_qv.id,
-            value=-1,
-        )
-        db.add(ans)
+    bump(db, Test.attempt_count, test.id)
+    bump(db, User.attempts_count, current_user.id)
+
+    # вопросы попытки и пустые ответы — по одной многострочной вставке из снимка
+    db.execute(
+        insert(AttemptQuestion),
+        [
+            {"attempt_id": attempt.id, "question_id": qid, "question_version_id": qv_id, "position": position}
+            for position, (qid, qv_id) in enumerate(snapshot["questions"])
+        ],
+    )
+    db.execute(
+        insert(Answer),
+        [
+            {"attempt_id": attempt.id, "question_id": qid, "question_version_id": qv_id, "value": -1}
+            for qid, qv_id in snapshot["questions"]
+        ],
+    )
 
     db.commit()
-    db.refresh(attempt)
+    dashboard_cache.invalidate(current_user.id)
+    dashboard_cache.invalidate(course.teacher_id)
     return attempt
 
 
+@traced
 def get_attempt(db: Session, attempt_id: int, current_user: CurrentUser) -> Attempt:
     """
     Получить попытку.
@@ -194,6 +195,7 @@ def get_attempt(db: Session, attempt_id: int, current_user: CurrentUser) -> Atte
     return attempt
 
 
+@traced
 def finish_attempt(db: Session, attempt_id: int, current_user: CurrentUser) -> Attempt:
     """
     Завершить попытку.
@@ -208,20 +210,29 @@ def finish_attempt(db: Session, attempt_id: int, current_user: CurrentUser) -> A
 
     if attempt.status == ATTEMPT_STATUS_FINISHED:
         return attempt
-
-    answers = db.query(Answer).filter(Answer.attempt_id == attempt.id).all()
+    if attempt.status == ATTEMPT_STATUS_PROVISIONED:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Attempt is not started")
+
+    if attempt.snapshot_id is not None:
+        # ключ ответов снимка — из памяти, из БД только значения
+        answer_key = get_snapshot(db, attempt.snapshot_id)["answer_key"]
+        answers = [
+            (value, answer_key.get(qv_id))
+            for qv_id, value in db.query(Answer.question_version_id, Answer.value).filter(Answer.attempt_id == attempt.id)
+        ]
+    else:
+        # ответ и correct_index его версии — одним запросом
+        answers = (
+            db.query(Answer.value, QuestionVersion.correct_index)
+            .outerjoin(QuestionVersion, QuestionVersion.id == Answer.question_version_id)
+            .filter(Answer.attempt_id == attempt.id)
+            .all()
+        )
     if not answers:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Attempt has no answers")
 
     total = len(answers)
-    correct = 0
-
-    for a in answers:
-        qv = db.query(QuestionVersion).filter(QuestionVersion.id == a.question_version_id).first()
-        if not qv:
-            continue
-        if a.value == qv.correct_index:
-            correct += 1
+    correct = sum(1 for value, correct_index in answers if correct_index is not None and value == correct_index)
 
     score = (Decimal(correct) / Decimal(total)) * Decimal("100")
 
@@ -249,5 +260,7 @@ def finish_attempt(db: Session, attempt_id: int, current_user: CurrentUser) -> A
 
     db.add(attempt)
     db.commit()
-    db.refresh(attempt)
+    test_results_cache.invalidate(attempt.test_id)
+    dashboard_cache.invalidate(attempt.user_id)
+    dashboard_cache.invalidate(course.teacher_id)
     return attempt
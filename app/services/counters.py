@@ -0,0 +1,106 @@
+"""
+Денормализованные счётчики:
+  users.courses_count, users.attempts_count, users.unread_notifications_count
+  courses.student_count, courses.test_count
+  tests.attempt_count
+Меняются в той же транзакции, что и исходные строки; расхождения чинит reconcile_counters.
+На существующей базе колонки добавляет и заполняет app.jobs.counters (шаг деплоя).
+Подготовленные заранее попытки (app/services/preprovision.py) учитываются только после захвата.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app.models.attempts import Attempt
+from app.models.course_users import CourseUser
+from app.models.courses import Course
+from app.models.notifications import Notification
+from app.models.tests import Test
+from app.models.users import User
+
+ATTEMPT_STATUS_PROVISIONED = "provisioned"
+
+
+def bump(db: Session, column, pk: int, delta: int = 1) -> None:
+    model = column.class_
+    db.query(model).filter(model.id == pk).update({column: column + delta})
+
+
+def bump_many(db: Session, column, pks: Iterable[int], delta: int = 1) -> None:
+    pks = list(pks)
+    if not pks:
+        return
+    model = column.class_
+    db.query(model).filter(model.id.in_(pks)).update({column: column + delta})
+
+
+def _actual_counts():
+    return {
+        "users.courses_count": (
+            User.courses_count,
+            select(func.count()).select_from(CourseUser).where(CourseUser.user_id == User.id),
+        ),
+        "users.attempts_count": (
+            User.attempts_count,
+            select(func.count())
+            .select_from(Attempt)
+            .where(Attempt.user_id == User.id, Attempt.status != ATTEMPT_STATUS_PROVISIONED),
+        ),
+        "users.unread_notifications_count": (
+            User.unread_notifications_count,
+            select(func.count())
+            .select_from(Notification)
+            .where(Notification.user_id == User.id, Notification.read_at.is_(None)),
+        ),
+        "courses.student_count": (
+            Course.student_count,
+            select(func.count()).select_from(CourseUser).where(CourseUser.course_id == Course.id),
+        ),
+        "courses.test_count": (
+            Course.test_count,
+            select(func.count()).select_from(Test).where(Test.course_id == Course.id, Test.is_deleted == False),
+        ),
+        "tests.attempt_count": (
+            Test.attempt_count,
+            select(func.count())
+            .select_from(Attempt)
+            .where(Attempt.test_id == Test.id, Attempt.status != ATTEMPT_STATUS_PROVISIONED),
+        ),
+    }
+
+
+def ensure_counter_columns(db: Session) -> List[str]:
+    """
+    Добавить недостающие колонки счётчиков (ADD COLUMN ... DEFAULT 0 — без перезаписи таблицы).
+    Заполняет их следующий reconcile_counters; возвращает имена добавленных.
+    """
+    insp = inspect(db.connection())
+    added = []
+    for name, (column, _) in _actual_counts().items():
+        table = column.class_.__table__.name
+        if column.key in {c["name"] for c in insp.get_columns(table)}:
+            continue
+        db.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column.key} INTEGER NOT NULL DEFAULT 0"))
+        added.append(name)
+    db.commit()
+    return added
+
+
+def reconcile_counters(db: Session) -> Dict[str, int]:
+    """
+    Пересчитать счётчики по исходным таблицам.
+    Обновляются только разошедшиеся строки; возвращает число исправленных строк по каждому счётчику.
+    """
+    fixed: Dict[str, int] = {}
+    for name, (column, actual) in _actual_counts().items():
+        actual = actual.scalar_subquery()
+        fixed[name] = (
+            db.query(column.class_)
+            .filter(column != actual)
+            .update({column: actual}, synchronize_session=False)
+        )
+        db.commit()
+    return fixed
@@ -1,15 +1,36 @@
 from datetime import datetime
-from typing import List
+from typing import Iterable, List, Optional, Sequence, Tuple
 from fastapi import HTTPException, status
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
+from app.core import metrics
+from app.core.config import settings
+from app.core.fields import rows_to_dicts, select_columns
+from app.core.http_cache import make_etag
+from app.db.writes import insert_returning
 from app.models.courses import Course
 from app.models.course_users import CourseUser
 from app.models.tests import Test
+from app.models.users import User
 from app.core.security import CurrentUser
 from app.core.permissions import Permissions
 from app.schemas.course_user import CourseUserRead
 from app.core.permissions import ensure_permission, ensure_default_or_permission
-from app.services.notifications import create_notification
+from app.core.singleflight import SingleFlightCache
+from app.core.tracing import traced
+from app.services.counters import bump, bump_many
+from app.services.dashboard import dashboard_cache
+from app.services.membership import is_enrolled, membership_index
+from app.services.notifications import create_notification, create_notifications_bulk
+from app.utils.batching import chunked
+
+# публичный список курсов; сбрасывается при создании/изменении/удалении курса,
+# счётчики студентов и тестов догоняют в пределах read_cache_ttl_seconds
+courses_cache = SingleFlightCache(settings.read_cache_ttl_seconds, settings.read_cache_max_entries)
+metrics.register_cache("courses_list", courses_cache.stats)
+
+# поля TestRead -> колонки
+TEST_COLUMNS = {"id": Test.id, "course_id": Test.course_id, "title": Test.title, "is_active": Test.is_active}
 
 # ---------------- Вспомогательные функции ----------------
 
@@ -33,27 +54,38 @@ def _is_course_teacher(course: Course, user: CurrentUser) -> bool:
 
 
 """
-Проверяет, записан ли пользователь на курс.
+Проверяет, записан ли пользователь на курс (через общий индекс участников).
 Возвращает True/False
 """
-def _is_student_enrolled(course: Course, user: CurrentUser) -> bool:
-    return any(link.user_id == user.id for link in course.students_links)
+def _is_student_enrolled(db: Session, course: Course, user: CurrentUser) -> bool:
+    return is_enrolled(db, course.id, user.id)
 
 
 # ---------------- Бизнес-логика ----------------
 
+def _load_courses(db: Session) -> Tuple[str, List[dict]]:
+    items = [
+        {"id": c.id, "title": c.title, "student_count": c.student_count, "test_count": c.test_count}
+        for c in db.query(Course).filter(Course.is_deleted == False).order_by(Course.id).all()
+    ]
+    # ETag — хэш содержимого, считается раз на заполнение кэша и одинаков во всех воркерах
+    return make_etag("courses", items), items
+
+
 """
-Получить список всех курсов
+Получить список всех курсов (и его ETag)
 Доступ: всем
 """
-def list_courses(db: Session) -> List[Course]:
-    return db.query(Course).filter(Course.is_deleted == False).all()
+@traced
+def list_courses(db: Session) -> Tuple[str, List[dict]]:
+    return courses_cache.get_or_compute(("all",), lambda: _load_courses(db))
 
 
 """
 Создать новый курс
 Доступ: permission 'course:add'
 """
+@traced
 def create_course(db: Session, current_user: CurrentUser, title: str, description: str) -> Course:
     ensure_permission(
         current_user.permissions,
@@ -61,10 +93,9 @@ def create_course(db: Session, current_user: CurrentUser, title: str, descriptio
         "You do not have permission to create courses",
         user_roles=current_user.roles,
     )
-    course = Course(title=title, description=description, teacher_id=current_user.id)
-    db.add(course)
+    course = insert_returning(db, Course, title=title, description=description, teacher_id=current_user.id)
     db.commit()
-    db.refresh(course)
+    courses_cache.invalidate()
     return course
 
 
@@ -74,6 +105,7 @@ def create_course(db: Session, current_user: CurrentUser, title: str, descriptio
   - по умолчанию: преподаватель курса
   - permission: 'course:info:write' для других пользователей
 """
+@traced
 def update_course(db: Session, course_id: int, current_user: CurrentUser, title: str | None, description: str | None) -> Course:
     course = _get_course_or_404(db, course_id)
     default_allowed = _is_course_teacher(course, current_user)
@@ -90,7 +122,8 @@ def update_course(db: Session, course_id: int, current_user: CurrentUser, title:
         course.description = description
 
     db.commit()
-    db.refresh(course)
+    courses_cache.invalidate()
+    dashboard_cache.clear()
     return course
 
 
@@ -100,6 +133,7 @@ def update_course(db: Session, course_id: int, current_user: CurrentUser, title:
   - по умолчанию: преподаватель курса
   - permission: 'course:del' для других пользователей
 """
+@traced
 def delete_course(db: Session, course_id: int, current_user: CurrentUser) -> Course:
     course = _get_course_or_404(db, course_id)
     default_allowed = _is_course_teacher(course, current_user)
@@ -112,7 +146,8 @@ def delete_course(db: Session, course_id: int, current_user: CurrentUser) -> Cou
 
     course.is_deleted = True
     db.commit()
-    db.refresh(course)
+    courses_cache.invalidate()
+    dashboard_cache.clear()
     return course
 
 
@@ -121,12 +156,16 @@ def delete_course(db: Session, course_id: int, current_user: CurrentUser) -> Cou
 Доступ:
   - по умолчанию: преподаватель курса или студент на курсе
   - permission: 'course:testList' для остальных
+fields — выбрать только эти поля (и колонки)
 """
-def list_course_tests(db: Session, course_id: int, current_user: CurrentUser,) -> list[Test]:
+@traced
+def list_course_tests(
+    db: Session, course_id: int, current_user: CurrentUser, fields: Optional[Sequence[str]] = None
+) -> List[dict]:
     course = _get_course_or_404(db, course_id)
     default_allowed = (
         _is_course_teacher(course, current_user)
-        or _is_student_enrolled(course, current_user)
+        or _is_student_enrolled(db, course, current_user)
     )
     ensure_default_or_permission(
         default_allowed,
@@ -135,14 +174,15 @@ def list_course_tests(db: Session, course_id: int, current_user: CurrentUser,) -
         user_roles=current_user.roles,
     )
 
-    return (
-        db.query(Test)
+    rows = (
+        db.query(*select_columns(TEST_COLUMNS, fields))
         .filter(
             Test.course_id == course_id,
             Test.is_deleted == False,
         )
         .all()
     )
+    return rows_to_dicts(rows)
 
 
 """
@@ -151,6 +191,7 @@ def list_course_tests(db: Session, course_id: int, current_user: CurrentUser,) -
   - по умолчанию: преподаватель курса
   - permission: 'course:userList' для остальных
 """
+@traced
 def list_course_students(db: Session, course_id: int, current_user: CurrentUser) -> List[CourseUser]:
     course = _get_course_or_404(db, course_id)
     default_allowed = _is_course_teacher(course, current_user)
@@ -169,6 +210,7 @@ def list_course_students(db: Session, course_id: int, current_user: CurrentUser)
   - по умолчанию: пользователь может записать себя
   - permission: 'course:user:add' для записи других
 """
+@traced
 def enroll_user_to_course(db: Session, course_id: int, current_user: CurrentUser, target_user_id: int | None = None) -> CourseUser:
     course = _get_course_or_404(db, course_id)
     target_user_id = target_user_id or current_user.id
@@ -186,7 +228,12 @@ def enroll_user_to_course(db: Session, course_id: int, current_user: CurrentUser
 
     link = CourseUser(course_id=course_id, user_id=target_user_id, enrolled_at=datetime.utcnow())
     db.add(link)
+    bump(db, Course.student_count, course_id)
+    bump(db, User.courses_count, target_user_id)
     db.commit()
+    membership_index.add(course_id, target_user_id)
+    dashboard_cache.invalidate(target_user_id)
+    dashboard_cache.invalidate(course.teacher_id)
     create_notification(
         db,
         user_id=current_user.id,
@@ -194,16 +241,88 @@ def enroll_user_to_course(db: Session, course_id: int, current_user: CurrentUser
         payload={"type": "course_enroll", "course_id": course.id},
     )
 
-    db.refresh(link)
     return link
 
 
+"""
+Массовая запись пользователей на курс (импорт списка группы)
+Доступ:
+  - permission: 'course:user:add'
+Уже записанные пропускаются (ON CONFLICT DO NOTHING), несуществующие id возвращаются в unknown.
+Всё выполняется в одной транзакции, уведомления создаются одной пачкой.
+"""
+@traced
+def enroll_users_to_course_bulk(db: Session, course_id: int, current_user: CurrentUser, user_ids: Iterable[int]) -> dict:
+    course = _get_course_or_404(db, course_id)
+    ensure_permission(
+        current_user.permissions,
+        Permissions.COURSE_USER_ADD,
+        "You do not have permission to enroll users",
+        user_roles=current_user.roles,
+    )
+
+    unique_ids = list(dict.fromkeys(user_ids))
+    if len(unique_ids) > settings.bulk_enroll_max_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many users in one request (max {settings.bulk_enroll_max_ids})",
+        )
+
+    enrolled_at = datetime.utcnow()
+    inserted: list[int] = []
+    unknown: list[int] = []
+
+    for chunk in chunked(unique_ids, settings.bulk_chunk_size):
+        known = {row.id for row in db.query(User.id).filter(User.id.in_(chunk))}
+        unknown.extend(uid for uid in chunk if uid not in known)
+
+        rows = [
+            {"course_id": course_id, "user_id": uid, "enrolled_at": enrolled_at}
+            for uid in chunk
+            if uid in known
+        ]
+        if not rows:
+            continue
+
+        stmt = (
+            pg_insert(CourseUser)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[CourseUser.course_id, CourseUser.user_id])
+            .returning(CourseUser.user_id)
+        )
+        chunk_inserted = list(db.execute(stmt).scalars())
+        bump_many(db, User.courses_count, chunk_inserted)
+        inserted.extend(chunk_inserted)
+
+    bump(db, Course.student_count, course_id, len(inserted))
+    create_notifications_bulk(
+        db,
+        inserted,
+        message=f"Вы записаны на курс «{course.title}».",
+        payload={"type": "course_enroll", "course_id": course.id},
+    )
+    db.commit()
+
+    for uid in inserted:
+        membership_index.add(course_id, uid)
+    # invalidate(uid) по каждому — проход по всему кэшу на каждого, дешевле сбросить целиком
+    if inserted:
+        dashboard_cache.clear()
+
+    return {
+        "inserted": len(inserted),
+        "skipped": len(unique_ids) - len(inserted) - len(unknown),
+        "unknown": unknown,
+    }
+
+
 """
 Удалить пользователя с курса
 Доступ:
   - по умолчанию: пользователь может удалить себя
   - permission: 'course:user:del' для удаления других
 """
+@traced
 def remove_user_from_course(db: Session, course_id: int, user_id: int, current_user: CurrentUser) -> None:
     course = _get_course_or_404(db, course_id)
     default_allowed = user_id == current_user.id
@@ -217,6 +336,8 @@ def remove_user_from_course(db: Session, course_id: int, user_id: int, current_u
     link = db.query(CourseUser).filter_by(course_id=course_id, user_id=user_id).first()
     if link:
         db.delete(link)
+        bump(db, Course.student_count, course_id, -1)
+        bump(db, User.courses_count, user_id, -1)
         create_notification(
             db,
             user_id=user_id,
@@ -224,3 +345,6 @@ def remove_user_from_course(db: Session, course_id: int, user_id: int, current_u
             payload={"type": "course_unenroll", "course_id": course.id},
         )
         db.commit()
+        membership_index.discard(course_id, user_id)
+        dashboard_cache.invalidate(user_id)
+        dashboard_cache.invalidate(course.teacher_id)
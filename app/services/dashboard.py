@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.permissions import Permissions, has_permission
+from app.core.security import CurrentUser
+from app.core.singleflight import SingleFlightCache
+from app.core.tracing import traced
+from app.models.attempts import Attempt
+from app.models.courses import Course
+from app.models.course_users import CourseUser
+from app.models.tests import Test
+
+
+ATTEMPT_STATUS_IN_PROGRESS = "in_progress"
+ATTEMPT_STATUS_FINISHED = "finished"
+ATTEMPT_STATUS_PROVISIONED = "provisioned"
+
+# дашборд пользователя: ключ (user_id, ведёт_ли_курсы).
+# invalidate(user_id) — попытки и запись/отчисление (студент и преподаватель курса),
+# clear() — изменения, видимые всем участникам курса (активация, тесты, курс)
+dashboard_cache = SingleFlightCache(settings.dashboard_cache_ttl_seconds, settings.read_cache_max_entries)
+metrics.register_cache("dashboard", dashboard_cache.stats)
+
+
+# ---------------- Вспомогательные функции ----------------
+
+"""
+Курсы пользователя с их активными тестами и его попытками — одним запросом:
+агрегат попыток пользователя по тесту (GROUP BY test_id) присоединяется к тестам курсов.
+"""
+def _load_enrolled(db: Session, user_id: int) -> List[dict]:
+    mine = (
+        select(
+            Attempt.test_id,
+            func.count().label("attempts"),
+            func.max(Attempt.id).filter(Attempt.status == ATTEMPT_STATUS_IN_PROGRESS).label("in_progress_attempt_id"),
+            func.max(Attempt.score).label("best_score"),
+            func.max(Attempt.finished_at).label("last_finished_at"),
+        )
+        # подготовленные заранее попытки для студента ещё не существуют
+        .where(Attempt.user_id == user_id, Attempt.status != ATTEMPT_STATUS_PROVISIONED)
+        .group_by(Attempt.test_id)
+        .subquery()
+    )
+    rows = (
+        db.query(
+            Course.id.label("course_id"),
+            Course.title.label("course_title"),
+            Test.id.label("test_id"),
+            Test.title.label("test_title"),
+            mine.c.attempts,
+            mine.c.in_progress_attempt_id,
+            mine.c.best_score,
+            mine.c.last_finished_at,
+        )
+        .select_from(CourseUser)
+        .join(Course, Course.id == CourseUser.course_id)
+        .outerjoin(Test, and_(Test.course_id == Course.id, Test.is_active == True, Test.is_deleted == False))
+        .outerjoin(mine, mine.c.test_id == Test.id)
+        .filter(CourseUser.user_id == user_id, Course.is_deleted == False)
+        .order_by(Course.id, Test.id)
+        .all()
+    )
+
+    courses: Dict[int, dict] = {}
+    for r in rows:
+        course = courses.setdefault(r.course_id, {"id": r.course_id, "title": r.course_title, "tests": []})
+        if r.test_id is None:
+            continue
+        if r.in_progress_attempt_id is not None:
+            state = ATTEMPT_STATUS_IN_PROGRESS
+        elif r.last_finished_at is not None:
+            state = ATTEMPT_STATUS_FINISHED
+        else:
+            state = "not_started"
+        course["tests"].append(
+            {
+                "id": r.test_id,
+                "title": r.test_title,
+                "status": state,
+                "attempts": r.attempts or 0,
+                "in_progress_attempt_id": r.in_progress_attempt_id,
+                "best_score": r.best_score,
+                "last_finished_at": r.last_finished_at,
+            }
+        )
+    return list(courses.values())
+
+
+"""
+Курсы преподавателя со сводкой по каждому тесту — одним запросом:
+агрегат завершённых попыток считается только по тестам его курсов.
+"""
+def _load_teaching(db: Session, user_id: int) -> List[dict]:
+    own_tests = (
+        select(Test.id)
+        .join(Course, Course.id == Test.course_id)
+        .where(Course.teacher_id == user_id, Course.is_deleted == False, Test.is_deleted == False)
+    )
+    finished = (
+        select(
+            Attempt.test_id,
+            func.count().label("finished_attempts"),
+            func.count(Attempt.user_id.distinct()).label("students_finished"),
+            func.round(func.avg(Attempt.score), 2).label("avg_score"),
+        )
+        .where(Attempt.status == ATTEMPT_STATUS_FINISHED, Attempt.test_id.in_(own_tests))
+        .group_by(Attempt.test_id)
+        .subquery()
+    )
+    rows = (
+        db.query(
+            Course.id.label("course_id"),
+            Course.title.label("course_title"),
+            Course.student_count,
+            Test.id.label("test_id"),
+            Test.title.label("test_title"),
+            Test.is_active,
+            Test.attempt_count,
+            finished.c.finished_attempts,
+            finished.c.students_finished,
+            finished.c.avg_score,
+        )
+        .outerjoin(Test, and_(Test.course_id == Course.id, Test.is_deleted == False))
+        .outerjoin(finished, finished.c.test_id == Test.id)
+        .filter(Course.teacher_id == user_id, Course.is_deleted == False)
+        .order_by(Course.id, Test.id)
+        .all()
+    )
+
+    courses: Dict[int, dict] = {}
+    for r in rows:
+        course = courses.setdefault(
+            r.course_id,
+            {"id": r.course_id, "title": r.course_title, "student_count": r.student_count, "tests": []},
+        )
+        if r.test_id is None:
+            continue
+        course["tests"].append(
+            {
+                "id": r.test_id,
+                "title": r.test_title,
+                "is_active": r.is_active,
+                "attempt_count": r.attempt_count,
+                "finished_attempts": r.finished_attempts or 0,
+                "students_finished": r.students_finished or 0,
+                "avg_score": r.avg_score,
+            }
+        )
+    return list(courses.values())
+
+
+def _load_dashboard(db: Session, user_id: int, teaching: bool) -> dict:
+    return {
+        "courses": _load_enrolled(db, user_id),
+        "teaching": _load_teaching(db, user_id) if teaching else [],
+    }
+
+
+# ---------------- Бизнес-логика ----------------
+
+"""
+Дашборд текущего пользователя (главный экран)
+Доступ: любой аутентифицированный пользователь, только свои данные.
+Секция teaching собирается только для ролей, которые могут вести курсы (course:add),
+студент получает дашборд за один запрос к БД.
+"""
+@traced
+def get_my_dashboard(db: Session, current_user: CurrentUser) -> dict:
+    teaching = has_permission(current_user.permissions, Permissions.COURSE_ADD, current_user.roles)
+    return dashboard_cache.get_or_compute(
+        (current_user.id, teaching), lambda: _load_dashboard(db, current_user.id, teaching)
+    )
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.tracing import traced
+from app.models.course_users import CourseUser
+
+
+class CourseMembershipIndex:
+    """
+    Индекс участников курсов в памяти процесса: course_id -> set(user_id).
+
+    - курс загружается целиком одним запросом при первом обращении;
+    - положительный ответ берётся из памяти, отрицательный перепроверяется по БД
+      (запись могла пройти через другой воркер) и дописывается в индекс;
+    - исключения из курса в других воркерах видны не позже чем через ttl_seconds;
+    - размер ограничен суммарным числом user_id, вытесняются давно не используемые курсы.
+    """
+
+    def __init__(self, max_members: int, ttl_seconds: float):
+        self.max_members = max_members
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._courses: "OrderedDict[int, Tuple[float, Set[int]]]" = OrderedDict()
+        self._size = 0
+        self._removals = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+    # ---------------- внутреннее ----------------
+
+    def _get(self, course_id: int) -> Optional[Set[int]]:
+        entry = self._courses.get(course_id)
+        if entry is None:
+            return None
+        loaded_at, members = entry
+        if time.monotonic() - loaded_at > self.ttl_seconds:
+            self._drop(course_id)
+            return None
+        self._courses.move_to_end(course_id)
+        return members
+
+    def _drop(self, course_id: int) -> None:
+        entry = self._courses.pop(course_id, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def _store(self, course_id: int, members: Set[int]) -> None:
+        self._drop(course_id)
+        self._courses[course_id] = (time.monotonic(), members)
+        self._size += len(members)
+        while self._size > self.max_members and len(self._courses) > 1:
+            oldest = next(iter(self._courses))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _load(self, db: Session, course_id: int) -> Set[int]:
+        with self._lock:
+            removals_before = self._removals
+
+        members = {
+            row.user_id
+            for row in db.query(CourseUser.user_id).filter(CourseUser.course_id == course_id)
+        }
+
+        with self._lock:
+            self.loads += 1
+            # если во время загрузки кого-то исключили, результат может быть устаревшим
+            if self._removals == removals_before:
+                self._store(course_id, members)
+        return members
+
+    # ---------------- API ----------------
+
+    def is_member(self, db: Session, course_id: int, user_id: int) -> bool:
+        with self._lock:
+            members = self._get(course_id)
+        if members is None:
+            members = self._load(db, course_id)
+
+        if user_id in members:
+            with self._lock:
+                self.hits += 1
+            return True
+
+        with self._lock:
+            self.misses += 1
+        exists = (
+            db.query(CourseUser.user_id)
+            .filter(CourseUser.course_id == course_id, CourseUser.user_id == user_id)
+            .first()
+            is not None
+        )
+        if exists:
+            self.add(course_id, user_id)
+        return exists
+
+    def add(self, course_id: int, user_id: int) -> None:
+        with self._lock:
+            members = self._get(course_id)
+            if members is not None and user_id not in members:
+                members.add(user_id)
+                self._size += 1
+
+    def discard(self, course_id: int, user_id: int) -> None:
+        with self._lock:
+            self._removals += 1
+            members = self._get(course_id)
+            if members is not None and user_id in members:
+                members.discard(user_id)
+                self._size -= 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._courses.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "courses": len(self._courses),
+                "members": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+membership_index = CourseMembershipIndex(
+    max_members=settings.membership_index_max_members,
+    ttl_seconds=settings.membership_index_ttl_seconds,
+)
+metrics.register_cache("course_membership", membership_index.stats)
+
+
+@traced
+def is_enrolled(db: Session, course_id: int, user_id: int) -> bool:
+    return membership_index.is_member(db, course_id, user_id)
@@ -1,39 +1,319 @@
 from __future__ import annotations
 
+from collections import Counter
+from datetime import datetime
 from typing import Any, Dict, Optional, List
+from sqlalchemy import bindparam, func, insert, tuple_, update
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.security import CurrentUser
+from app.core.tracing import traced
+from app.db.writes import insert_returning
+from app.models.course_notifications import CourseNotification
+from app.models.course_users import CourseUser
 from app.models.notifications import Notification
+from app.models.users import User
+from app.utils.batching import chunked
 
 
+# ---------------- Вспомогательные функции ----------------
+
+def _bump_unread(db: Session, user_id: int, delta: int) -> None:
+    """
+    Сдвинуть счётчик непрочитанных в той же транзакции, что и сами уведомления.
+    """
+    db.query(User).filter(User.id == user_id).update(
+        {User.unread_notifications_count: func.greatest(User.unread_notifications_count + delta, 0)},
+        synchronize_session=False,
+    )
+
+
+def _bump_unread_many(db: Session, deltas: Dict[int, int]) -> None:
+    if not deltas:
+        return
+    users = User.__table__
+    stmt = (
+        update(users)
+        .where(users.c.id == bindparam("uid"))
+        .values(unread_notifications_count=func.greatest(users.c.unread_notifications_count + bindparam("delta"), 0))
+    )
+    db.execute(stmt, [{"uid": uid, "delta": delta} for uid, delta in deltas.items()])
+
+
+def _broadcast_visible():
+    """
+    Условие видимости широковещательного уведомления для строки course_users:
+    создано после записи на курс и после последней очистки.
+    (greatest в Postgres игнорирует NULL)
+    """
+    return CourseNotification.created_at > func.greatest(
+        CourseUser.enrolled_at,
+        CourseUser.notifications_cleared_at,
+    )
+
+
+def _broadcast_unread():
+    return CourseNotification.created_at > func.greatest(
+        CourseUser.enrolled_at,
+        CourseUser.notifications_read_at,
+        CourseUser.notifications_cleared_at,
+    )
+
+
+def _serialize_personal(n: Notification) -> Dict[str, Any]:
+    return {
+        "id": n.id,
+        "kind": "personal",
+        "course_id": None,
+        "message": n.message,
+        "payload": n.payload,
+        "created_at": n.created_at,
+        "read_at": n.read_at,
+    }
+
+
+def _serialize_broadcast(n: CourseNotification, read_at: Optional[datetime]) -> Dict[str, Any]:
+    return {
+        "id": n.id,
+        "kind": "broadcast",
+        "course_id": n.course_id,
+        "message": n.message,
+        "payload": n.payload,
+        "created_at": n.created_at,
+        "read_at": read_at if read_at is not None and n.created_at <= read_at else None,
+    }
+
+
+def _count_broadcast_unread(db: Session, user_id: int) -> int:
+    count = (
+        db.query(func.count(CourseNotification.id))
+        .join(CourseUser, CourseUser.course_id == CourseNotification.course_id)
+        .filter(CourseUser.user_id == user_id, _broadcast_unread())
+        .scalar()
+    )
+    return int(count or 0)
+
+
+# ---------------- Бизнес-логика ----------------
+
+@traced
 def create_notification(
     db: Session,
     user_id: int,
     message: str,
     payload: Optional[Dict[str, Any]] = None,
 ) -> Notification:
-    n = Notification(user_id=user_id, message=message, payload=payload)
-    db.add(n)
+    n = insert_returning(db, Notification, user_id=user_id, message=message, payload=payload)
+    _bump_unread(db, user_id, 1)
+    db.commit()
+    return n
+
+
+@traced
+def create_notifications_bulk(
+    db: Session,
+    user_ids: List[int],
+    message: str,
+    payload: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    Одно и то же уведомление для списка пользователей, пачками.
+    Не коммитит — вызывается внутри транзакции массовой операции.
+    """
+    for chunk in chunked(user_ids, settings.bulk_chunk_size):
+        db.execute(
+            insert(Notification),
+            [{"user_id": uid, "message": message, "payload": payload} for uid in chunk],
+        )
+        _bump_unread_many(db, {uid: 1 for uid in chunk})
+    return len(user_ids)
+
+
+@traced
+def create_course_notification(
+    db: Session,
+    course_id: int,
+    message: str,
+    payload: Optional[Dict[str, Any]] = None,
+) -> CourseNotification:
+    """
+    Уведомление для всех участников курса — одна строка вместо строки на каждого студента.
+    """
+    n = insert_returning(db, CourseNotification, course_id=course_id, message=message, payload=payload)
     db.commit()
-    db.refresh(n)
     return n
 
 
-def list_my_notifications(db: Session, current_user: CurrentUser) -> List[Notification]:
-    return (
-        db.query(Notification)
-        .filter(Notification.user_id == current_user.id)
-        .order_by(Notification.created_at.asc())
-        .all()
+@traced
+def list_my_notifications(
+    db: Session,
+    current_user: CurrentUser,
+    after: Optional[int] = None,
+    after_broadcast: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Личные уведомления пользователя вместе с уведомлениями его курсов, в порядке создания.
+    after / after_broadcast — id последних уже полученных личных / курсовых уведомлений
+    (инкрементальная синхронизация; у двух видов независимые последовательности id).
+    """
+    q = db.query(Notification).filter(Notification.user_id == current_user.id)
+
+    if after is not None:
+        # курсор переводим в (created_at, id), чтобы идти по индексу (user_id, created_at)
+        anchor = (
+            db.query(Notification.created_at)
+            .filter(Notification.id == after, Notification.user_id == current_user.id)
+            .scalar()
+        )
+        if anchor is not None:
+            q = q.filter(tuple_(Notification.created_at, Notification.id) > tuple_(anchor, after))
+        else:
+            q = q.filter(Notification.id > after)
+
+    q = q.order_by(Notification.created_at.asc(), Notification.id.asc())
+    if limit is not None:
+        q = q.limit(limit)
+
+    bq = (
+        db.query(CourseNotification, CourseUser.notifications_read_at)
+        .join(CourseUser, CourseUser.course_id == CourseNotification.course_id)
+        .filter(CourseUser.user_id == current_user.id, _broadcast_visible())
     )
+    if after_broadcast is not None:
+        bq = bq.filter(CourseNotification.id > after_broadcast)
+    bq = bq.order_by(CourseNotification.created_at.asc(), CourseNotification.id.asc())
+    if limit is not None:
+        bq = bq.limit(limit)
 
+    items = [_serialize_personal(n) for n in q.all()]
+    items.extend(_serialize_broadcast(n, read_at) for n, read_at in bq.all())
+    items.sort(key=lambda x: x["created_at"])
+    if limit is not None:
+        items = items[:limit]
+    return items
 
-def clear_my_notifications(db: Session, current_user: CurrentUser) -> int:
+
+@traced
+def get_my_unread_count(db: Session, current_user: CurrentUser) -> int:
+    """
+    Личные — из поддерживаемого счётчика, курсовые — по индексу (course_id, created_at)
+    только среди курсов пользователя.
+    """
     count = (
-        db.query(Notification)
-        .filter(Notification.user_id == current_user.id)
-        .delete(synchronize_session=False)
+        db.query(User.unread_notifications_count)
+        .filter(User.id == current_user.id)
+        .scalar()
+    )
+    return int(count or 0) + _count_broadcast_unread(db, current_user.id)
+
+
+def get_notification_backlog(db: Session) -> Dict[str, int]:
+    """
+    Непрочитанные личные уведомления по всем пользователям (по счётчикам users) — для /metrics.
+    """
+    row = db.query(
+        func.coalesce(func.sum(User.unread_notifications_count), 0),
+        func.count().filter(User.unread_notifications_count > 0),
+    ).one()
+    return {"unread": int(row[0]), "users_with_unread": int(row[1])}
+
+
+@traced
+def mark_my_notifications_read(db: Session, current_user: CurrentUser, up_to: Optional[int] = None) -> int:
+    """
+    Отметить уведомления прочитанными (все или личные до id=up_to включительно).
+    Курсовые уведомления отмечаются сдвигом водяного знака только при отметке всех.
+    """
+    q = db.query(Notification).filter(
+        Notification.user_id == current_user.id,
+        Notification.read_at.is_(None),
     )
+    if up_to is not None:
+        q = q.filter(Notification.id <= up_to)
+
+    now = datetime.utcnow()
+    count = q.update({Notification.read_at: now}, synchronize_session=False)
+    if count:
+        _bump_unread(db, current_user.id, -count)
+
+    if up_to is None:
+        count += _count_broadcast_unread(db, current_user.id)
+        (
+            db.query(CourseUser)
+            .filter(CourseUser.user_id == current_user.id)
+            .update({CourseUser.notifications_read_at: now}, synchronize_session=False)
+        )
+
     db.commit()
     return int(count)
+
+
+@traced
+def clear_my_notifications(db: Session, current_user: CurrentUser) -> int:
+    mine = db.query(Notification).filter(Notification.user_id == current_user.id)
+    unread = mine.filter(Notification.read_at.is_(None)).delete(synchronize_session=False)
+    read = mine.filter(Notification.read_at.isnot(None)).delete(synchronize_session=False)
+    if unread:
+        _bump_unread(db, current_user.id, -unread)
+
+    broadcast = (
+        db.query(func.count(CourseNotification.id))
+        .join(CourseUser, CourseUser.course_id == CourseNotification.course_id)
+        .filter(CourseUser.user_id == current_user.id, _broadcast_visible())
+        .scalar()
+    ) or 0
+    (
+        db.query(CourseUser)
+        .filter(CourseUser.user_id == current_user.id)
+        .update({CourseUser.notifications_cleared_at: datetime.utcnow()}, synchronize_session=False)
+    )
+
+    db.commit()
+    return int(unread + read + broadcast)
+
+
+def purge_expired_notifications(db: Session, older_than: datetime, batch_size: int) -> int:
+    """
+    Удалить уведомления старше older_than пачками по batch_size,
+    коммитя после каждой пачки, чтобы не держать длинные блокировки.
+    """
+    total = 0
+    while True:
+        rows = (
+            db.query(Notification.id, Notification.user_id, Notification.read_at)
+            .filter(Notification.created_at < older_than)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not rows:
+            break
+
+        unread = Counter(r.user_id for r in rows if r.read_at is None)
+        (
+            db.query(Notification)
+            .filter(Notification.id.in_([r.id for r in rows]))
+            .delete(synchronize_session=False)
+        )
+        _bump_unread_many(db, {uid: -n for uid, n in unread.items()})
+        db.commit()
+        total += len(rows)
+
+    while True:
+        ids = [
+            r.id
+            for r in db.query(CourseNotification.id)
+            .filter(CourseNotification.created_at < older_than)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        ]
+        if not ids:
+            break
+        db.query(CourseNotification).filter(CourseNotification.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        total += len(ids)
+
+    return total
@@ -0,0 +1,199 @@
+"""
+Предварительное создание попыток для экзаменов по расписанию.
+
+Тест, активированный с preprovision=true, обрабатывает задача app/jobs/preprovision.py:
+для каждого записанного студента без попытки в текущем снимке она создаёт попытку
+в статусе "provisioned" вместе с attempt_questions и answers — пачками по
+bulk_chunk_size, каждая пачка — три INSERT ... SELECT (попытки из course_users,
+вопросы и ответы — попытки × unnest(снимок)).
+
+create_attempt тогда лишь забирает готовую попытку (UPDATE ... FOR UPDATE SKIP LOCKED:
+статус in_progress и started_at), и волна записей в начале экзамена уходит в фоновую задачу.
+До захвата попытка недоступна для ответов и завершения, в счётчиках не учитывается.
+Новый снимок (повторная активация, правка состава) и деактивация удаляют незабранные попытки.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import ARRAY, BigInteger, Integer, cast, delete, exists, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.tracing import traced
+from app.models.answers import Answer
+from app.models.attempts import Attempt
+from app.models.attempts_questions import AttemptQuestion
+from app.models.course_users import CourseUser
+from app.models.tests import Test
+from app.services.snapshots import get_snapshot
+from app.utils.batching import chunked
+
+
+ATTEMPT_STATUS_PROVISIONED = "provisioned"
+ATTEMPT_STATUS_IN_PROGRESS = "in_progress"
+
+
+# ---------------- Вспомогательные функции ----------------
+
+def _has_attempt(test: Test):
+    # у студента (CourseUser.user_id) есть попытка в этом снимке или незавершённая попытка вообще
+    return exists().where(
+        Attempt.test_id == test.id,
+        Attempt.user_id == CourseUser.user_id,
+        or_(Attempt.snapshot_id == test.active_snapshot_id, Attempt.status == ATTEMPT_STATUS_IN_PROGRESS),
+    )
+
+
+def _users_to_provision(db: Session, test: Test) -> List[int]:
+    return [
+        user_id
+        for (user_id,) in db.query(CourseUser.user_id)
+        .filter(CourseUser.course_id == test.course_id, ~_has_attempt(test))
+        .order_by(CourseUser.user_id)
+    ]
+
+
+def _lock_test_if_still_provisioned(db: Session, test_id: int, snapshot_id: int) -> bool:
+    # FOR SHARE: деактивация/новый снимок ждут конца пачки, а не вставляют между её запросами
+    return (
+        db.query(Test.id)
+        .filter(
+            Test.id == test_id,
+            Test.is_active == True,
+            Test.preprovision == True,
+            Test.active_snapshot_id == snapshot_id,
+        )
+        .with_for_update(read=True)
+        .first()
+        is not None
+    )
+
+
+def _provision_chunk(db: Session, test: Test, snapshot: dict, user_ids: List[int], now: datetime) -> int:
+    attempt_ids = list(
+        db.execute(
+            insert(Attempt)
+            .from_select(
+                ["user_id", "test_id", "snapshot_id", "status", "started_at"],
+                select(
+                    CourseUser.user_id,
+                    literal(test.id, BigInteger),
+                    literal(snapshot["id"], BigInteger),
+                    literal(ATTEMPT_STATUS_PROVISIONED),
+                    literal(now),
+                )
+                # проверка повторяется в самой вставке: студент мог начать попытку
+                # (create_attempt) после выборки _users_to_provision
+                .where(CourseUser.course_id == test.course_id, CourseUser.user_id.in_(user_ids), ~_has_attempt(test)),
+            )
+            .returning(Attempt.id)
+        ).scalars()
+    )
+    if not attempt_ids:
+        return 0
+
+    question_ids = [qid for qid, _ in snapshot["questions"]]
+    version_ids = [qv_id for _, qv_id in snapshot["questions"]]
+    questions = func.unnest(
+        cast(question_ids, ARRAY(BigInteger)),
+        cast(version_ids, ARRAY(BigInteger)),
+        cast(list(range(len(question_ids))), ARRAY(Integer)),
+    ).table_valued("question_id", "question_version_id", "position").render_derived()
+
+    provisioned = Attempt.id.in_(attempt_ids)
+    db.execute(
+        insert(AttemptQuestion).from_select(
+            ["attempt_id", "question_id", "question_version_id", "position"],
+            select(Attempt.id, questions.c.question_id, questions.c.question_version_id, questions.c.position)
+            .select_from(Attempt)
+            .join(questions, literal(True))
+            .where(provisioned),
+        )
+    )
+    db.execute(
+        insert(Answer).from_select(
+            ["attempt_id", "question_id", "question_version_id", "value"],
+            select(Attempt.id, questions.c.question_id, questions.c.question_version_id, literal(-1))
+            .select_from(Attempt)
+            .join(questions, literal(True))
+            .where(provisioned),
+        )
+    )
+    return len(attempt_ids)
+
+
+# ---------------- Бизнес-логика ----------------
+
+"""
+Создать недостающие попытки теста для всех записанных студентов.
+Каждая пачка — своя транзакция; возвращает число созданных попыток.
+Останавливается, если тест деактивирован или получил новый снимок.
+"""
+@traced
+def provision_test_attempts(db: Session, test: Test) -> int:
+    if not test.is_active or test.active_snapshot_id is None:
+        return 0
+    snapshot = get_snapshot(db, test.active_snapshot_id)
+    if not snapshot["questions"]:
+        return 0
+
+    created = 0
+    now = datetime.utcnow()
+    for chunk in chunked(_users_to_provision(db, test), settings.bulk_chunk_size):
+        if not _lock_test_if_still_provisioned(db, test.id, snapshot["id"]):
+            db.rollback()
+            break
+        created += _provision_chunk(db, test, snapshot, chunk, now)
+        db.commit()
+    return created
+
+
+"""
+Подготовить попытки для всех активных тестов в режиме preprovision (или одного test_id).
+Возвращает {test_id: создано попыток}.
+"""
+@traced
+def provision_all(db: Session, test_id: Optional[int] = None) -> Dict[int, int]:
+    query = db.query(Test).filter(Test.is_active == True, Test.is_deleted == False, Test.preprovision == True)
+    if test_id is not None:
+        query = query.filter(Test.id == test_id)
+    return {test.id: provision_test_attempts(db, test) for test in query.order_by(Test.id).all()}
+
+
+"""
+Забрать подготовленную попытку пользователя в текущем снимке (без commit).
+SKIP LOCKED — параллельный повтор того же запроса не ждёт и не забирает ту же строку.
+"""
+@traced
+def claim_provisioned_attempt(db: Session, test: Test, user_id: int) -> Optional[Attempt]:
+    target = (
+        select(Attempt.id)
+        .where(
+            Attempt.test_id == test.id,
+            Attempt.user_id == user_id,
+            Attempt.snapshot_id == test.active_snapshot_id,
+            Attempt.status == ATTEMPT_STATUS_PROVISIONED,
+        )
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Attempt)
+        .where(Attempt.id == target)
+        .values(status=ATTEMPT_STATUS_IN_PROGRESS, started_at=datetime.utcnow())
+        .returning(Attempt)
+    )
+    return db.scalars(stmt, execution_options={"synchronize_session": False}).one_or_none()
+
+
+"""
+Удалить незабранные попытки теста (ответы и вопросы попыток — каскадом в БД), без commit.
+"""
+def discard_provisioned_attempts(db: Session, test_id: int) -> int:
+    return db.execute(
+        delete(Attempt).where(Attempt.test_id == test_id, Attempt.status == ATTEMPT_STATUS_PROVISIONED),
+        execution_options={"synchronize_session": False},
+    ).rowcount
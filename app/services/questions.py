@@ -1,19 +1,37 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 from fastapi import HTTPException, status
+from sqlalchemy.dialects.postgresql import distinct_on
 from sqlalchemy.orm import Session
 
+from app.core.fields import rows_to_dicts, select_columns
 from app.core.permissions import Permissions, ensure_default_or_permission, ensure_permission
 from app.core.security import CurrentUser
+from app.core.tracing import traced
+from app.db.writes import insert_returning
 from app.models.questions import Question
 from app.models.attempts import Attempt
 from app.models.question_versions import QuestionVersion
 from app.models.tests import Test
 from app.models.courses import Course
 from app.models.test_questions import TestQuestion
+from app.services.preprovision import discard_provisioned_attempts
+from app.services.snapshots import freeze_test_snapshot
 
 ATTEMPT_STATUS_IN_PROGRESS = "in_progress"
 
+# поля QuestionRead -> колонки (последняя версия вопроса)
+QUESTION_COLUMNS = {
+    "id": QuestionVersion.id,
+    "question_id": Question.id,
+    "version": QuestionVersion.version,
+    "author_id": Question.author_id,
+    "title": QuestionVersion.title,
+    "text": QuestionVersion.text,
+    "options": QuestionVersion.options,
+    "correct_index": QuestionVersion.correct_index,
+}
+
 
 # ---------------- Вспомогательные функции ----------------
 
@@ -69,50 +87,50 @@ def _has_active_attempt_for_question(db: Session, question_id: int, user_id: int
     )
 
 
-def _serialize_latest(question: Question, version: QuestionVersion) -> Dict[str, Any]:
-    return {
-        "id": version.id,
-        "question_id": question.id,
-        "version": version.version,
-        "author_id": question.author_id,
-        "title": version.title,
-        "text": version.text,
-        "options": version.options,
-        "correct_index": version.correct_index,
-    }
+def _ensure_test_not_locked_by_attempts(test: Test) -> None:
+    """
+    Запрет менять состав теста, если уже есть попытки (по счётчику tests.attempt_count):
+    все проходящие тест в одной «сессии» получают один снимок.
+    """
+    if test.attempt_count:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Test is locked because attempts already exist",
+        )
 
 
 # ---------------- Бизнес-логика ----------------
 
-def list_questions(db: Session, current_user: CurrentUser) -> List[Dict[str, Any]]:
+@traced
+def list_questions(db: Session, current_user: CurrentUser, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
     """
     GET /questions — список вопросов (только последняя версия).
+    fields — выбрать только эти поля (и колонки).
 
     Доступ:
       - по умолчанию: только свои вопросы
       - permission: quest:list:read — видеть вопросы других авторов
     """
-    questions = db.query(Question).filter(Question.is_deleted == False).all()
-    result: List[Dict[str, Any]] = []
-
-    for q in questions:
-        default_allowed = _is_question_author(q, current_user)
-        try:
-            ensure_default_or_permission(
-                default_allowed,
-                current_user.permissions,
-                Permissions.QUEST_LIST_READ,
-                user_roles=current_user.roles,
-            )
-        except HTTPException:
-            continue
-
-        latest = _get_latest_question_version(db, q.id)
-        result.append(_serialize_latest(q, latest))
+    try:
+        ensure_permission(current_user.permissions, Permissions.QUEST_LIST_READ, user_roles=current_user.roles)
+        see_all = True
+    except HTTPException:
+        see_all = False
+
+    # последняя версия каждого вопроса — DISTINCT ON в том же запросе
+    q = (
+        db.query(*select_columns(QUESTION_COLUMNS, fields))
+        .select_from(Question)
+        .join(QuestionVersion, QuestionVersion.question_id == Question.id)
+        .filter(Question.is_deleted == False)
+    )
+    if not see_all:
+        q = q.filter(Question.author_id == current_user.id)
 
-    return result
+    return rows_to_dicts(q.ext(distinct_on(Question.id)).order_by(Question.id, QuestionVersion.version.desc()).all())
 
 
+@traced
 def get_question(db: Session, question_id: int, current_user: CurrentUser) -> QuestionVersion:
     """
     GET /questions/{id} — последняя версия вопроса.
@@ -131,6 +149,7 @@ def get_question(db: Session, question_id: int, current_user: CurrentUser) -> Qu
     return _get_latest_question_version(db, question_id)
 
 
+@traced
 def get_question_version(db: Session, question_id: int, version: int, current_user: CurrentUser) -> QuestionVersion:
     """
     GET /questions/{id}/versions/{version} — конкретная версия.
@@ -149,10 +168,12 @@ def get_question_version(db: Session, question_id: int, version: int, current_us
     return _get_question_version_or_404(db, question_id, version)
 
 
+@traced
 def create_question(db: Session, data, current_user: CurrentUser) -> QuestionVersion:
     """
     POST /questions — создать вопрос и версию 1.
     По ТЗ требуется permission quest:create.
+    С test_id вопрос добавляется в конец теста — только пока у теста нет попыток.
     """
     test_id: Optional[int] = getattr(data, "test_id", None)
     default_allowed = False
@@ -163,6 +184,7 @@ def create_question(db: Session, data, current_user: CurrentUser) -> QuestionVer
         course = db.query(Course).filter(Course.id == test.course_id, Course.is_deleted == False).first()
         if not course:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+        _ensure_test_not_locked_by_attempts(test)
         default_allowed = course.teacher_id == current_user.id
 
     ensure_default_or_permission(
@@ -173,12 +195,11 @@ def create_question(db: Session, data, current_user: CurrentUser) -> QuestionVer
         user_roles=current_user.roles,
     )
 
-    question = Question(author_id=current_user.id, is_deleted=False)
-    db.add(question)
-    db.commit()
-    db.refresh(question)
+    question = insert_returning(db, Question, author_id=current_user.id, is_deleted=False)
 
-    v1 = QuestionVersion(
+    v1 = insert_returning(
+        db,
+        QuestionVersion,
         question_id=question.id,
         version=1,
         title=data.title,
@@ -186,7 +207,6 @@ def create_question(db: Session, data, current_user: CurrentUser) -> QuestionVer
         options=data.options,
         correct_index=data.correct_index,
     )
-    db.add(v1)
 
     if test_id:
         last = (
@@ -197,12 +217,17 @@ def create_question(db: Session, data, current_user: CurrentUser) -> QuestionVer
         )
         position = (last.position + 1) if last else 0
         db.add(TestQuestion(test_id=test_id, question_id=question.id, position=position))
+        if test.is_active:
+            # состав активного теста (попыток ещё нет) изменился — новый снимок
+            db.flush()
+            discard_provisioned_attempts(db, test.id)
+            freeze_test_snapshot(db, test)
 
     db.commit()
-    db.refresh(v1)
     return v1
 
 
+@traced
 def create_question_version(db: Session, question_id: int, data, current_user: CurrentUser) -> QuestionVersion:
     """
     POST /questions/{id}/versions — создать новую версию.
@@ -219,7 +244,9 @@ def create_question_version(db: Session, question_id: int, data, current_user: C
     last = _get_latest_question_version(db, question_id)
     next_version = last.version + 1
 
-    qv = QuestionVersion(
+    qv = insert_returning(
+        db,
+        QuestionVersion,
         question_id=question.id,
         version=next_version,
         title=data.title,
@@ -227,14 +254,13 @@ def create_question_version(db: Session, question_id: int, data, current_user: C
         options=data.options,
         correct_index=data.correct_index,
     )
-    db.add(qv)
     db.commit()
-    db.refresh(qv)
     return qv
 
 
 
 
+@traced
 def delete_question(db: Session, question_id: int, current_user: CurrentUser) -> None:
     """
     DELETE /questions/{id}
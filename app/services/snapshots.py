@@ -0,0 +1,79 @@
+"""
+Снимки тестов: состав теста замораживается при активации.
+
+set_test_active_status(True) создаёт TestSnapshot — упорядоченные пары
+(question_id, question_version_id) последних версий и ключ ответов — и ставит
+его в tests.active_snapshot_id. Дальше:
+- create_attempt копирует вопросы и пустые ответы из снимка двумя вставками,
+  не разрешая последние версии заново; все, кто проходит тест в этой «сессии»,
+  получают одни и те же версии, даже если вопрос правят во время прохождения;
+- finish_attempt считает оценку по ключу снимка в памяти.
+
+Снимок неизменяем, поэтому кэшируется в процессе по id; правка состава
+активного теста (пока попыток нет) создаёт новый снимок, а не меняет старый.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy.dialects.postgresql import distinct_on
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.singleflight import SingleFlightCache
+from app.core.tracing import traced
+from app.db.writes import insert_returning
+from app.models.question_versions import QuestionVersion
+from app.models.test_questions import TestQuestion
+from app.models.snapshots import TestSnapshot
+from app.models.tests import Test
+
+# снимок не меняется — TTL только ограничивает жизнь записей ненужных снимков
+snapshot_cache = SingleFlightCache(settings.snapshot_cache_ttl_seconds, settings.snapshot_cache_max_entries)
+metrics.register_cache("test_snapshots", snapshot_cache.stats)
+
+
+def _to_cached(snapshot: TestSnapshot) -> dict:
+    questions: List[Tuple[int, int]] = [tuple(q) for q in snapshot.questions]
+    key: Dict[int, int] = {qv_id: correct for (_, qv_id), correct in zip(questions, snapshot.answer_key)}
+    return {"id": snapshot.id, "test_id": snapshot.test_id, "questions": questions, "answer_key": key}
+
+
+@traced
+def freeze_test_snapshot(db: Session, test: Test) -> dict:
+    """
+    Создать снимок текущего состава теста и сделать его активным (без commit).
+    Последняя версия каждого вопроса и его correct_index — одним запросом (DISTINCT ON).
+    """
+    rows = (
+        db.query(TestQuestion.position, TestQuestion.question_id, QuestionVersion.id, QuestionVersion.correct_index)
+        .join(QuestionVersion, QuestionVersion.question_id == TestQuestion.question_id)
+        .filter(TestQuestion.test_id == test.id)
+        .ext(distinct_on(TestQuestion.position))
+        .order_by(TestQuestion.position, QuestionVersion.version.desc())
+        .all()
+    )
+    snapshot = insert_returning(
+        db,
+        TestSnapshot,
+        test_id=test.id,
+        created_at=datetime.utcnow(),
+        questions=[[r.question_id, r.id] for r in rows],
+        answer_key=[r.correct_index for r in rows],
+    )
+    test.active_snapshot_id = snapshot.id
+    db.add(test)
+    return _to_cached(snapshot)
+
+
+@traced
+def get_snapshot(db: Session, snapshot_id: int) -> dict:
+    """
+    Снимок из кэша процесса: {"questions": [(question_id, question_version_id), ...],
+    "answer_key": {question_version_id: correct_index}}.
+    """
+    return snapshot_cache.get_or_compute(
+        (snapshot_id,), lambda: _to_cached(db.get(TestSnapshot, snapshot_id))
+    )
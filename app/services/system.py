@@ -0,0 +1,59 @@
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.permissions import Permissions, ensure_permission
+from app.core.security import CurrentUser
+from app.core.tracing import trace_buffer
+
+
+"""
+Последние трассы из кольцевого буфера процесса (новые первыми).
+  min_duration_ms — только запросы не быстрее
+  name            — подстрока имени корневого спана ("POST /api/attempts")
+Доступ:
+  - permission: system:traces:read
+"""
+def list_traces(
+    current_user: CurrentUser,
+    limit: int = 50,
+    min_duration_ms: Optional[float] = None,
+    name: Optional[str] = None,
+) -> List[dict]:
+    ensure_permission(
+        current_user.permissions,
+        Permissions.SYSTEM_TRACES_READ,
+        "You do not have permission to read traces",
+        user_roles=current_user.roles,
+    )
+
+    result = []
+    for trace in trace_buffer.list():
+        summary = trace.summary()
+        if min_duration_ms is not None and summary["duration_ms"] < min_duration_ms:
+            continue
+        if name and name not in summary["name"]:
+            continue
+        result.append(summary)
+        if len(result) >= limit:
+            break
+    return result
+
+
+"""
+Трасса целиком в формате OTLP/JSON (resourceSpans).
+Доступ:
+  - permission: system:traces:read
+"""
+def get_trace(current_user: CurrentUser, trace_id: str) -> dict:
+    ensure_permission(
+        current_user.permissions,
+        Permissions.SYSTEM_TRACES_READ,
+        "You do not have permission to read traces",
+        user_roles=current_user.roles,
+    )
+
+    trace = trace_buffer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return trace.to_otlp()
@@ -5,11 +5,15 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
+from app.core import metrics
+from app.core.config import settings
 from app.core.permissions import Permissions, ensure_permission, ensure_default_or_permission
 from app.core.security import CurrentUser
+from app.core.singleflight import SingleFlightCache
+from app.core.tracing import traced
+from app.db.writes import insert_returning
 
 from app.models.courses import Course
-from app.models.course_users import CourseUser
 from app.models.tests import Test
 from app.models.test_questions import TestQuestion
 from app.models.questions import Question
@@ -17,13 +21,21 @@ from app.models.question_versions import QuestionVersion
 from app.models.attempts import Attempt
 from app.models.answers import Answer
 from app.models.users import User
-from app.services.notifications import create_notification
-from app.models.course_users import CourseUser
+from app.services.counters import bump
+from app.services.dashboard import dashboard_cache
+from app.services.membership import is_enrolled
+from app.services.notifications import create_course_notification
+from app.services.preprovision import discard_provisioned_attempts
+from app.services.snapshots import freeze_test_snapshot
 
 
 
 ATTEMPT_STATUS_FINISHED = "finished"
 
+# результаты теста: ключ (test_id, вид, параметры); сбрасывается finish_attempt
+test_results_cache = SingleFlightCache(settings.read_cache_ttl_seconds, settings.read_cache_max_entries)
+metrics.register_cache("test_results", test_results_cache.stats)
+
 def _get_course_or_404(db: Session, course_id: int) -> Course:
     course = db.query(Course).filter(Course.id == course_id, Course.is_deleted == False).first()
     if not course:
@@ -65,20 +77,16 @@ def _is_course_teacher(course: Course, current_user: CurrentUser) -> bool:
 
 
 def _is_student_enrolled(db: Session, course_id: int, user_id: int) -> bool:
-    return (
-        db.query(CourseUser)
-        .filter(CourseUser.course_id == course_id, CourseUser.user_id == user_id)
-        .first()
-        is not None
-    )
+    return is_enrolled(db, course_id, user_id)
 
 
-def _ensure_test_not_locked_by_attempts(db: Session, test_id: int) -> None:
+def _ensure_test_not_locked_by_attempts(test: Test) -> None:
     """
-    Запрет редактировать состав/порядок теста, если уже есть попытки.
+    Запрет редактировать состав/порядок теста, если уже есть попытки
+    (по счётчику tests.attempt_count, без запроса к attempts; на существующей
+    базе счётчик заполняет app.jobs.counters — обязательный шаг деплоя).
     """
-    any_attempt = db.query(Attempt).filter(Attempt.test_id == test_id).first()
-    if any_attempt:
+    if test.attempt_count:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Test is locked because attempts already exist",
@@ -86,6 +94,18 @@ def _ensure_test_not_locked_by_attempts(db: Session, test_id: int) -> None:
 
 
 
+def _refreeze_if_active(db: Session, test: Test) -> None:
+    """
+    Состав активного теста изменился (попыток ещё нет, см. выше) — новые попытки
+    должны получать новый состав, поэтому снимок создаётся заново.
+    """
+    if test.is_active:
+        db.flush()
+        discard_provisioned_attempts(db, test.id)
+        freeze_test_snapshot(db, test)
+
+
+@traced
 def create_test(db: Session, course_id: int, title: str, is_active: bool, current_user: CurrentUser) -> Test:
     course = _get_course_or_404(db, course_id)
     default_allowed = _is_course_teacher(course, current_user)
@@ -97,13 +117,14 @@ def create_test(db: Session, course_id: int, title: str, is_active: bool, curren
         user_roles=current_user.roles,
     )
 
-    test = Test(course_id=course_id, title=title, is_active=is_active, is_deleted=False)
-    db.add(test)
+    test = insert_returning(db, Test, course_id=course_id, title=title, is_active=is_active, is_deleted=False)
+    bump(db, Course.test_count, course_id)
     db.commit()
-    db.refresh(test)
+    dashboard_cache.clear()
     return test
 
 
+@traced
 def delete_test(db: Session, course_id: int, test_id: int, current_user: CurrentUser) -> Test:
     course = _get_course_or_404(db, course_id)
     test = _get_test_in_course_or_404(db, course_id, test_id)
@@ -119,11 +140,13 @@ def delete_test(db: Session, course_id: int, test_id: int, current_user: Current
 
     test.is_deleted = True
     db.add(test)
+    bump(db, Course.test_count, course_id, -1)
     db.commit()
-    db.refresh(test)
+    dashboard_cache.clear()
     return test
 
 
+@traced
 def get_test_active_status(db: Session, course_id: int, test_id: int, current_user: CurrentUser) -> Dict[str, bool]:
     course = _get_course_or_404(db, course_id)
     test = _get_test_in_course_or_404(db, course_id, test_id)
@@ -140,7 +163,10 @@ def get_test_active_status(db: Session, course_id: int, test_id: int, current_us
     return {"is_active": bool(test.is_active)}
 
 
-def set_test_active_status(db: Session, course_id: int, test_id: int, current_user: CurrentUser, is_active: bool) -> Test:
+@traced
+def set_test_active_status(
+    db: Session, course_id: int, test_id: int, current_user: CurrentUser, is_active: bool, preprovision: bool = False
+) -> Test:
     course = _get_course_or_404(db, course_id)
     test = _get_test_in_course_or_404(db, course_id, test_id)
 
@@ -153,7 +179,26 @@ def set_test_active_status(db: Session, course_id: int, test_id: int, current_us
         user_roles=current_user.roles,
     )
 
+    if is_active == bool(test.is_active) and (not is_active or test.active_snapshot_id is not None):
+        # повторный запрос: снимок и подготовленные попытки остаются, меняется только preprovision
+        preprovision = is_active and preprovision
+        if bool(test.preprovision) != preprovision:
+            test.preprovision = preprovision
+            if not preprovision:
+                discard_provisioned_attempts(db, test.id)
+            db.add(test)
+            db.commit()
+        return test
+
     test.is_active = is_active
+    test.preprovision = is_active and preprovision
+    # незабранные попытки относятся к прежнему снимку
+    discard_provisioned_attempts(db, test.id)
+    # новая активация — новый снимок состава; попытки прошлых сессий ссылаются на свои
+    if is_active:
+        freeze_test_snapshot(db, test)
+    else:
+        test.active_snapshot_id = None
     if not is_active:
         in_progress = (
             db.query(Attempt)
@@ -165,28 +210,31 @@ def set_test_active_status(db: Session, course_id: int, test_id: int, current_us
             db.add(a)
 
     if is_active:
-        students = db.query(CourseUser).filter(CourseUser.course_id == course.id).all()
-        for s in students:
-            create_notification(
-                db,
-                user_id=s.user_id,
-                message=f"Тест «{test.title}» активирован и доступен для прохождения.",
-                payload={"type": "test_active", "course_id": course.id, "test_id": test.id},
-            )
+        create_course_notification(
+            db,
+            course_id=course.id,
+            message=f"Тест «{test.title}» активирован и доступен для прохождения.",
+            payload={"type": "test_active", "course_id": course.id, "test_id": test.id},
+        )
 
 
     db.add(test)
     db.commit()
-    db.refresh(test)
+    # тест появился/пропал у всех студентов курса
+    dashboard_cache.clear()
+    if not is_active:
+        # незавершённые попытки закрыты — результаты теста изменились
+        test_results_cache.invalidate(test.id)
     return test
 
 
+@traced
 def add_question_to_test(db: Session, test_id: int, question_id: int, current_user: CurrentUser) -> TestQuestion:
     test = _get_test_or_404(db, test_id)
     course = _get_course_or_404(db, test.course_id)
     question = _get_question_or_404(db, question_id)
 
-    _ensure_test_not_locked_by_attempts(db, test.id)
+    _ensure_test_not_locked_by_attempts(test)
 
     # default: преподаватель курса И автор вопроса
     default_allowed = _is_course_teacher(course, current_user) and (question.author_id == current_user.id)
@@ -215,15 +263,17 @@ def add_question_to_test(db: Session, test_id: int, question_id: int, current_us
 
     link = TestQuestion(test_id=test.id, question_id=question.id, position=next_pos)
     db.add(link)
+    _refreeze_if_active(db, test)
     db.commit()
     return link
 
 
+@traced
 def remove_question_from_test(db: Session, test_id: int, question_id: int, current_user: CurrentUser) -> None:
     test = _get_test_or_404(db, test_id)
     course = _get_course_or_404(db, test.course_id)
 
-    _ensure_test_not_locked_by_attempts(db, test.id)
+    _ensure_test_not_locked_by_attempts(test)
 
     default_allowed = _is_course_teacher(course, current_user)
     ensure_default_or_permission(
@@ -255,14 +305,16 @@ def remove_question_from_test(db: Session, test_id: int, question_id: int, curre
     for i, l in enumerate(links):
         l.position = i
         db.add(l)
+    _refreeze_if_active(db, test)
     db.commit()
 
 
+@traced
 def reorder_test_questions(db: Session, test_id: int, question_ids: List[int], current_user: CurrentUser) -> List[TestQuestion]:
     test = _get_test_or_404(db, test_id)
     course = _get_course_or_404(db, test.course_id)
 
-    _ensure_test_not_locked_by_attempts(db, test.id)
+    _ensure_test_not_locked_by_attempts(test)
 
     default_allowed = _is_course_teacher(course, current_user)
     ensure_default_or_permission(
@@ -295,6 +347,7 @@ def reorder_test_questions(db: Session, test_id: int, question_ids: List[int], c
     for link in existing:
         link.position = pos_by_id[link.question_id]
         db.add(link)
+    _refreeze_if_active(db, test)
 
     db.commit()
 
@@ -308,7 +361,38 @@ def reorder_test_questions(db: Session, test_id: int, question_ids: List[int], c
 
 # ---------------- NEW: (3.8 - 3.10) results ----------------
 
-def list_test_result_users(db: Session, test_id: int, current_user: CurrentUser) -> List[User]:
+def _load_result_users(db: Session, test_id: int) -> List[dict]:
+    user_ids = (
+        db.query(Attempt.user_id)
+        .filter(Attempt.test_id == test_id, Attempt.status == ATTEMPT_STATUS_FINISHED)
+        .distinct()
+        .all()
+    )
+    ids = [x[0] for x in user_ids]
+    if not ids:
+        return []
+
+    return [{"id": u.id, "full_name": u.full_name} for u in db.query(User).filter(User.id.in_(ids)).all()]
+
+
+def _load_grades(db: Session, test_id: int, user_id: Optional[int]) -> List[dict]:
+    q = db.query(Attempt).filter(Attempt.test_id == test_id, Attempt.status == ATTEMPT_STATUS_FINISHED)
+    if user_id is not None:
+        q = q.filter(Attempt.user_id == user_id)
+
+    return [
+        {
+            "attempt_id": a.id,
+            "user_id": a.user_id,
+            "finished_at": a.finished_at,
+            "score": a.score,
+        }
+        for a in q.order_by(Attempt.finished_at.desc()).all()
+    ]
+
+
+@traced
+def list_test_result_users(db: Session, test_id: int, current_user: CurrentUser) -> List[dict]:
     """
     Пользователи, прошедшие тест (есть finished attempts).
     default: преподаватель курса
@@ -326,20 +410,11 @@ def list_test_result_users(db: Session, test_id: int, current_user: CurrentUser)
         user_roles=current_user.roles,
     )
 
-    user_ids = (
-        db.query(Attempt.user_id)
-        .filter(Attempt.test_id == test.id, Attempt.status == ATTEMPT_STATUS_FINISHED)
-        .distinct()
-        .all()
-    )
-    ids = [x[0] for x in user_ids]
-    if not ids:
-        return []
+    return test_results_cache.get_or_compute((test.id, "users"), lambda: _load_result_users(db, test.id))
 
-    return db.query(User).filter(User.id.in_(ids)).all()
 
-
-def list_test_grades(db: Session, test_id: int, current_user: CurrentUser, user_id: Optional[int]) -> List[Attempt]:
+@traced
+def list_test_grades(db: Session, test_id: int, current_user: CurrentUser, user_id: Optional[int]) -> List[dict]:
     """
     Оценки пользователей (finished attempts).
     default:
@@ -363,13 +438,12 @@ def list_test_grades(db: Session, test_id: int, current_user: CurrentUser, user_
         user_roles=current_user.roles,
     )
 
-    q = db.query(Attempt).filter(Attempt.test_id == test.id, Attempt.status == ATTEMPT_STATUS_FINISHED)
-    if user_id is not None:
-        q = q.filter(Attempt.user_id == user_id)
-
-    return q.order_by(Attempt.finished_at.desc()).all()
+    return test_results_cache.get_or_compute(
+        (test.id, "grades", user_id), lambda: _load_grades(db, test.id, user_id)
+    )
 
 
+@traced
 def list_test_answers(db: Session, test_id: int, current_user: CurrentUser, user_id: Optional[int]) -> List[dict]:
     """
     Ответы пользователей по тесту.
@@ -403,42 +477,46 @@ def list_test_answers(db: Session, test_id: int, current_user: CurrentUser, user
     if user_id is not None:
         attempts_q = attempts_q.filter(Attempt.user_id == user_id)
 
-    attempts = attempts_q.all()
-    if not attempts:
+    result = {
+        a.id: {
+            "attempt_id": a.id,
+            "user_id": a.user_id,
+            "finished_at": a.finished_at,
+            "score": a.score,
+            "answers": [],
+        }
+        for a in attempts_q.all()
+    }
+    if not result:
         return []
 
-    result = []
-    for a in attempts:
-        answers = db.query(Answer).filter(Answer.attempt_id == a.id).all()
-
-        # подтягиваем correct_index из зафиксированной версии
-        version_ids = [x.question_version_id for x in answers]
-        versions = db.query(QuestionVersion).filter(QuestionVersion.id.in_(version_ids)).all()
-        correct_map = {v.id: v.correct_index for v in versions}
-
-        items = []
-        for ans in answers:
-            correct_index = correct_map.get(ans.question_version_id, -999999)
-            is_correct = (ans.value == correct_index)
-            items.append(
-                {
-                    "answer_id": ans.id,
-                    "question_id": ans.question_id,
-                    "question_version_id": ans.question_version_id,
-                    "value": ans.value,
-                    "correct_index": correct_index,
-                    "is_correct": is_correct,
-                }
-            )
-
-        result.append(
+    # ответы всех попыток одним запросом, correct_index — из зафиксированной версии
+    rows = (
+        db.query(
+            Answer.id,
+            Answer.attempt_id,
+            Answer.question_id,
+            Answer.question_version_id,
+            Answer.value,
+            QuestionVersion.correct_index,
+        )
+        .outerjoin(QuestionVersion, QuestionVersion.id == Answer.question_version_id)
+        .filter(Answer.attempt_id.in_(list(result)))
+        .order_by(Answer.attempt_id, Answer.id)
+        .all()
+    )
+    for answer_id, attempt_id, question_id, version_id, value, correct_index in rows:
+        if correct_index is None:
+            correct_index = -999999
+        result[attempt_id]["answers"].append(
             {
-                "attempt_id": a.id,
-                "user_id": a.user_id,
-                "finished_at": a.finished_at,
-                "score": a.score,
-                "answers": items,
+                "answer_id": answer_id,
+                "question_id": question_id,
+                "question_version_id": version_id,
+                "value": value,
+                "correct_index": correct_index,
+                "is_correct": value == correct_index,
             }
         )
 
-    return result
+    return list(result.values())
@@ -1,14 +1,49 @@
-from sqlalchemy import func
+import csv
+import io
+from datetime import datetime
+from typing import Iterator
+
+from sqlalchemy import ARRAY, String, cast, func, literal, literal_column, or_, tuple_
+from sqlalchemy.dialects.postgresql import array, insert as pg_insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from app.models.attempts import Attempt
-from app.models.course_users import CourseUser
+from app.models.courses import Course
+from app.models.tests import Test
 from app.models.users import User
-from app.schemas.user import UserCreate, UserRead, UserBase
+from app.schemas.user import UserCreate, UserRead, UserBase, UserUpsert
+from app.core.config import settings
+from app.core.fields import rows_to_dicts, select_columns
+from app.db.writes import insert_returning, update_returning
 from app.core.security import CurrentUser
 from app.core.permissions import ensure_permission, ensure_default_or_permission
 from app.core.permissions import *
+from app.core.tracing import traced
+from app.utils.batching import chunked
+
+# поля UserRead -> колонки; пустой email отдаём как null (как валидатор UserBase)
+USER_COLUMNS = {
+    "username": User.username,
+    "full_name": User.full_name,
+    "email": func.nullif(User.email, ""),
+    "is_blocked": User.is_blocked,
+    "id": User.id,
+}
+
+ATTEMPT_STATUS_FINISHED = "finished"
+
+# поля UserTranscriptItem -> колонки (порядок = столбцы CSV)
+TRANSCRIPT_COLUMNS = {
+    "attempt_id": Attempt.id,
+    "course_id": Course.id,
+    "course_title": Course.title,
+    "test_id": Test.id,
+    "test_title": Test.title,
+    "started_at": Attempt.started_at,
+    "finished_at": Attempt.finished_at,
+    "score": Attempt.score,
+}
 
 
 """
@@ -23,11 +58,41 @@ def _get_user_or_404(db: Session, user_id: int) -> User:
 
 
 """
-Получить список всех пользователей
+Обновить поля пользователя одним UPDATE ... RETURNING
+Вспомогательная-private функция
+"""
+def _update_user_or_404(db: Session, user_id: int, **values) -> User:
+    user = update_returning(db, User, user_id, **values)
+    if not user:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    db.commit()
+    return user
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+"""
+Получить список пользователей (поиск + keyset-пагинация по id)
+  q       — префиксный и нечёткий (pg_trgm) поиск по username, full_name, email
+  role    — фильтр по роли (GIN-индекс по roles)
+  after_id — id последнего пользователя предыдущей страницы
+  fields  — выбрать только эти поля UserRead (и колонки)
 Доступ:
   - permission: user:list:read
 """
-def list_users(db: Session, current_user: CurrentUser) -> list[User]:
+@traced
+def list_users(
+    db: Session,
+    current_user: CurrentUser,
+    q: str | None = None,
+    role: str | None = None,
+    after_id: int | None = None,
+    limit: int = 50,
+    fields: tuple[str, ...] | None = None,
+) -> list[dict]:
     # Проверка разрешения на просмотр списка пользователей
     ensure_permission(
         current_user.permissions,
@@ -35,10 +100,126 @@ def list_users(db: Session, current_user: CurrentUser) -> list[User]:
         "You do not have permission to list users",
         user_roles=current_user.roles,
     )
-    return db.query(User).all()
+
+    query = db.query(*select_columns(USER_COLUMNS, fields))
+
+    term = (q or "").strip()
+    if term:
+        prefix = _escape_like(term) + "%"
+        conditions = [
+            User.username.ilike(prefix, escape="\\"),
+            User.full_name.ilike(prefix, escape="\\"),
+            User.email.ilike(prefix, escape="\\"),
+        ]
+        if len(term) >= settings.users_search_min_fuzzy_length:
+            conditions += [
+                User.username.op("%")(term),
+                User.email.op("%")(term),
+                # word similarity: совпадение с любым словом ФИО
+                literal(term).op("<%")(User.full_name),
+            ]
+        query = query.filter(or_(*conditions))
+
+    if role:
+        # users.roles — обобщённый ARRAY, поэтому @> записываем явно
+        query = query.filter(User.roles.op("@>")(cast(array([role]), ARRAY(String))))
+
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+
+    return rows_to_dicts(query.order_by(User.id.asc()).limit(limit).all())
+
+
+def _ensure_transcript_access(db: Session, user_id: int, current_user: CurrentUser) -> None:
+    ensure_default_or_permission(
+        user_id == current_user.id,
+        current_user.permissions,
+        Permissions.USER_DATA_READ,
+        msg="You do not have permission to read this user's transcript",
+        user_roles=current_user.roles,
+    )
+    if user_id != current_user.id and db.query(User.id).filter(User.id == user_id).first() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+
+"""
+Одна страница транскрипта: завершённые попытки пользователя от новых к старым.
+Keyset по (finished_at, id) — индекс ix_attempts_user_finished читается в обратном порядке,
+страница стоит одинаково на любой глубине. Попытки удалённых тестов/курсов тоже входят.
+"""
+def _transcript_page(db: Session, user_id: int, after: tuple[datetime, int] | None, limit: int) -> list[dict]:
+    query = (
+        db.query(*select_columns(TRANSCRIPT_COLUMNS, None))
+        .join(Test, Test.id == Attempt.test_id)
+        .join(Course, Course.id == Test.course_id)
+        .filter(
+            Attempt.user_id == user_id,
+            Attempt.status == ATTEMPT_STATUS_FINISHED,
+            # закрытые деактивацией теста попытки не имеют finished_at и оценки
+            Attempt.finished_at.isnot(None),
+        )
+    )
+    if after is not None:
+        query = query.filter(tuple_(Attempt.finished_at, Attempt.id) < tuple_(*after))
+    return rows_to_dicts(query.order_by(Attempt.finished_at.desc(), Attempt.id.desc()).limit(limit).all())
+
+
+"""
+Транскрипт пользователя: все завершённые попытки с курсом, тестом и оценкой.
+  after_finished_at, after_id — finished_at и attempt_id последней строки предыдущей страницы
+Доступ:
+  - по умолчанию: о себе
+  - permission: user:data:read для других
+"""
+@traced
+def get_user_transcript(
+    db: Session,
+    user_id: int,
+    current_user: CurrentUser,
+    after_finished_at: datetime | None = None,
+    after_id: int | None = None,
+    limit: int = 50,
+) -> list[dict]:
+    if (after_finished_at is None) != (after_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_finished_at and after_id must be passed together",
+        )
+    _ensure_transcript_access(db, user_id, current_user)
+    after = (after_finished_at, after_id) if after_id is not None else None
+    return _transcript_page(db, user_id, after, limit)
+
+
+def _iter_transcript_csv(db: Session, user_id: int) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(TRANSCRIPT_COLUMNS)
+    after = None
+    while True:
+        rows = _transcript_page(db, user_id, after, settings.bulk_chunk_size)
+        for row in rows:
+            writer.writerow(row.values())
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        if len(rows) < settings.bulk_chunk_size:
+            return
+        after = (rows[-1]["finished_at"], rows[-1]["attempt_id"])
+
+
+"""
+Транскрипт целиком в CSV (для учебного отдела).
+Доступ проверяется сразу, строки читаются страницами по bulk_chunk_size
+во время отправки ответа — память не растёт с длиной транскрипта.
+"""
+@traced
+def stream_user_transcript_csv(db: Session, user_id: int, current_user: CurrentUser) -> Iterator[str]:
+    _ensure_transcript_access(db, user_id, current_user)
+    return _iter_transcript_csv(db, user_id)
 
 
 # Получение информации о пользователе (ФИО)
+@traced
 def get_user_basic_info(db: Session, current_user: CurrentUser, user_id: int) -> User:
     """
     Получить информацию о пользователе (ФИО).
@@ -50,6 +231,7 @@ def get_user_basic_info(db: Session, current_user: CurrentUser, user_id: int) ->
     return user
 
 
+@traced
 def get_user_data(db: Session, user_id: int, current_user: CurrentUser) -> dict:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -64,20 +246,6 @@ def get_user_data(db: Session, user_id: int, current_user: CurrentUser) -> dict:
         user_roles=current_user.roles,
     )
 
-    courses_count = (
-        db.query(func.count())
-        .select_from(CourseUser)
-        .filter(CourseUser.user_id == user_id)
-        .scalar()
-    ) or 0
-
-    attempts_count = (
-        db.query(func.count())
-        .select_from(Attempt)
-        .filter(Attempt.user_id == user_id)
-        .scalar()
-    ) or 0
-
     return {
         "id": user.id,
         "username": user.username,
@@ -85,8 +253,8 @@ def get_user_data(db: Session, user_id: int, current_user: CurrentUser) -> dict:
         "email": user.email,
         "is_blocked": current_user.is_blocked,
         "roles": list(user.roles or []),
-        "courses_count": int(courses_count),
-        "attempts_count": int(attempts_count),
+        "courses_count": int(user.courses_count or 0),
+        "attempts_count": int(user.attempts_count or 0),
     }
 
 """
@@ -95,6 +263,7 @@ def get_user_data(db: Session, user_id: int, current_user: CurrentUser) -> dict:
   + Себе
   - Другому (нужен permission user:fullName:write)
 """
+@traced
 def update_user_full_name(db: Session, current_user: CurrentUser, user_id: int, new_full_name: str) -> User:
     is_self = current_user.id == user_id
     ensure_default_or_permission(
@@ -104,15 +273,12 @@ def update_user_full_name(db: Session, current_user: CurrentUser, user_id: int,
         "You do not have permission to update this user's full name",
         user_roles=current_user.roles,
     )
-    user = _get_user_or_404(db, user_id)
-    user.full_name = new_full_name
-    db.commit()
-    db.refresh(user)
-    return user
+    return _update_user_or_404(db, user_id, full_name=new_full_name)
 
 
 
 
+@traced
 def get_user_roles(db: Session, user_id: int, current_user: CurrentUser) -> list[str]:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -131,11 +297,8 @@ def get_user_roles(db: Session, user_id: int, current_user: CurrentUser) -> list
     return list(user.roles or [])
 
 
+@traced
 def set_user_roles(db: Session, user_id: int, roles: list[str], current_user: CurrentUser) -> list[str]:
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
     ensure_permission(
         current_user.permissions,
         Permissions.USER_ROLES_WRITE,
@@ -152,10 +315,7 @@ def set_user_roles(db: Session, user_id: int, roles: list[str], current_user: Cu
         seen.add(r)
         clean.append(r)
 
-    user.roles = clean
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    user = _update_user_or_404(db, user_id, roles=clean)
     return list(user.roles or [])
 
 
@@ -165,6 +325,7 @@ def set_user_roles(db: Session, user_id: int, roles: list[str], current_user: Cu
 Доступ:
   - permission: user:block:read
 """
+@traced
 def get_user_block_status(db: Session, current_user: CurrentUser, user_id: int) -> bool:
     ensure_permission(
         current_user.permissions,
@@ -181,6 +342,7 @@ def get_user_block_status(db: Session, current_user: CurrentUser, user_id: int)
 Доступ:
   - permission: user:block:write
 """
+@traced
 def set_user_block_status(db: Session, current_user: CurrentUser, user_id: int, blocked: bool) -> User:
     ensure_permission(
         current_user.permissions, 
@@ -189,30 +351,26 @@ def set_user_block_status(db: Session, current_user: CurrentUser, user_id: int,
         user_roles=current_user.roles,
     )
     
-    user = _get_user_or_404(db, user_id)
-    user.is_blocked = blocked
-    db.commit()
-    db.refresh(user)
-    return user
+    return _update_user_or_404(db, user_id, is_blocked=blocked)
 
 
 """
 Запись пользователя.
 Вызывается модулем логики при создании нового пользователя
 """
+@traced
 def create_user(db: Session, data: UserCreate, user_id: int) -> User:
-    user = User(
-        id=user_id,
-        username=data.username,
-        full_name=data.full_name,
-        email=data.email,
-        is_blocked=data.is_blocked,
-        roles=list(data.roles or []),
-    )
-
-    db.add(user)
-
     try:
+        user = insert_returning(
+            db,
+            User,
+            id=user_id,
+            username=data.username,
+            full_name=data.full_name,
+            email=data.email,
+            is_blocked=data.is_blocked,
+            roles=list(data.roles or []),
+        )
         db.commit()
     except IntegrityError:
         db.rollback()
@@ -221,5 +379,79 @@ def create_user(db: Session, data: UserCreate, user_id: int) -> User:
             detail="User with given id, username or email already exists"
         )
 
-    db.refresh(user)
     return user
+
+
+"""
+Массовая запись/обновление пользователей (ночная синхронизация модуля авторизации).
+Доступ:
+  - permission: user:sync (сервисный токен)
+INSERT ... ON CONFLICT (id) DO UPDATE пачками в одной транзакции.
+Строки, чей username уже занят другим id, не пишутся и получают статус conflict.
+"""
+UPSERT_FIELDS = ("username", "full_name", "email", "roles", "is_blocked")
+
+
+@traced
+def upsert_users_bulk(db: Session, users: list[UserUpsert], current_user: CurrentUser) -> list[dict]:
+    ensure_permission(
+        current_user.permissions,
+        Permissions.USER_SYNC,
+        "You do not have permission to sync users",
+        user_roles=current_user.roles,
+    )
+
+    # при повторе id побеждает последняя запись
+    by_id = {u.id: u for u in users}
+    statuses: dict[int, dict] = {}
+
+    for chunk in chunked(list(by_id.values()), settings.bulk_chunk_size):
+        owners = dict(
+            db.query(User.username, User.id)
+            .filter(User.username.in_([u.username for u in chunk]))
+            .all()
+        )
+
+        rows = []
+        for u in chunk:
+            owner = owners.get(u.username)
+            if owner is not None and owner != u.id:
+                statuses[u.id] = {
+                    "id": u.id,
+                    "status": "conflict",
+                    "detail": f"username is already taken by user {owner}",
+                }
+                continue
+            owners[u.username] = u.id
+            rows.append(
+                {
+                    "id": u.id,
+                    "username": u.username,
+                    "full_name": u.full_name,
+                    "email": u.email,
+                    "roles": list(u.roles or []),
+                    "is_blocked": u.is_blocked,
+                }
+            )
+        if not rows:
+            continue
+
+        stmt = pg_insert(User).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.id],
+            set_={name: stmt.excluded[name] for name in UPSERT_FIELDS},
+        ).returning(User.id, literal_column("xmax = 0").label("inserted"))
+
+        try:
+            result = db.execute(stmt).all()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Bulk upsert violates a unique constraint, nothing was written",
+            )
+        for row in result:
+            statuses[row.id] = {"id": row.id, "status": "inserted" if row.inserted else "updated", "detail": None}
+
+    db.commit()
+    return [statuses[uid] for uid in by_id]
@@ -0,0 +1,86 @@
+"""
+pytest-плагин бюджета SQL-запросов.
+
+Подключение в conftest.py:
+    pytest_plugins = ["app.testing.pytest_plugin"]
+
+- включает settings.query_budget_strict: превышение бюджета маршрута или
+  повтор формы запроса (N+1) роняет запрос QueryBudgetExceeded
+  (отключается --no-query-budget-strict);
+- --query-baseline=FILE: максимум запросов по каждому маршруту за прогон
+  сравнивается с сохранённым, рост хотя бы по одному маршруту — падение сессии;
+  --query-baseline-update (или отсутствующий файл) перезаписывает базовую линию;
+- фикстура query_counter считает запросы кода, вызванного напрямую, без HTTP.
+"""
+import json
+import os
+from typing import Dict
+
+import pytest
+
+from app.core.config import settings
+from app.core.query_budget import QueryStats, capture_queries, observe
+
+_route_counts_key = pytest.StashKey[Dict[str, int]]()
+_grown_key = pytest.StashKey[Dict[str, tuple]]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("query-budget")
+    group.addoption("--query-baseline", default=None, metavar="FILE", help="JSON file with per-route query counts")
+    group.addoption("--query-baseline-update", action="store_true", help="rewrite the query baseline file")
+    group.addoption("--no-query-budget-strict", action="store_true", help="log budget violations instead of raising")
+
+
+def pytest_configure(config):
+    if not config.getoption("no_query_budget_strict"):
+        settings.query_budget_strict = True
+
+    route_counts: Dict[str, int] = {}
+    config.stash[_route_counts_key] = route_counts
+
+    def record(stats: QueryStats) -> None:
+        route_counts[stats.route] = max(route_counts.get(stats.route, 0), stats.count)
+
+    observe(record)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    config = session.config
+    path = config.getoption("query_baseline")
+    observed = config.stash.get(_route_counts_key, {})
+    if not path or not observed:
+        return
+
+    if config.getoption("query_baseline_update") or not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(sorted(observed.items())), f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        return
+
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    grown = {
+        route: (baseline[route], count)
+        for route, count in sorted(observed.items())
+        if route in baseline and count > baseline[route]
+    }
+    config.stash[_grown_key] = grown
+    if grown:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    grown = config.stash.get(_grown_key, {})
+    if not grown:
+        return
+    terminalreporter.section("query budget")
+    for route, (was, now) in grown.items():
+        terminalreporter.write_line(f"{route}: {was} -> {now} queries")
+
+
+@pytest.fixture
+def query_counter():
+    with capture_queries() as stats:
+        yield stats
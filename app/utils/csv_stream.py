@@ -0,0 +1,37 @@
+import csv
+from typing import AsyncIterable, AsyncIterator
+
+from fastapi import HTTPException, status
+
+
+async def _iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    buf = b""
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buf:
+        yield buf.decode("utf-8-sig").rstrip("\r")
+
+
+async def iter_csv_ints(chunks: AsyncIterable[bytes]) -> AsyncIterator[int]:
+    """
+    Читает первый столбец CSV из потока байт и отдаёт его как int.
+    Пустые строки пропускаются, нечисловая первая строка считается заголовком.
+    """
+    line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        value = next(csv.reader([line]))[0].strip()
+        try:
+            yield int(value)
+        except ValueError:
+            if line_no == 1:
+                continue
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid user id on line {line_no}: {value!r}",
+            )
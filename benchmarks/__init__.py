@@ -0,0 +1,5 @@
+"""
+Нагрузочные прогоны на локальной базе.
+
+    python -m benchmarks.exam --help
+"""
@@ -0,0 +1,240 @@
+"""
+Прогон живого экзамена через настоящее приложение (httpx + ASGITransport, без сети).
+
+    python -m benchmarks.exam [--students 100] [--concurrency 50] [--output benchmarks/baseline.json]
+    python -m benchmarks.exam --compare benchmarks/baseline.json
+
+Пустая база заполняется app.db.seed (размер — флаги --seed-*), непустая используется как есть.
+Сценарий на тесте --test-id (по умолчанию — первый тест курса --course-id):
+  1. преподаватель выключает тест (подготовка, без замера) и активирует его;
+  2. N записанных на курс студентов одновременно: create_attempt -> ответы попытки ->
+     автосохранение PATCH каждого ответа (--autosaves раз) -> finish_attempt;
+  3. преподаватель --result-pulls раз забирает результаты (users, grades, answers).
+По каждому эндпоинту — p50/p95/p99 латентности и число SQL-запросов на запрос.
+Код выхода 1, если при --compare найдены регрессии.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+from jose import jwt
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core import query_budget
+from app.core.config import settings
+from app.db.seed import SeedConfig, seed
+from app.db.session import SessionLocal, engine
+from app.main import app
+from benchmarks.report import Recorder, build_report, compare, print_summary, write_report
+
+
+@dataclass
+class Exam:
+    course_id: int
+    test_id: int
+    teacher: dict
+    students: List[dict]
+
+
+def auth_headers(user: dict) -> Dict[str, str]:
+    token = jwt.encode(
+        {
+            "sub": str(user["id"]),
+            "username": user["username"],
+            "fullName": user["full_name"],
+            "email": user["email"],
+            "roles": list(user["roles"] or []),
+            "permissions": [],
+        },
+        settings.secret_key,
+        algorithm=settings.algorithm,
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+def load_exam(db: Session, course_id: int, test_id: Optional[int], students: int) -> Exam:
+    user_columns = "u.id, u.username, u.full_name, u.email, u.roles"
+    teacher = db.execute(
+        text(f"SELECT {user_columns} FROM courses c JOIN users u ON u.id = c.teacher_id WHERE c.id = :c"),
+        {"c": course_id},
+    ).mappings().first()
+    if teacher is None:
+        raise SystemExit(f"Course {course_id} not found")
+
+    if test_id is None:
+        test_id = db.execute(
+            text("SELECT id FROM tests WHERE course_id = :c AND NOT is_deleted ORDER BY id LIMIT 1"),
+            {"c": course_id},
+        ).scalar()
+        if test_id is None:
+            raise SystemExit(f"Course {course_id} has no tests")
+
+    rows = db.execute(
+        text(
+            f"SELECT {user_columns} FROM course_users cu JOIN users u ON u.id = cu.user_id "
+            "WHERE cu.course_id = :c ORDER BY u.id LIMIT :n"
+        ),
+        {"c": course_id, "n": students},
+    ).mappings().all()
+    if len(rows) < students:
+        raise SystemExit(f"Course {course_id} has only {len(rows)} students, raise --seed-students-per-course")
+
+    return Exam(course_id, test_id, dict(teacher), [dict(r) for r in rows])
+
+
+class BenchClient:
+    """
+    Обёртка над AsyncClient: ограничивает число одновременных запросов и
+    пишет латентность под ключом "METHOD /path/{param}".
+    """
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, concurrency: int):
+        self.client = client
+        self.recorder = recorder
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(self, method: str, template: str, headers: dict, json: Optional[dict] = None, **params) -> httpx.Response:
+        async with self.semaphore:
+            started = time.perf_counter()
+            resp = await self.client.request(method, template.format(**params), headers=headers, json=json)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self.recorder.add_latency(f"{method} {template}", elapsed_ms, ok=resp.status_code < 400)
+        return resp
+
+
+async def student_exam(bench: BenchClient, exam: Exam, student: dict, autosaves: int, rng: random.Random) -> None:
+    headers = auth_headers(student)
+
+    resp = await bench.call("POST", "/api/attempts/tests/{test_id}", headers, test_id=exam.test_id)
+    if resp.status_code >= 400:
+        return
+    attempt_id = resp.json()["id"]
+
+    resp = await bench.call("GET", "/api/answers/attempts/{attempt_id}", headers, attempt_id=attempt_id)
+    answers = resp.json() if resp.status_code < 400 else []
+
+    for answer in answers:
+        for _ in range(autosaves):
+            # у вопроса минимум два варианта ответа
+            await bench.call(
+                "PATCH", "/api/answers/{answer_id}", headers, json={"value": rng.randrange(2)}, answer_id=answer["id"]
+            )
+
+    await bench.call("POST", "/api/attempts/{attempt_id}/finish", headers, attempt_id=attempt_id)
+
+
+async def teacher_results(bench: BenchClient, exam: Exam, pulls: int) -> None:
+    headers = auth_headers(exam.teacher)
+    for _ in range(pulls):
+        for kind in ("users", "grades", "answers"):
+            await bench.call("GET", f"/api/tests/{{test_id}}/results/{kind}", headers, test_id=exam.test_id)
+
+
+async def run_exam(exam: Exam, args: argparse.Namespace) -> tuple:
+    recorder = Recorder()
+    phases: Dict[str, float] = {}
+    teacher = auth_headers(exam.teacher)
+    active_path = f"/api/courses/{exam.course_id}/tests/{exam.test_id}/active"
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        # подготовка: тест выключен, незавершённые попытки прошлых прогонов закрыты
+        resp = await client.patch(active_path, json={"is_active": False}, headers=teacher)
+        resp.raise_for_status()
+
+        query_budget.observe(lambda stats: recorder.add_queries(stats.route, stats.count))
+        bench = BenchClient(client, recorder, args.concurrency)
+
+        started = time.perf_counter()
+        resp = await bench.call(
+            "PATCH", "/api/courses/{course_id}/tests/{test_id}/active", teacher,
+            json={"is_active": True}, course_id=exam.course_id, test_id=exam.test_id,
+        )
+        resp.raise_for_status()
+        phases["activate"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                student_exam(bench, exam, s, args.autosaves, random.Random(args.random_seed + s["id"]))
+                for s in exam.students
+            )
+        )
+        phases["exam"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await teacher_results(bench, exam, args.result_pulls)
+        phases["results"] = time.perf_counter() - started
+
+    return recorder, phases
+
+
+def parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--course-id", type=int, default=1)
+    parser.add_argument("--test-id", type=int, default=None)
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50, help="max requests in flight")
+    parser.add_argument("--autosaves", type=int, default=1, help="PATCH requests per answer")
+    parser.add_argument("--result-pulls", type=int, default=5)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report (baseline) to this file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p95 growth")
+    for f in fields(SeedConfig):
+        parser.add_argument(f"--seed-{f.name.replace('_', '-')}", dest=f"seed_{f.name}", type=int, default=f.default)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    seed_config = SeedConfig(**{f.name: getattr(args, f"seed_{f.name}") for f in fields(SeedConfig)})
+
+    logging.basicConfig(level=logging.WARNING)
+    # echo (settings.debug) и предупреждения о N+1 на каждый запрос искажают замеры
+    engine.echo = False
+    logging.getLogger("app.core.query_budget").setLevel(logging.ERROR)
+
+    db = SessionLocal()
+    try:
+        if not db.execute(text("SELECT EXISTS (SELECT 1 FROM users)")).scalar():
+            print("Seeding an empty database...", file=sys.stderr)
+            seed(db, seed_config)
+        exam = load_exam(db, args.course_id, args.test_id, args.students)
+    finally:
+        db.close()
+
+    recorder, phases = asyncio.run(run_exam(exam, args))
+
+    config = {
+        k: v for k, v in vars(args).items()
+        if k not in ("output", "compare", "tolerance") and not k.startswith("seed_")
+    }
+    config.update(test_id=exam.test_id, seed=asdict(seed_config))
+    report = build_report("exam", config, recorder.summary(), phases)
+
+    print_summary(report["endpoints"])
+    print("phases: " + ", ".join(f"{k} {v:.2f}s" for k, v in report["phases_s"].items()))
+
+    if args.output:
+        write_report(args.output, report)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            problems = compare(json.load(f), report, args.tolerance)
+        for p in problems:
+            print(f"REGRESSION {p}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Сводка замеров, JSON-базовая линия и сравнение с ней.
+"""
+import json
+import math
+import platform
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    Перцентиль с линейной интерполяцией (q в [0, 100]).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class Recorder:
+    """
+    Латентность (мс) и число SQL-запросов по эндпоинтам.
+    Ключ — "METHOD /path/{param}", как в QueryStats.route.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.queries: Dict[str, List[int]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    def add_latency(self, endpoint: str, elapsed_ms: float, ok: bool = True) -> None:
+        self.latencies[endpoint].append(elapsed_ms)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def add_queries(self, endpoint: str, count: int) -> None:
+        self.queries[endpoint].append(count)
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for endpoint in sorted(self.latencies):
+            lat = self.latencies[endpoint]
+            queries = self.queries.get(endpoint, [])
+            result[endpoint] = {
+                "requests": len(lat),
+                "errors": self.errors[endpoint],
+                "p50_ms": round(percentile(lat, 50), 2),
+                "p95_ms": round(percentile(lat, 95), 2),
+                "p99_ms": round(percentile(lat, 99), 2),
+                "max_ms": round(max(lat), 2),
+                "queries_mean": round(sum(queries) / len(queries), 2) if queries else None,
+                "queries_max": max(queries) if queries else None,
+            }
+        return result
+
+
+def build_report(name: str, config: dict, summary: Dict[str, dict], phases: Dict[str, float]) -> dict:
+    return {
+        "benchmark": name,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "phases_s": {k: round(v, 3) for k, v in phases.items()},
+        "endpoints": summary,
+    }
+
+
+def print_summary(summary: Dict[str, dict]) -> None:
+    header = f"{'endpoint':56s} {'n':>6s} {'err':>4s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'queries':>8s}"
+    print(header)
+    print("-" * len(header))
+    for endpoint, row in summary.items():
+        queries = "-" if row["queries_mean"] is None else f"{row['queries_mean']:g}"
+        print(
+            f"{endpoint:56s} {row['requests']:6d} {row['errors']:4d} "
+            f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {queries:>8s}"
+        )
+
+
+def write_report(path: str, report: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def compare(baseline: dict, report: dict, tolerance: float) -> List[str]:
+    """
+    Регрессии относительно базовой линии:
+      - p95 вырос больше чем на tolerance (доля);
+      - среднее число запросов выросло (любой рост);
+      - появились ошибки.
+    """
+    problems = []
+    for endpoint, now in report["endpoints"].items():
+        was = baseline.get("endpoints", {}).get(endpoint)
+        if not was:
+            continue
+        if was["p95_ms"] and now["p95_ms"] > was["p95_ms"] * (1 + tolerance):
+            problems.append(f"{endpoint}: p95 {was['p95_ms']} -> {now['p95_ms']} ms")
+        if was["queries_mean"] is not None and now["queries_mean"] is not None and now["queries_mean"] > was["queries_mean"]:
+            problems.append(f"{endpoint}: queries {was['queries_mean']} -> {now['queries_mean']}")
+        if now["errors"] > was["errors"]:
+            problems.append(f"{endpoint}: errors {was['errors']} -> {now['errors']}")
+    return problems
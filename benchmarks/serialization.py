@@ -0,0 +1,152 @@
+"""
+Микробенчмарк сериализации горячих списков (без базы и HTTP).
+
+    python -m benchmarks.serialization [--attempts 200] [--answers 30] [--questions 1000] [--notifications 500]
+
+Для каждого payload (ответы по тесту, список вопросов, уведомления) сравниваются пути:
+  validate+json      — валидация списка через response_model, dump в python, json.dumps
+                       (классический путь FastAPI с JSONResponse);
+  validate+dump_json — валидация + Pydantic dump_json (быстрый путь новых FastAPI);
+  FastJSONResponse   — готовые строки сервиса -> orjson, без поэлементной валидации.
+Печатает медиану и p95 (мс) на одну сериализацию и размер тела.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Sequence
+
+from pydantic import TypeAdapter
+
+from app.core.responses import FastJSONResponse
+from app.schemas.notification import NotificationRead
+from app.schemas.question import QuestionRead
+from app.schemas.tests_extra import TestAttemptAnswers
+from benchmarks.report import percentile
+
+
+def attempt_answers_rows(rng: random.Random, attempts: int, answers: int) -> List[dict]:
+    started = datetime(2024, 1, 1, 9, 0)
+    rows = []
+    for a in range(attempts):
+        items = []
+        for q in range(answers):
+            correct_index = rng.randrange(4)
+            value = rng.randrange(-1, 4)
+            items.append(
+                {
+                    "answer_id": a * answers + q + 1,
+                    "question_id": q + 1,
+                    "question_version_id": q + 1,
+                    "value": value,
+                    "correct_index": correct_index,
+                    "is_correct": value == correct_index,
+                }
+            )
+        correct = sum(i["is_correct"] for i in items)
+        rows.append(
+            {
+                "attempt_id": a + 1,
+                "user_id": 1000 + a,
+                "finished_at": started + timedelta(seconds=rng.randrange(3600), microseconds=rng.randrange(10**6)),
+                "score": Decimal(correct) / Decimal(answers) * Decimal(100),
+                "answers": items,
+            }
+        )
+    return rows
+
+
+def question_rows(rng: random.Random, count: int) -> List[dict]:
+    return [
+        {
+            "id": i + 1,
+            "question_id": i + 1,
+            "version": rng.randrange(1, 4),
+            "author_id": rng.randrange(1, 20),
+            "title": f"Вопрос {i + 1}",
+            "text": "Какой из вариантов верный? " * 4,
+            "options": [f"Вариант {k}" for k in range(4)],
+            "correct_index": rng.randrange(4),
+        }
+        for i in range(count)
+    ]
+
+
+def notification_rows(rng: random.Random, count: int) -> List[dict]:
+    created = datetime(2024, 1, 1, 9, 0)
+    return [
+        {
+            "id": i + 1,
+            "kind": "personal",
+            "course_id": None,
+            "message": f"Пользователь #{i} завершил тест «Итоговый». Результат: {rng.random() * 100:.1f}%",
+            "payload": {"type": "attempt_finished_teacher", "test_id": 1, "attempt_id": i, "user_id": i},
+            "created_at": created + timedelta(seconds=i),
+            "read_at": None,
+        }
+        for i in range(count)
+    ]
+
+
+def serializers(model) -> Dict[str, Callable[[List[dict]], bytes]]:
+    adapter = TypeAdapter(List[model])
+
+    def validate_json(rows):
+        data = adapter.dump_python(adapter.validate_python(rows), mode="json")
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def validate_dump_json(rows):
+        return adapter.dump_json(adapter.validate_python(rows))
+
+    def fast(rows):
+        return FastJSONResponse(rows).body
+
+    return {"validate+json": validate_json, "validate+dump_json": validate_dump_json, "FastJSONResponse": fast}
+
+
+def measure(fn: Callable[[], bytes], repeat: int) -> tuple:
+    timings = []
+    size = len(fn())  # прогрев
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return percentile(timings, 50), percentile(timings, 95), size
+
+
+def parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--answers", type=int, default=30, help="answers per attempt")
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--notifications", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--random-seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    rng = random.Random(args.random_seed)
+    payloads = [
+        (f"results/answers {args.attempts}x{args.answers}", TestAttemptAnswers,
+         attempt_answers_rows(rng, args.attempts, args.answers)),
+        (f"questions {args.questions}", QuestionRead, question_rows(rng, args.questions)),
+        (f"notifications {args.notifications}", NotificationRead, notification_rows(rng, args.notifications)),
+    ]
+
+    header = f"{'payload':32s} {'path':20s} {'p50 ms':>8s} {'p95 ms':>8s} {'KiB':>8s} {'speedup':>8s}"
+    print(header)
+    print("-" * len(header))
+    for name, model, rows in payloads:
+        results = {path: measure(lambda: fn(rows), args.repeat) for path, fn in serializers(model).items()}
+        baseline = results["validate+json"][0]
+        for path, (p50, p95, size) in results.items():
+            print(f"{name:32s} {path:20s} {p50:8.2f} {p95:8.2f} {size / 1024:8.1f} {baseline / p50:7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+# тесты с БД пересоздают схему public — только на отдельной базе из TEST_DATABASE_URL,
+# без неё они пропускаются; остальным настройкам без .env хватает заглушек
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("DATABASE_URL", "postgresql+psycopg2://postgres@localhost/postgres")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+pytest_plugins = ["app.testing.pytest_plugin"]
+
+
+@pytest.fixture(scope="session")
+def database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    import app.main  # noqa: F401 — все модели в Base.metadata
+    from app.db.base import Base
+    from app.db.session import engine
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA public CASCADE"))
+            conn.execute(text("CREATE SCHEMA public"))
+    except OperationalError as exc:
+        pytest.skip(f"database is unavailable: {exc.orig}")
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception:
+        # без contrib/pg_trgm trgm-индексы не создаются, поиск работает без них
+        for table in Base.metadata.tables.values():
+            for ix in list(table.indexes):
+                if "gin_trgm_ops" in str(ix.dialect_options["postgresql"].get("ops")):
+                    table.indexes.discard(ix)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def truncate_all(engine) -> None:
+    from sqlalchemy import text
+
+    from app.db.base import Base
+    from app.services.courses import courses_cache
+    from app.services.dashboard import dashboard_cache
+    from app.services.membership import membership_index
+    from app.services.snapshots import snapshot_cache
+    from app.services.tests import test_results_cache
+
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    # кэши процесса переживают TRUNCATE, а id после RESTART IDENTITY повторяются
+    for cache in (courses_cache, dashboard_cache, snapshot_cache, test_results_cache, membership_index):
+        cache.clear()
+
+
+@pytest.fixture
+def clean_db(database):
+    truncate_all(database)
+
+
+@pytest.fixture
+def db(clean_db):
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(clean_db):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def auth_headers(user_id: int, roles=()) -> dict:
+    from jose import jwt
+
+    from app.core.config import settings
+
+    payload = {
+        "sub": str(user_id),
+        "username": f"user{user_id}",
+        "fullName": f"User {user_id}",
+        "email": f"user{user_id}@example.com",
+        "roles": list(roles),
+    }
+    token = jwt.encode(payload, settings.secret_key, algorithm=settings.algorithm)
+    return {"Authorization": f"Bearer {token}"}
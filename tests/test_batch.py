@@ -0,0 +1,78 @@
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+
+from app.api.routers import batch
+from app.core.security import BATCH_USER, CurrentUser, get_current_user
+from app.db.session import BATCH_DB, get_db
+from app.models.users import User
+from tests.conftest import auth_headers
+
+
+def _batch_app() -> FastAPI:
+    # пакет выполняет под-запросы через request.app — маршруты под-запросов объявлены здесь
+    app = FastAPI()
+    app.include_router(batch.router)
+
+    @app.post("/dirty")
+    def dirty(db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+        # изменение в сессии, затем 4xx без commit
+        db.execute(update(User).where(User.id == current_user.id).values(full_name="Dirty"))
+        raise HTTPException(status_code=400, detail="Rejected")
+
+    @app.post("/commit")
+    def commit(db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+        db.commit()
+        return {}
+
+    @app.get("/whoami")
+    def whoami(request: Request, current_user: CurrentUser = Depends(get_current_user)):
+        return {
+            "id": current_user.id,
+            "batch_user": getattr(request.state, BATCH_USER, None) is not None,
+            "batch_db": getattr(request.state, BATCH_DB, None) is not None,
+        }
+
+    return app
+
+
+def _statuses(response) -> list:
+    assert response.status_code == 200, response.text
+    return [sub["status"] for sub in response.json()["responses"]]
+
+
+def test_failed_sub_request_does_not_leak_into_next_commit(client, db):
+    client.post("/api/users/create_user", headers=auth_headers(1))
+    app = TestClient(_batch_app())
+
+    response = app.post(
+        "/api/batch",
+        json={"requests": [{"method": "POST", "path": "/dirty"}, {"method": "POST", "path": "/commit"}]},
+        headers=auth_headers(1),
+    )
+    assert _statuses(response) == [400, 200]
+    assert db.execute(text("SELECT full_name FROM users WHERE id = 1")).scalar() == "User 1"
+
+
+def test_nested_batch_is_rejected(client):
+    client.post("/api/users/create_user", headers=auth_headers(1))
+    nested = {"method": "POST", "path": "/api/batch", "body": {"requests": [{"path": "/api/users/me"}]}}
+
+    response = client.post("/api/batch", json={"requests": [nested, {**nested, "path": "/api/batch/?x=1"}]}, headers=auth_headers(1))
+    assert _statuses(response) == [400, 400]
+    assert response.json()["responses"][0]["body"] == {"detail": "Invalid sub-request path"}
+
+
+def test_batch_user_is_visible_only_inside_the_batch(client):
+    for user_id in (1, 2):
+        client.post("/api/users/create_user", headers=auth_headers(user_id))
+    app = TestClient(_batch_app())
+
+    inside = app.post("/api/batch", json={"requests": [{"path": "/whoami"}]}, headers=auth_headers(1))
+    assert inside.json()["responses"][0]["body"] == {"id": 1, "batch_user": True, "batch_db": True}
+
+    # обычный запрос после пакета аутентифицируется своим токеном
+    outside = app.get("/whoami", headers=auth_headers(2))
+    assert outside.json() == {"id": 2, "batch_user": False, "batch_db": False}
+    assert app.get("/whoami", headers={"Authorization": "Bearer invalid"}).status_code == 401
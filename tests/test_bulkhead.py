@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from app.core import bulkhead as bulkhead_module
+from app.core.bulkhead import Bulkhead, Overloaded
+
+
+def _bulkhead(limit=1, queue=1, timeout=5.0) -> Bulkhead:
+    return Bulkhead("test", limit=limit, queue=queue, timeout=timeout, retry_after=1)
+
+
+def test_rejects_when_queue_is_full():
+    async def scenario():
+        b = _bulkhead(queue=0)
+        await b.acquire()
+        with pytest.raises(Overloaded):
+            await b.acquire()
+        assert b.rejected == 1
+
+    asyncio.run(scenario())
+
+
+def test_release_hands_slot_to_waiter():
+    async def scenario():
+        b = _bulkhead()
+        await b.acquire()
+        waiter = asyncio.create_task(b.acquire())
+        await asyncio.sleep(0)
+        assert b.queued == 1
+
+        b.release()
+        await asyncio.wait_for(waiter, 1)
+        assert b.in_flight == 1 and b.queued == 0
+        b.release()
+        assert b.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_queue():
+    async def scenario():
+        b = _bulkhead()
+        await b.acquire()
+        waiter = asyncio.create_task(b.acquire())
+        await asyncio.sleep(0)
+        assert b.queued == 1
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert b.queued == 0
+
+        b.release()
+        assert b.in_flight == 0
+        await asyncio.wait_for(b.acquire(), 1)
+        assert b.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_waiter_cancelled_after_grant_returns_slot():
+    async def scenario():
+        b = _bulkhead()
+        await b.acquire()
+        waiter = asyncio.create_task(b.acquire())
+        await asyncio.sleep(0)
+
+        # ждущий отменён, и в ту же итерацию цикла release() передаёт ему слот
+        waiter.cancel()
+        b.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert b.in_flight == 0 and b.queued == 0
+        await asyncio.wait_for(b.acquire(), 1)
+
+    asyncio.run(scenario())
+
+
+def test_timeout_on_queue_deadline():
+    async def scenario():
+        b = _bulkhead(timeout=0.01)
+        await b.acquire()
+        with pytest.raises(Overloaded):
+            await b.acquire()
+        assert b.timeouts == 1 and b.queued == 0 and b.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_timeout_at_the_same_moment_as_grant_keeps_slot(monkeypatch):
+    b = _bulkhead()
+
+    async def granted_then_timed_out(future, timeout):
+        # слот передаётся ждущему, но wait_for успевает истечь
+        b.release()
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        await b.acquire()
+        monkeypatch.setattr(bulkhead_module.asyncio, "wait_for", granted_then_timed_out)
+        await b.acquire()  # не Overloaded: слот уже наш
+        monkeypatch.undo()
+
+        assert b.in_flight == 1 and b.queued == 0 and b.timeouts == 0
+        b.release()
+        assert b.in_flight == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,121 @@
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import CompressedCache, CompressionMiddleware, choose_encoding
+from app.core.config import settings
+from app.core.http_cache import IMMUTABLE, conditional
+
+MIN_SIZE = 100
+ETAG = '"v1"'
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+@pytest.fixture
+def calls(monkeypatch) -> list:
+    """Только gzip, с подсчётом вызовов кодировщика; свежий кэш сжатых ответов."""
+    calls = []
+
+    def counting_gzip(body: bytes, immutable: bool) -> bytes:
+        calls.append(immutable)
+        return compression._gzip(body, immutable)
+
+    monkeypatch.setattr(compression, "ENCODERS", {"gzip": counting_gzip})
+    monkeypatch.setattr(compression, "compressed_cache", CompressedCache(1024 * 1024))
+    monkeypatch.setattr(settings, "compression_minimum_size", MIN_SIZE)
+    return calls
+
+
+@pytest.fixture
+def app_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/text/{size}")
+    def text(size: int):
+        return Response("x" * size, media_type="text/plain")
+
+    @app.get("/binary")
+    def binary():
+        return Response(b"\0" * (MIN_SIZE * 2), media_type="application/octet-stream")
+
+    @app.get("/immutable")
+    def immutable(request: Request, response: Response):
+        not_modified = conditional(request, response, ETAG, IMMUTABLE)
+        if not_modified is not None:
+            return not_modified
+        return {"body": "y" * MIN_SIZE * 2}
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("deflate, GZIP;q=0.5", "gzip"),
+        ("*", "gzip"),
+        ("gzip;q=0", None),
+        ("*;q=0.5, gzip;q=0", None),
+        ("gzip;q=abc", None),
+    ],
+)
+def test_choose_encoding(calls, accept_encoding, expected):
+    assert choose_encoding(accept_encoding) == expected
+
+
+def test_choose_encoding_prefers_by_weight_then_by_preference(monkeypatch):
+    encoders = dict.fromkeys(("br", "zstd", "gzip"), compression._gzip)
+    monkeypatch.setattr(compression, "ENCODERS", encoders)
+    assert choose_encoding("gzip, zstd, br") == "br"
+    assert choose_encoding("gzip, br;q=0.5") == "gzip"
+    assert choose_encoding("*, br;q=0") == "zstd"
+
+
+def test_small_or_binary_response_is_not_compressed(calls, app_client):
+    for path in (f"/text/{MIN_SIZE - 1}", "/binary"):
+        response = app_client.get(path, headers=GZIP)
+        assert "content-encoding" not in response.headers
+        assert "accept-encoding" not in response.headers.get("vary", "").lower()
+    assert calls == []
+
+
+def test_response_over_threshold_is_compressed(calls, app_client):
+    response = app_client.get(f"/text/{MIN_SIZE}", headers=GZIP)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == "x" * MIN_SIZE
+    assert calls == [False]
+
+    # без поддерживаемой кодировки ответ уходит как есть
+    plain = app_client.get(f"/text/{MIN_SIZE}", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+
+def test_immutable_response_is_compressed_once(calls, app_client):
+    first = app_client.get("/immutable", headers=GZIP)
+    second = app_client.get("/immutable", headers=GZIP)
+
+    assert calls == [True]
+    assert (compression.compressed_cache.misses, compression.compressed_cache.hits) == (1, 1)
+    assert first.content == second.content
+    assert second.headers["content-encoding"] == "gzip"
+    assert second.headers["etag"] == f"W/{ETAG}"
+
+
+def test_not_modified_repeats_validator_and_vary_of_compressed_response(calls, app_client):
+    ok = app_client.get("/immutable", headers=GZIP)
+    not_modified = app_client.get("/immutable", headers={**GZIP, "If-None-Match": ok.headers["etag"]})
+
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == ok.headers["etag"] == f"W/{ETAG}"
+    assert not_modified.headers["vary"] == ok.headers["vary"] == "Accept-Encoding"
+
+    # без сжатия 304 повторяет несжатый 200: сильный ETag, без Vary
+    plain = app_client.get("/immutable", headers={"Accept-Encoding": "identity", "If-None-Match": ETAG})
+    assert plain.status_code == 304
+    assert plain.headers["etag"] == ETAG
+    assert "vary" not in plain.headers
@@ -0,0 +1,32 @@
+from sqlalchemy import text
+
+from app.services.counters import ensure_counter_columns, reconcile_counters
+from tests.conftest import auth_headers
+
+
+def test_counter_column_is_added_and_backfilled(client, db):
+    admin, student = auth_headers(1, ["admin"]), auth_headers(2)
+    client.post("/api/users/create_user", headers=admin)
+    client.put("/api/users/1/roles", json={"roles": ["admin"]}, headers=admin)
+    client.post("/api/users/create_user", headers=student)
+    client.post("/api/courses/?title=C&description=d", headers=admin)
+    client.post("/api/courses/1/students", headers=student)
+    client.post("/api/courses/1/tests", json={"title": "T"}, headers=admin)
+    question = {"title": "q", "text": "t", "options": ["a", "b"], "correct_index": 1, "test_id": 1}
+    client.post("/api/questions/", json=question, headers=admin)
+    client.patch("/api/courses/1/tests/1/active", json={"is_active": True}, headers=admin)
+    assert client.post("/api/attempts/tests/1", headers=student).status_code == 201
+
+    # база до появления счётчика
+    db.execute(text("ALTER TABLE tests DROP COLUMN attempt_count"))
+    db.commit()
+
+    assert ensure_counter_columns(db) == ["tests.attempt_count"]
+    assert ensure_counter_columns(db) == []
+    assert reconcile_counters(db)["tests.attempt_count"] == 1
+    assert db.execute(text("SELECT attempt_count FROM tests WHERE id = 1")).scalar() == 1
+
+    # правка состава теста с попытками запрещена по счётчику
+    response = client.delete("/api/tests/1/questions/1", headers=admin)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Test is locked because attempts already exist"
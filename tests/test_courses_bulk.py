@@ -0,0 +1,70 @@
+import asyncio
+
+from app.core.config import settings
+from tests.conftest import auth_headers
+
+MAX_IDS = 5
+
+
+def _course(client, monkeypatch) -> dict:
+    monkeypatch.setattr(settings, "bulk_enroll_max_ids", MAX_IDS)
+    admin = auth_headers(1, ["admin"])
+    client.post("/api/users/create_user", headers=admin)
+    client.put("/api/users/1/roles", json={"roles": ["admin"]}, headers=admin)
+    client.post("/api/courses/?title=C&description=d", headers=admin)
+    return admin
+
+
+def _post_csv_stream(app, headers: dict, lines: int) -> tuple:
+    """
+    POST /api/courses/1/students/bulk одним ASGI-вызовом: по строке CSV на чанк тела.
+    Возвращает (статус, сколько чанков приложение успело прочитать).
+    """
+    chunks = [b"user_id\n"] + [f"{i}\n".encode() for i in range(1, lines + 1)]
+    consumed = 0
+    result = {}
+
+    async def receive():
+        nonlocal consumed
+        if consumed < len(chunks):
+            consumed += 1
+            return {"type": "http.request", "body": chunks[consumed - 1], "more_body": consumed < len(chunks)}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/courses/1/students/bulk",
+        "raw_path": b"/api/courses/1/students/bulk",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"text/csv")]
+        + [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    asyncio.run(app(scope, receive, send))
+    return result["status"], consumed
+
+
+def test_csv_within_limit_is_enrolled(client, monkeypatch):
+    admin = _course(client, monkeypatch)
+    body = "user_id\n1\n1\n2\n"  # повторы отбрасываются до проверки лимита
+    response = client.post("/api/courses/1/students/bulk", content=body, headers={**admin, "Content-Type": "text/csv"})
+    assert response.status_code == 200, response.text
+    assert response.json() == {"inserted": 1, "skipped": 0, "unknown": [2]}
+
+
+def test_csv_over_limit_stops_reading_with_413(client, monkeypatch):
+    admin = _course(client, monkeypatch)
+    status, consumed = _post_csv_stream(client.app, admin, lines=1000)
+    assert status == 413
+    # заголовок CSV и MAX_IDS + 1 строк, остаток потока не читается
+    assert consumed == MAX_IDS + 2
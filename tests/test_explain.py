@@ -0,0 +1,32 @@
+"""
+Планы горячих запросов (app/db/explain.py) на синтетических данных app/db/seed.py:
+без последовательных сканов больших таблиц и с ожидаемым индексом.
+"""
+import pytest
+
+from app.db.explain import HOT_QUERIES, explain, plan_problems, run_checks
+from app.db.seed import SeedConfig, seed
+from tests.conftest import truncate_all
+
+
+@pytest.fixture(scope="module")
+def seeded_db(database):
+    from app.db.session import SessionLocal
+
+    # объём по умолчанию: на меньших таблицах планировщик честно выбирает seq scan
+    truncate_all(database)
+    db = SessionLocal()
+    try:
+        seed(db, SeedConfig())
+        yield db
+    finally:
+        db.close()
+
+
+def test_run_checks_finds_no_problems(seeded_db):
+    assert run_checks(seeded_db) == {check.name: [] for check in HOT_QUERIES}
+
+
+@pytest.mark.parametrize("check", HOT_QUERIES, ids=lambda check: check.name)
+def test_hot_query_plan(seeded_db, check):
+    assert plan_problems(explain(seeded_db, check.build(seeded_db)), check) == []
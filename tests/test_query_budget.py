@@ -0,0 +1,118 @@
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.query_budget import QueryBudgetExceeded, QueryBudgetMiddleware, QueryStats, query_budget, statement_shape
+from app.db.session import get_db
+from tests.conftest import auth_headers
+
+
+# ---------------- statement_shape ----------------
+
+def test_shape_collapses_in_lists_of_different_length():
+    one = statement_shape("SELECT * FROM users WHERE users.id IN (%(id_1_1)s)")
+    three = statement_shape("SELECT * FROM users WHERE users.id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s)")
+    assert one == three == "SELECT * FROM users WHERE users.id IN (?)"
+
+
+def test_shape_collapses_multi_row_values():
+    one = statement_shape("INSERT INTO answers (attempt_id, value) VALUES (%(a_0)s, %(v_0)s)")
+    many = statement_shape(
+        "INSERT INTO answers (attempt_id, value) VALUES (%(a_0)s, %(v_0)s), (%(a_1)s, %(v_1)s), (%(a_2)s, %(v_2)s)"
+    )
+    assert one == many == "INSERT INTO answers (attempt_id, value) VALUES (?)"
+
+
+def test_shape_normalizes_whitespace_and_keeps_single_parameters():
+    shape = statement_shape("SELECT users.id\n  FROM users\n WHERE users.id = %(id_1)s\n")
+    assert shape == "SELECT users.id FROM users WHERE users.id = %(id_1)s"
+
+
+def test_shape_keeps_different_statements_apart():
+    assert statement_shape("SELECT a FROM t WHERE a IN (%(x_1)s)") != statement_shape(
+        "SELECT b FROM t WHERE b IN (%(x_1)s)"
+    )
+
+
+# ---------------- QueryStats ----------------
+
+def test_violations_over_budget():
+    stats = QueryStats(count=4, max_queries=3)
+    assert stats.violations() == ["4 queries, budget is 3"]
+    assert QueryStats(count=3, max_queries=3).violations() == []
+
+
+def test_violations_repeated_shape():
+    stats = QueryStats(count=3, max_repeats=3)
+    stats.shapes["SELECT 1"] = 3
+    assert len(stats.violations()) == 1
+    assert "possible N+1" in stats.violations()[0]
+
+    stats.max_repeats = 0
+    assert stats.violations() == []
+
+
+def test_plugin_enables_strict_mode(request):
+    # tests/conftest.py подключает app.testing.pytest_plugin
+    assert request.config.pluginmanager.has_plugin("app.testing.pytest_plugin")
+    assert settings.query_budget_strict is not request.config.getoption("no_query_budget_strict")
+
+
+# ---------------- бюджет маршрута ----------------
+
+def _budget_app(queries: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(QueryBudgetMiddleware)
+
+    @app.get("/hot", dependencies=[query_budget(2)])
+    def hot(db: Session = Depends(get_db)):
+        for _ in range(queries):
+            db.execute(text("SELECT 1"))
+        return {}
+
+    return app
+
+
+def test_route_within_budget_passes(database, monkeypatch):
+    monkeypatch.setattr(settings, "query_budget_strict", True)
+    assert TestClient(_budget_app(2)).get("/hot").status_code == 200
+
+
+def test_route_over_budget_fails(database, monkeypatch):
+    monkeypatch.setattr(settings, "query_budget_strict", True)
+    with pytest.raises(QueryBudgetExceeded, match="3 queries, budget is 2"):
+        TestClient(_budget_app(3)).get("/hot")
+
+
+def _ok(response):
+    assert response.is_success, response.text
+    return response
+
+
+def test_hot_routes_stay_within_budget(client):
+    # в строгом режиме маршрут сверх бюджета или с N+1 роняет запрос в TestClient
+    admin, student = auth_headers(1, ["admin"]), auth_headers(2)
+    _ok(client.post("/api/users/create_user", headers=admin))
+    _ok(client.put("/api/users/1/roles", json={"roles": ["admin"]}, headers=admin))
+    _ok(client.post("/api/users/create_user", headers=student))
+
+    _ok(client.post("/api/courses/?title=C&description=d", headers=admin))
+    _ok(client.post("/api/courses/1/students", headers=student))
+    _ok(client.post("/api/courses/1/tests", json={"title": "T"}, headers=admin))
+    question = {"title": "q", "text": "t", "options": ["a", "b"], "correct_index": 1, "test_id": 1}
+    for _ in range(settings.query_repeat_threshold + 2):
+        _ok(client.post("/api/questions/", json=question, headers=admin))
+    _ok(client.patch("/api/courses/1/tests/1/active", json={"is_active": True}, headers=admin))
+
+    _ok(client.get("/api/me/dashboard", headers=student))
+    attempt = _ok(client.post("/api/attempts/tests/1", headers=student))
+    _ok(client.patch("/api/answers/1", json={"value": 1}, headers=student))
+    _ok(client.post(f"/api/attempts/{attempt.json()['id']}/finish", headers=student))
+
+    _ok(client.get("/api/questions/", headers=admin))
+    _ok(client.get("/api/tests/1/results/grades", headers=admin))
+    _ok(client.get("/api/tests/1/results/answers", headers=admin))
+    _ok(client.get("/api/users/2/transcript", headers=admin))
@@ -0,0 +1,66 @@
+from sqlalchemy import text
+
+from app.models.tests import Test
+from app.services.preprovision import provision_all
+from tests.conftest import auth_headers
+
+ADMIN, STUDENT = 1, 2
+QUESTION = {"title": "q", "text": "t", "options": ["a", "b"], "correct_index": 1}
+
+
+def _active_test(client) -> dict:
+    admin = auth_headers(ADMIN, ["admin"])
+    client.post("/api/users/create_user", headers=admin)
+    client.put(f"/api/users/{ADMIN}/roles", json={"roles": ["admin"]}, headers=admin)
+    client.post("/api/users/create_user", headers=auth_headers(STUDENT))
+    client.post("/api/courses/?title=C&description=d", headers=admin)
+    client.post("/api/courses/1/students", headers=auth_headers(STUDENT))
+    client.post("/api/courses/1/tests", json={"title": "T"}, headers=admin)
+    client.post("/api/questions/", json={**QUESTION, "test_id": 1}, headers=admin)
+    assert client.patch("/api/courses/1/tests/1/active", json={"is_active": True}, headers=admin).status_code == 200
+    return admin
+
+
+def _snapshot_id(db) -> int:
+    db.expire_all()
+    return db.get(Test, 1).active_snapshot_id
+
+
+def test_question_is_not_added_to_a_test_with_attempts(client, db):
+    admin = _active_test(client)
+    assert client.post("/api/attempts/tests/1", headers=auth_headers(STUDENT)).status_code == 201
+    snapshot_id = _snapshot_id(db)
+
+    response = client.post("/api/questions/", json={**QUESTION, "test_id": 1}, headers=admin)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Test is locked because attempts already exist"
+    assert _snapshot_id(db) == snapshot_id
+
+
+def test_question_added_before_attempts_refreezes_snapshot(client, db):
+    admin = _active_test(client)
+    snapshot_id = _snapshot_id(db)
+
+    assert client.post("/api/questions/", json={**QUESTION, "test_id": 1}, headers=admin).status_code == 201
+    assert _snapshot_id(db) != snapshot_id
+
+
+def _provisioned(db) -> int:
+    return db.execute(text("SELECT count(*) FROM attempts WHERE status = 'provisioned'")).scalar()
+
+
+def test_repeated_activation_keeps_snapshot_and_provisioned_attempts(client, db):
+    admin = _active_test(client)
+    active = {"is_active": True, "preprovision": True}
+    assert client.patch("/api/courses/1/tests/1/active", json=active, headers=admin).status_code == 200
+    assert provision_all(db) == {1: 1}
+    snapshot_id = _snapshot_id(db)
+
+    assert client.patch("/api/courses/1/tests/1/active", json=active, headers=admin).status_code == 200
+    assert _snapshot_id(db) == snapshot_id
+    assert _provisioned(db) == 1
+
+    # выключение preprovision на активном тесте убирает только незабранные попытки
+    assert client.patch("/api/courses/1/tests/1/active", json={"is_active": True}, headers=admin).status_code == 200
+    assert _snapshot_id(db) == snapshot_id
+    assert _provisioned(db) == 0
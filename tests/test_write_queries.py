@@ -0,0 +1,96 @@
+"""
+Число запросов записывающих сервисов: INSERT/UPDATE ... RETURNING
+(app/db/writes.py) вместо refresh после commit.
+"""
+import pytest
+
+from app.core.query_budget import capture_queries
+from app.core.security import CurrentUser
+from app.schemas.question import QuestionCreate, QuestionVersionCreate
+from app.schemas.user import UserCreate
+from app.services.answers import reset_answer, update_answer
+from app.services.attempts import create_attempt, finish_attempt
+from app.services.courses import create_course, delete_course, enroll_user_to_course, update_course
+from app.services.notifications import create_course_notification, create_notification
+from app.services.questions import create_question, create_question_version
+from app.services.tests import create_test, delete_test, set_test_active_status
+from app.services.users import create_user, set_user_block_status, set_user_roles, update_user_full_name
+from tests.conftest import auth_headers
+
+ADMIN, STUDENT, NEWCOMER, OUTSIDER = 1, 2, 3, 4
+
+
+def _user(user_id: int, roles=()) -> CurrentUser:
+    return CurrentUser(
+        id=user_id,
+        username=f"user{user_id}",
+        full_name=f"User {user_id}",
+        email=f"user{user_id}@example.com",
+        roles=list(roles),
+    )
+
+
+def _admin() -> CurrentUser:
+    return _user(ADMIN, ["admin"])
+
+
+def _question(**extra):
+    return dict(title="q", text="t", options=["a", "b"], correct_index=1, **extra)
+
+
+def _exam(client) -> None:
+    """
+    Курс 1 администратора, активный тест 1 из двух вопросов;
+    студент 2 начал попытку 1 и ответил на второй вопрос (ответ 2),
+    студент 3 записан без попыток, пользователь 4 не записан.
+    """
+    admin = auth_headers(ADMIN, ["admin"])
+    client.post("/api/users/create_user", headers=admin)
+    client.put(f"/api/users/{ADMIN}/roles", json={"roles": ["admin"]}, headers=admin)
+    for user_id in (STUDENT, NEWCOMER, OUTSIDER):
+        client.post("/api/users/create_user", headers=auth_headers(user_id))
+    client.post("/api/courses/?title=C&description=d", headers=admin)
+    for user_id in (STUDENT, NEWCOMER):
+        client.post("/api/courses/1/students", headers=auth_headers(user_id))
+    client.post("/api/courses/1/tests", json={"title": "T"}, headers=admin)
+    for _ in range(2):
+        client.post("/api/questions/", json=_question(test_id=1), headers=admin)
+    client.patch("/api/courses/1/tests/1/active", json={"is_active": True}, headers=admin)
+    assert client.post("/api/attempts/tests/1", headers=auth_headers(STUDENT)).status_code == 201
+    assert client.patch("/api/answers/2", json={"value": 0}, headers=auth_headers(STUDENT)).status_code == 200
+
+
+NEW_USER = UserCreate(username="user5", full_name="User 5", email="user5@example.com", is_blocked=False, roles=[])
+
+# (сервис, вызов, запросов)
+WRITES = [
+    ("create_user", lambda db: create_user(db, NEW_USER, 5), 1),
+    ("update_user_full_name", lambda db: update_user_full_name(db, _user(STUDENT), STUDENT, "Zed"), 1),
+    ("set_user_roles", lambda db: set_user_roles(db, STUDENT, ["student"], _admin()), 1),
+    ("set_user_block_status", lambda db: set_user_block_status(db, _admin(), OUTSIDER, True), 1),
+    ("create_course", lambda db: create_course(db, _admin(), "C2", "d"), 1),
+    ("update_course", lambda db: update_course(db, 1, _admin(), "C1", None), 2),
+    ("delete_course", lambda db: delete_course(db, 1, _admin()), 2),
+    ("enroll_user_to_course", lambda db: enroll_user_to_course(db, 1, _user(OUTSIDER)), 7),
+    ("create_test", lambda db: create_test(db, 1, "T2", False, _admin()), 3),
+    ("delete_test", lambda db: delete_test(db, 1, 1, _admin()), 4),
+    ("set_test_active_status", lambda db: set_test_active_status(db, 1, 1, _admin(), False), 6),
+    ("create_question", lambda db: create_question(db, QuestionCreate(**_question()), _admin()), 2),
+    ("create_question_version", lambda db: create_question_version(db, 1, QuestionVersionCreate(**_question()), _admin()), 3),
+    ("create_notification", lambda db: create_notification(db, user_id=STUDENT, message="m", payload={}), 2),
+    ("create_course_notification", lambda db: create_course_notification(db, course_id=1, message="m", payload={}), 1),
+    ("create_attempt", lambda db: create_attempt(db, 1, _user(NEWCOMER)), 8),
+    ("update_answer", lambda db: update_answer(db, 1, 1, _user(STUDENT)), 4),
+    ("reset_answer", lambda db: reset_answer(db, 2, _user(STUDENT)), 3),
+    ("finish_attempt", lambda db: finish_attempt(db, 1, _user(STUDENT)), 9),
+]
+
+
+@pytest.mark.parametrize("call, expected", [(call, n) for _, call, n in WRITES], ids=[name for name, _, _ in WRITES])
+def test_write_query_count(client, db, call, expected):
+    _exam(client)
+    with capture_queries() as stats:
+        call(db)
+    assert stats.count == expected
+    # после записи и commit объект не перечитывается
+    assert not stats.statements[-1][0].startswith("SELECT")